@@ -1,8 +1,12 @@
+import json
+import os
 from contextlib import asynccontextmanager
 from typing import Optional, AsyncGenerator
 
 from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from temporalio.client import Client
 from temporalio.common import WorkflowIDReusePolicy
 from temporalio.exceptions import TemporalError
@@ -11,17 +15,29 @@ from temporalio.service import RPCError
 
 from common.event_stream_manager import EventStreamManager
 from common.client_helper import ClientHelper
+from common.redis_config import RedisConfig
+from common.redis_pool import close_redis_pools
 from common.user_message import ProcessUserMessageInput
+from common.util import str_to_bool
 from temporal_supervisor.claim_check.claim_check_plugin import ClaimCheckPlugin
-from temporal_supervisor.workflows.supervisor_workflow import WealthManagementWorkflow
+from temporal_supervisor.workflows.supervisor_workflow import GUARDRAIL_MODES, GUARDRAIL_OPTIMISTIC, \
+    WealthManagementSnapshot, WealthManagementWorkflow
 
 temporal_client: Optional[Client] = None
 task_queue: Optional[str] = None
+# every open /stream-chat-history holds a subscriber pool connection, so allow
+# no more streams than that pool has connections and refuse the rest with a 503
+max_event_streams = RedisConfig().max_subscriber_connections
+open_event_streams = 0
+guardrail_mode = os.getenv("GUARDRAIL_MODE", GUARDRAIL_OPTIMISTIC).lower()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # app startup
     print("API is starting up...")
+    # a typo would otherwise quietly fall back to the optimistic mode in every workflow
+    if guardrail_mode not in GUARDRAIL_MODES:
+        raise ValueError(f"Unknown GUARDRAIL_MODE {guardrail_mode!r}, expected one of {', '.join(GUARDRAIL_MODES)}")
     global temporal_client
     global task_queue
     client_helper = ClientHelper()
@@ -36,6 +52,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     yield
     print("API is shutting down...")
     # app teardown
+    await close_redis_pools()
 app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
@@ -73,6 +90,61 @@ async def get_chat_history(
             detail=f"Internal server error while querying workflow. {error_message}",
         )
 
+@app.get("/stream-chat-history")
+async def stream_chat_history(
+    request: Request,
+    workflow_id: str,
+    from_index: int = Query(0, description="Stream events starting from this index")
+):
+    """ Pushes chat events from Redis to the client as Server-Sent Events """
+    global open_event_streams
+    if open_event_streams >= max_event_streams:
+        # EventSource retries on its own; the UI can also fall back to /get-chat-history
+        raise HTTPException(status_code=503, detail="Too many open chat streams, try again later.",
+                            headers={"Retry-After": "5"})
+    open_event_streams += 1
+    released = False
+
+    def release():
+        global open_event_streams
+        nonlocal released
+        if not released:
+            released = True
+            open_event_streams -= 1
+
+    # EventSource sends the id of the last event it saw when it reconnects
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id is not None and last_event_id.isdigit():
+        from_index = int(last_event_id) + 1
+
+    async def event_generator() -> AsyncGenerator[str, None]:
+        manager = EventStreamManager()
+        try:
+            async for events in manager.subscribe_events(workflow_id=workflow_id, from_index=from_index):
+                if await request.is_disconnected():
+                    break
+                if not events:
+                    # comment line keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                for index, event in events:
+                    yield f"id: {index}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            print(f"Redis error streaming chat history: {e}")
+        finally:
+            release()
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+        # also runs if the client went away before the generator started
+        background=BackgroundTask(release),
+    )
+
 @app.post("/send-prompt")
 async def send_prompt(workflow_id: str, prompt: str):
     print(f"Received prompt {prompt}")
@@ -111,9 +183,15 @@ UPDATE_STATUS_NAME = "update_status"
 async def start_workflow(workflow_id: str):
     try:
         # start the workflow
+        snapshot = WealthManagementSnapshot(
+            coalesce_chat_messages=str_to_bool(os.getenv("COALESCE_CHAT_MESSAGES", "False")),
+            guardrail_mode=guardrail_mode,
+            intent_routing=str_to_bool(os.getenv("INTENT_ROUTING", "False")),
+            guardrails_enabled=str_to_bool(os.getenv("GUARDRAILS_ENABLED", "False")),
+        )
         await temporal_client.start_workflow(
             WealthManagementWorkflow.run,
-            args=[],
+            args=[snapshot],
             id=workflow_id,
             task_queue=task_queue,
             id_reuse_policy=WorkflowIDReusePolicy.ALLOW_DUPLICATE
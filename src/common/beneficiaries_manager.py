@@ -1,64 +1,233 @@
+import atexit
 import json
 import os
 import argparse
+import threading
 import uuid  # For generating unique beneficiary IDs
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from common.file_lock import file_version, locked_file, write_json_atomic
+from common.repository import BeneficiaryRepository
 
 # --- Configuration ---
 script_dir = os.path.dirname(__file__)
 relative_path = '../../data/beneficiaries.json'
 BENEFICIARIES_FILE =  os.path.join(script_dir, relative_path)
+# Number of journaled changes before the JSON file is rewritten
+SNAPSHOT_EVERY = int(os.getenv("BENEFICIARIES_SNAPSHOT_EVERY", "50"))
 # logging.basicConfig(level=logging.INFO,
 #                     format="%(asctime)s | %(levelname)s | %(filename)s:%(lineno)s | %(message)s")
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-class BeneficiariesManager:
+class BeneficiariesStore:
     """
-    Manages beneficiaries data stored in a JSON file.
-    Each client has its own list of beneficiaries, uniquely identified by a beneficiary_id within that client.
+    In-memory, indexed copy of the beneficiaries file shared by every manager in the process.
+
+    The JSON file is loaded once and indexed by client_id and beneficiary_id, so lookups don't
+    re-read or re-parse the file. Changes are appended to a journal file next to the JSON file
+    and the JSON file itself is only rewritten (via a temp file and an atomic rename) every
+    SNAPSHOT_EVERY changes, on flush() and at exit. On load, the journal is replayed on top of
+    the JSON file. Changes made by other processes are picked up by watching the journal size and
+    the JSON file's version, and every change is made while holding the file lock so concurrent
+    writers (threads or worker processes) can't lose each other's updates.
     """
 
-    def __init__(self, file_path: str = BENEFICIARIES_FILE):
+    _stores: Dict[str, "BeneficiariesStore"] = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, file_path: str, snapshot_every: int = SNAPSHOT_EVERY):
+        self.file_path = file_path
+        self.journal_path = f"{file_path}.journal"
+        self.snapshot_every = snapshot_every
+        self._lock = threading.RLock()
+        # client_id -> beneficiary_id -> beneficiary (dicts keep insertion order)
+        self._by_client: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._snapshot_version = None
+        self._journal_offset = 0
+        self._pending_changes = 0
+        self._load()
+
+    @classmethod
+    def for_file(cls, file_path: str) -> "BeneficiariesStore":
         """
-        Initializes the BeneficiariesManager.
-        Args:
-            file_path (str): The path to the JSON file where beneficiary data is stored.
+        Returns the shared store for a file, loading it on first use.
         """
-        self.file_path = file_path
+        file_path = os.path.abspath(file_path)
+        with cls._stores_lock:
+            store = cls._stores.get(file_path)
+            if store is None:
+                store = cls(file_path)
+                cls._stores[file_path] = store
+            return store
 
-    def _load_data(self) -> Dict[str, List[Dict[str, Any]]]:
+    def _load(self):
         """
-        Loads beneficiary data from the JSON file.
-        If the file doesn't exist or is empty/invalid, returns an empty dictionary.
-        Returns:
-            dict: The loaded beneficiary data.
+        Loads the JSON file and replays any journaled changes on top of it.
+        If the file doesn't exist or is empty/invalid, starts with empty data.
         """
-        if not os.path.exists(self.file_path) or os.stat(self.file_path).st_size == 0:
-            return {}
-        try:
-            with open(self.file_path, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logger.warning(f"Warning: Could not decode JSON from '{self.file_path}'. Starting with empty data.")
-            return {}
-        except Exception as e:
-            logger.error(f"Error loading data from '{self.file_path}': {e}")
-            return {}
+        self._by_client = {}
+        self._journal_offset = 0
+        self._snapshot_version = file_version(self.file_path)
+        if self._snapshot_version is not None and os.stat(self.file_path).st_size > 0:
+            try:
+                with open(self.file_path, 'r') as f:
+                    data = json.load(f)
+                for client_id, beneficiaries in data.items():
+                    self._by_client[client_id] = {b['beneficiary_id']: b for b in beneficiaries}
+            except json.JSONDecodeError:
+                logger.warning(f"Warning: Could not decode JSON from '{self.file_path}'. Starting with empty data.")
+            except Exception as e:
+                logger.error(f"Error loading data from '{self.file_path}': {e}")
+        self._replay_journal()
 
-    def _save_data(self, data: Dict[str, List[Dict[str, Any]]]):
+    def _replay_journal(self):
         """
-        Saves the current beneficiary data to the JSON file.
-        Args:
-            data (dict): The beneficiary data to save.
+        Applies journal entries written since the last replay (possibly by another process).
         """
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'r') as f:
+            f.seek(self._journal_offset)
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # partially written entry; pick it up next time
+                self._journal_offset += len(line.encode())
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt journal entry in '{self.journal_path}'")
+                    continue
+                self._apply(entry)
+                self._pending_changes += 1
+
+    def _apply(self, entry: Dict[str, Any]):
+        client_id = entry['client_id']
+        if entry['op'] == 'add':
+            beneficiary = entry['beneficiary']
+            self._by_client.setdefault(client_id, {})[beneficiary['beneficiary_id']] = beneficiary
+        elif entry['op'] == 'delete':
+            self._by_client.get(client_id, {}).pop(entry['beneficiary_id'], None)
+
+    def _refresh(self):
+        """
+        Cheap staleness check: a new JSON file means a full reload, a longer journal means replaying the tail.
+        """
+        if file_version(self.file_path) != self._snapshot_version:
+            self._pending_changes = 0
+            self._load()
+        elif os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) != self._journal_offset:
+            if os.path.getsize(self.journal_path) < self._journal_offset:
+                # journal was truncated by another process's snapshot
+                self._pending_changes = 0
+                self._load()
+            else:
+                self._replay_journal()
+
+    def _record(self, entry: Dict[str, Any]):
+        """
+        Applies a change in memory and appends it to the journal. Rewrites the JSON file once enough changes pile up.
+        Call while holding the file lock.
+        """
+        self._apply(entry)
+        line = json.dumps(entry) + "\n"
+        with open(self.journal_path, 'a') as f:
+            f.write(line)
+        self._journal_offset += len(line.encode())
+        self._pending_changes += 1
+        if self._pending_changes >= self.snapshot_every:
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        """
+        Writes the current data to the JSON file atomically and clears the journal.
+        Call while holding the file lock.
+        """
+        self._refresh()
+        if self._pending_changes == 0:
+            return
+        data = {client_id: list(beneficiaries.values()) for client_id, beneficiaries in self._by_client.items()}
         try:
-            with open(self.file_path, 'w') as f:
-                json.dump(data, f, indent=4)
+            write_json_atomic(self.file_path, data, indent=4)
+            # the JSON file now holds everything in the journal
+            open(self.journal_path, 'w').close()
+            self._snapshot_version = file_version(self.file_path)
+            self._journal_offset = 0
+            self._pending_changes = 0
         except Exception as e:
             logger.error(f"Error saving data to '{self.file_path}': {e}")
 
+    def flush(self):
+        """
+        Writes any journaled changes to the JSON file.
+        """
+        if self._pending_changes == 0 and not os.path.exists(self.journal_path):
+            return
+        with self._lock, locked_file(self.file_path):
+            self._write_snapshot()
+
+    def list(self, client_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            return [dict(b) for b in self._by_client.get(client_id, {}).values()]
+
+    def get(self, client_id: str, beneficiary_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            beneficiary = self._by_client.get(client_id, {}).get(beneficiary_id)
+            return dict(beneficiary) if beneficiary is not None else None
+
+    def add(self, client_id: str, first_name: str, last_name: str, relationship: str) -> Dict[str, Any]:
+        with self._lock, locked_file(self.file_path):
+            self._refresh()
+            existing_ids = self._by_client.get(client_id, {})
+
+            # Use UUID for robust uniqueness, then truncate for a shorter, readable ID
+            new_id = f"b-{str(uuid.uuid4())[:8]}"
+            while new_id in existing_ids:  # Ensure it's truly unique if a rare collision occurs with truncation
+                new_id = f"b-{str(uuid.uuid4())[:8]}"
+
+            new_beneficiary = {
+                "beneficiary_id": new_id,
+                "first_name": first_name,
+                "last_name": last_name,
+                "relationship": relationship
+            }
+            self._record({"op": "add", "client_id": client_id, "beneficiary": new_beneficiary})
+            return dict(new_beneficiary)
+
+    def delete(self, client_id: str, beneficiary_id: str) -> bool:
+        with self._lock, locked_file(self.file_path):
+            self._refresh()
+            if beneficiary_id not in self._by_client.get(client_id, {}):
+                return False
+            self._record({"op": "delete", "client_id": client_id, "beneficiary_id": beneficiary_id})
+            return True
+
+
+@atexit.register
+def _flush_stores():
+    for store in list(BeneficiariesStore._stores.values()):
+        store.flush()
+
+
+class BeneficiariesManager(BeneficiaryRepository):
+    """
+    Manages beneficiaries data stored in a JSON file.
+    Each client has its own list of beneficiaries, uniquely identified by a beneficiary_id within that client.
+    Reads and writes go through the shared in-memory BeneficiariesStore for the file.
+    """
+
+    def __init__(self, file_path: str = BENEFICIARIES_FILE):
+        """
+        Initializes the BeneficiariesManager.
+        Args:
+            file_path (str): The path to the JSON file where beneficiary data is stored.
+        """
+        self.file_path = file_path
+        self.store = BeneficiariesStore.for_file(file_path)
+
     def list_beneficiaries(self, client_id: str):
         """
         Retrieves all beneficiaries for a given client ID.
@@ -67,9 +236,18 @@ class BeneficiariesManager:
         Returns:
             list: A list of beneficiary dictionaries for the specified client, or an empty list if none are found.
         """
-        data = self._load_data()
-        beneficiaries = data.get(client_id, [])
-        return beneficiaries
+        return self.store.list(client_id)
+
+    def get_beneficiary(self, client_id: str, beneficiary_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieves a single beneficiary.
+        Args:
+            client_id (str): The ID of the client.
+            beneficiary_id (str): The unique ID of the beneficiary.
+        Returns:
+            dict: The beneficiary, or None if it doesn't exist.
+        """
+        return self.store.get(client_id, beneficiary_id)
 
     def add_beneficiary(self, client_id: str, first_name: str, last_name: str, relationship: str) -> None:
         """
@@ -81,30 +259,8 @@ class BeneficiariesManager:
             last_name (str): Last name of the beneficiary.
             relationship (str): Relationship to the client.
         """
-        data = self._load_data()
-
-        # Ensure the client ID exists in the data
-        if client_id not in data:
-            data[client_id] = []
-
-        # Generate a unique beneficiary ID for this client
-        existing_ids = {b['beneficiary_id'] for b in data[client_id]}
-
-        # Use UUID for robust uniqueness, then truncate for a shorter, readable ID
-        new_id = f"b-{str(uuid.uuid4())[:8]}"
-        while new_id in existing_ids:  # Ensure it's truly unique if a rare collision occurs with truncation
-            new_id = f"b-{str(uuid.uuid4())[:8]}"
-
-        new_beneficiary = {
-            "beneficiary_id": new_id,
-            "first_name": first_name,
-            "last_name": last_name,
-            "relationship": relationship
-        }
-
-        data[client_id].append(new_beneficiary)
-        self._save_data(data)
-        logger.info(f"\nBeneficiary '{first_name} {last_name}' (ID: {new_id}) added to client '{client_id}'.")
+        new_beneficiary = self.store.add(client_id, first_name, last_name, relationship)
+        logger.info(f"\nBeneficiary '{first_name} {last_name}' (ID: {new_beneficiary['beneficiary_id']}) added to client '{client_id}'.")
 
     def delete_beneficiary(self, client_id: str, beneficiary_id: str) -> None:
         """
@@ -113,22 +269,11 @@ class BeneficiariesManager:
             client_id (str): The ID of the client.
             beneficiary_id (str): The unique ID of the beneficiary to delete.
         """
-        data = self._load_data()
-
-        if client_id not in data or not data[client_id]:
+        if not self.store.list(client_id):
             logger.warning(f"\nClient '{client_id}' not found or has no beneficiaries.")
             return
 
-        original_count = len(data[client_id])
-
-        # Filter out the beneficiary to be deleted
-        data[client_id] = [
-            b for b in data[client_id]
-            if b['beneficiary_id'] != beneficiary_id
-        ]
-
-        if len(data[client_id]) < original_count:
-            self._save_data(data)
+        if self.store.delete(client_id, beneficiary_id):
             logger.info(f"\nBeneficiary with ID '{beneficiary_id}' deleted from client '{client_id}'.")
         else:
             logger.error(f"\nBeneficiary with ID '{beneficiary_id}' not found in client '{client_id}'.")
@@ -3,12 +3,15 @@ import json
 import os
 from datetime import datetime
 
+from common.file_lock import locked_file, write_json_atomic
+from common.repository import ClientRepository
+
 # --- Configuration ---
 script_dir = os.path.dirname(__file__)
 clients_relative_path = '../../data/clients.json'
 CLIENTS_FILE = os.path.join(script_dir, clients_relative_path)
 
-class ClientManager:
+class ClientManager(ClientRepository):
     def __init__(self, file_path: str = CLIENTS_FILE):
         self.file_path = file_path
 
@@ -17,7 +20,6 @@ class ClientManager:
             print(f"looking for client {client_id} in {self.file_path}")
             with open(self.file_path, "r") as f:
                 clients = json.load(f)
-            print(f"clients is {clients}")
             return clients.get(client_id, {"error": f"Client {client_id} not found"})
         except Exception as e:
             return {"error": f"Exception occurred while retrieving Client {client_id} error: {e}"}
@@ -26,8 +28,10 @@ class ClientManager:
                    last_name: str, address: str, phone: str,
                    email: str, marital_status: str) -> str:
         try:
-            with open(self.file_path, "r+") as f:
-                clients = json.load(f)
+            # hold the lock across the read-modify-write so concurrent writers don't lose updates
+            with locked_file(self.file_path):
+                with open(self.file_path, "r") as f:
+                    clients = json.load(f)
                 if client_id in clients:
                     return "Client already exists"
 
@@ -41,22 +45,19 @@ class ClientManager:
                 }
                 clients[client_id] = new_client
 
-                f.seek(0)
-                json.dump(clients, f, indent=4)
-                f.truncate()
+                write_json_atomic(self.file_path, clients)
                 return f"Client {client_id} added"
         except Exception as e:
             return f"Exception occurred while adding Client {client_id} error: {e}"
 
     def update_client(self, client_id: str, new_info: dict) -> str:
         try:
-            with open(self.file_path, "r+") as f:
-                clients = json.load(f)
+            with locked_file(self.file_path):
+                with open(self.file_path, "r") as f:
+                    clients = json.load(f)
                 if client_id in clients:
                     clients[client_id].update(new_info)
-                    f.seek(0)
-                    json.dump(clients, f, indent=4)
-                    f.truncate()
+                    write_json_atomic(self.file_path, clients)
                     return "Client information successfully updated"
                 return f"Client {client_id} not found"
         except Exception as e:
@@ -1,12 +1,16 @@
+import argparse
+import asyncio
 import json
 import time
 import os
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Union, AsyncIterator, Tuple, Optional
 from enum import Enum
 from dataclasses import asdict
 
-import redis.asyncio as redis
+from redis.exceptions import ResponseError, WatchError
 
+from .redis_config import RedisConfig
+from .redis_pool import get_redis_client, get_subscriber_client, close_redis_pools
 from .user_message import ChatInteraction
 from .status_update import StatusUpdate
 
@@ -15,113 +19,242 @@ class EventType(str, Enum):
     CHAT_INTERACTION = "chat_interaction"
     STATUS_UPDATE = "status_update"
 
+class EventStreamBackend(str, Enum):
+    """Redis data structures that can hold the event stream"""
+    LIST = "list"
+    STREAM = "stream"
+
 class EventStreamManager:
     """
-    Manages a Redis list-based event stream for chat conversations.
-    
-    Uses LPUSH for O(1) appends and LRANGE for efficient range queries.
+    Manages a Redis event stream for chat conversations.
+
+    The default list backend uses RPUSH for O(1) appends and LRANGE for efficient range queries.
     Each event has an implicit sequence number based on its position in the list.
+    Every append also publishes a notification so readers can be pushed new
+    events instead of polling.
+
+    The optional Redis Streams backend (EVENT_STREAM_BACKEND=stream, Redis 7+) uses XADD
+    with MAXLEN trimming and XREAD BLOCK. Entries are added with explicit "0-<n>" IDs so the
+    stream entry ID carries the same 0-based index the list backend exposes, which keeps the
+    from_index contract intact even after older entries have been trimmed.
+
+    Switching an existing deployment to streams:
+        1. Run every worker and the API with EVENT_STREAM_BACKEND=stream. The stream backend
+           keeps reading and appending to conversations that are still lists, so the order in
+           which processes switch doesn't matter for them; new conversations become streams.
+        2. Once no process runs the list backend any more, run
+           "python -m common.event_stream_manager --migrate-to-streams" to convert the
+           remaining lists. It is safe to run while conversations are being appended to.
     """
-    
-    def __init__(self, redis_host: str = None, redis_port: int = None):
+
+    def __init__(self, redis_host: str = None, redis_port: int = None,
+                 backend: Optional[str] = None, max_length: Optional[int] = None):
         self.redis_host = redis_host or os.getenv("REDIS_HOST", "localhost")
         self.redis_port = redis_port or int(os.getenv("REDIS_PORT", "6379"))
-        self.redis_client = redis.Redis(
-            host=self.redis_host, 
-            port=self.redis_port,
-            decode_responses=True
-        )
-    
+        self.backend = EventStreamBackend(backend or os.getenv("EVENT_STREAM_BACKEND", EventStreamBackend.LIST.value))
+        self.max_length = max_length or int(os.getenv("EVENT_STREAM_MAXLEN", "10000"))
+        config = RedisConfig()
+        config.hostname = self.redis_host
+        config.port = self.redis_port
+        # Borrow connections from the process-wide pool rather than opening a client per manager
+        self.redis_client = get_redis_client(config, decode_responses=True)
+        # subscriptions hold their connection while open, they get a separate pool
+        self.subscriber_client = get_subscriber_client(config, decode_responses=True)
+
     def _get_stream_key(self, workflow_id: str) -> str:
         """Get the Redis key for the event stream"""
         return f"events:{workflow_id}"
-    
+
     def _get_meta_key(self, workflow_id: str) -> str:
         """Get the Redis key for stream metadata"""
         return f"events:{workflow_id}:meta"
-        
+
+    def _get_notify_channel(self, workflow_id: str) -> str:
+        """Get the Redis pub/sub channel used to announce new events"""
+        return f"events:{workflow_id}:notify"
+
+    @staticmethod
+    def _is_wrong_type(e: ResponseError) -> bool:
+        """The stream backend hit a conversation that is still a list"""
+        return str(e).startswith("WRONGTYPE")
+
+    @staticmethod
+    def _index_to_stream_id(index: int) -> str:
+        """Stream entry IDs are "0-<index + 1>" as 0-0 is not a valid ID"""
+        return f"0-{index + 1}"
+
+    @staticmethod
+    def _stream_id_to_index(stream_id: str) -> int:
+        return int(stream_id.split("-")[1]) - 1
+
+    def _parse_stream_entries(self, entries) -> List[Tuple[int, Dict[str, Any]]]:
+        """Convert XRANGE/XREAD entries to (index, event) tuples"""
+        events = []
+        for stream_id, fields in entries:
+            try:
+                events.append((self._stream_id_to_index(stream_id), json.loads(fields["event"])))
+            except (json.JSONDecodeError, KeyError):
+                continue  # Skip malformed events
+        return events
+
     async def append_chat_interaction(
-        self, 
-        workflow_id: str, 
+        self,
+        workflow_id: str,
         chat_interaction: ChatInteraction
     ) -> int:
         """
         Append a chat interaction to the stream.
-        
+
         Returns the new total length of the event stream.
         """
         return await self._append_domain_event(
-            workflow_id, 
-            EventType.CHAT_INTERACTION, 
+            workflow_id,
+            EventType.CHAT_INTERACTION,
             chat_interaction
         )
-    
+
     async def append_status_update(
-        self, 
-        workflow_id: str, 
+        self,
+        workflow_id: str,
         status_update: StatusUpdate
     ) -> int:
         """
         Append a status update to the stream.
-        
+
         Returns the new total length of the event stream.
         """
         return await self._append_domain_event(
-            workflow_id, 
-            EventType.STATUS_UPDATE, 
+            workflow_id,
+            EventType.STATUS_UPDATE,
             status_update
         )
-    
-    async def _append_domain_event(
-        self, 
-        workflow_id: str, 
-        event_type: EventType, 
-        domain_object: Union[ChatInteraction, StatusUpdate]
+
+    async def append_events(
+        self,
+        workflow_id: str,
+        domain_objects: List[Union[ChatInteraction, StatusUpdate]]
     ) -> int:
         """
-        Internal method to append domain objects to the stream.
-        
+        Append a batch of chat interactions and status updates, in order, in one round trip.
+        The list backend writes them with a single RPUSH and sends one notification.
+
         Returns the new total length of the event stream.
         """
+        if not domain_objects:
+            return await self.get_total_events(workflow_id)
+
+        stream_key = self._get_stream_key(workflow_id)
+        event_jsons = [self._to_event_json(self._event_type(obj), obj) for obj in domain_objects]
+
+        if self.backend == EventStreamBackend.STREAM:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for event_json in event_jsons:
+                pipe.xadd(stream_key, {"event": event_json}, id="0-*",
+                          maxlen=self.max_length, approximate=True)
+            # raise_on_error=False, a raised pipeline error loses the Redis message
+            stream_ids = await pipe.execute(raise_on_error=False)
+            error = next((r for r in stream_ids if isinstance(r, ResponseError)), None)
+            if error is None:
+                return self._stream_id_to_index(stream_ids[-1]) + 1
+            # on a list every XADD fails the same way, so nothing was written
+            if not self._is_wrong_type(error):
+                raise error
+        return await self._append_to_list(workflow_id, event_jsons)
+
+    async def _append_to_list(self, workflow_id: str, event_jsons: List[str]) -> int:
+        # subscribers only use the notification as a wake-up, so it can go in the same
+        # round trip with the number of new events rather than the (not yet known) new length
         stream_key = self._get_stream_key(workflow_id)
-        
-        # Convert domain object to dict
-        content_dict = asdict(domain_object)
-        
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.rpush(stream_key, *event_jsons)
+        pipe.publish(self._get_notify_channel(workflow_id), len(event_jsons))
+        new_length, _ = await pipe.execute()
+        return new_length
+
+    @staticmethod
+    def _event_type(domain_object: Union[ChatInteraction, StatusUpdate]) -> EventType:
+        if isinstance(domain_object, ChatInteraction):
+            return EventType.CHAT_INTERACTION
+        if isinstance(domain_object, StatusUpdate):
+            return EventType.STATUS_UPDATE
+        raise TypeError(f"Unsupported event {type(domain_object).__name__}")
+
+    @staticmethod
+    def _to_event_json(event_type: EventType, domain_object: Union[ChatInteraction, StatusUpdate]) -> str:
         # Build the event with structured content
         event = {
             "type": event_type.value,
-            "content": content_dict
+            "content": asdict(domain_object)
         }
-        
-        event_json = json.dumps(event)
-        
+        return json.dumps(event)
+
+    async def _append_domain_event(
+        self,
+        workflow_id: str,
+        event_type: EventType,
+        domain_object: Union[ChatInteraction, StatusUpdate]
+    ) -> int:
+        """
+        Internal method to append domain objects to the stream.
+
+        Returns the new total length of the event stream.
+        """
+        stream_key = self._get_stream_key(workflow_id)
+        event_json = self._to_event_json(event_type, domain_object)
+
+        if self.backend == EventStreamBackend.STREAM:
+            # "0-*" lets Redis pick the next sequence number atomically.
+            # Readers block on XREAD so no notification is needed.
+            try:
+                stream_id = await self.redis_client.xadd(
+                    stream_key,
+                    {"event": event_json},
+                    id="0-*",
+                    maxlen=self.max_length,
+                    approximate=True
+                )
+                return self._stream_id_to_index(stream_id) + 1
+            except ResponseError as e:
+                if not self._is_wrong_type(e):
+                    raise
+
         # Use RPUSH to add to the end (chronological order)
         # RPUSH returns the new length of the list after insertion
         new_length = await self.redis_client.rpush(stream_key, event_json)
-        
+
+        # Let any subscribers know there is something new to read
+        await self.redis_client.publish(self._get_notify_channel(workflow_id), new_length)
+
         return new_length
-    
+
     async def get_events_from_index(
-        self, 
-        workflow_id: str, 
+        self,
+        workflow_id: str,
         from_index: int = 0
     ) -> List[Dict[str, Any]]:
         """
         Get events starting from a specific index.
-        
+
         Args:
             workflow_id: The workflow ID
             from_index: Start from this index (0-based)
-            
+
         Returns:
             List of events in chronological order
         """
         stream_key = self._get_stream_key(workflow_id)
-        
+
+        if self.backend == EventStreamBackend.STREAM:
+            try:
+                entries = await self.redis_client.xrange(stream_key, self._index_to_stream_id(from_index), "+")
+                return [event for _, event in self._parse_stream_entries(entries)]
+            except ResponseError as e:
+                if not self._is_wrong_type(e):
+                    raise
+
         # Get all events from the specified index to the end
         event_strings = await self.redis_client.lrange(stream_key, from_index, -1)
-        
+
         # Parse events
         events = []
         for event_str in event_strings:
@@ -130,20 +263,105 @@ class EventStreamManager:
                 events.append(event)
             except json.JSONDecodeError:
                 continue  # Skip malformed events
-        
+
         return events
-    
+
+    async def subscribe_events(
+        self,
+        workflow_id: str,
+        from_index: int = 0,
+        keepalive_seconds: float = 15.0
+    ) -> AsyncIterator[List[Tuple[int, Dict[str, Any]]]]:
+        """
+        Yield new events as they are appended to the stream.
+
+        Args:
+            workflow_id: The workflow ID
+            from_index: Start from this index (0-based)
+            keepalive_seconds: How long to wait for a notification before
+                yielding an empty batch so callers can send a keepalive
+
+        Yields:
+            Lists of (index, event) tuples in chronological order. An empty
+            list means nothing new arrived within keepalive_seconds.
+
+        A subscription holds one connection from the subscriber pool until it is closed.
+        """
+        stream_key = self._get_stream_key(workflow_id)
+        # a conversation that is still a list is tailed as one until it is migrated;
+        # the migration then ends the subscription and the client reconnects
+        if self.backend == EventStreamBackend.STREAM and await self.redis_client.type(stream_key) != "list":
+            async for batch in self._read_stream(workflow_id, from_index, keepalive_seconds):
+                yield batch
+            return
+
+        pubsub = self.subscriber_client.pubsub()
+        # Subscribe before the first read so nothing appended in between is missed
+        await pubsub.subscribe(self._get_notify_channel(workflow_id))
+        try:
+            next_index = from_index
+            while True:
+                event_strings = await self.redis_client.lrange(stream_key, next_index, -1)
+                batch = []
+                for offset, event_str in enumerate(event_strings):
+                    try:
+                        batch.append((next_index + offset, json.loads(event_str)))
+                    except json.JSONDecodeError:
+                        continue  # Skip malformed events
+                next_index += len(event_strings)
+                if batch:
+                    yield batch
+
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=keepalive_seconds
+                )
+                if message is None:
+                    yield []
+        finally:
+            await pubsub.aclose()
+
+    async def _read_stream(
+        self,
+        workflow_id: str,
+        from_index: int,
+        keepalive_seconds: float
+    ) -> AsyncIterator[List[Tuple[int, Dict[str, Any]]]]:
+        """Tail the stream with XREAD BLOCK starting after the last seen ID"""
+        stream_key = self._get_stream_key(workflow_id)
+        # XREAD returns entries strictly greater than the given ID
+        last_id = f"0-{from_index}"
+        while True:
+            response = await self.subscriber_client.xread(
+                {stream_key: last_id},
+                block=int(keepalive_seconds * 1000)
+            )
+            if not response:
+                yield []
+                continue
+            _, entries = response[0]
+            last_id = entries[-1][0]
+            yield self._parse_stream_entries(entries)
+
     async def get_all_events(self, workflow_id: str) -> List[Dict[str, Any]]:
         """
         Get all events in the stream.
-        
+
         Returns events in chronological order.
         """
         stream_key = self._get_stream_key(workflow_id)
-        
+
+        if self.backend == EventStreamBackend.STREAM:
+            try:
+                entries = await self.redis_client.xrange(stream_key, "-", "+")
+                return [event for _, event in self._parse_stream_entries(entries)]
+            except ResponseError as e:
+                if not self._is_wrong_type(e):
+                    raise
+
         # Get all events
         event_strings = await self.redis_client.lrange(stream_key, 0, -1)
-        
+
         # Parse events (already in chronological order due to RPUSH)
         events = []
         for event_str in event_strings:
@@ -151,28 +369,105 @@ class EventStreamManager:
                 events.append(json.loads(event_str))
             except json.JSONDecodeError:
                 continue  # Skip malformed events
-        
+
         return events
-    
+
     async def get_total_events(self, workflow_id: str) -> int:
         """Get the total number of events in the stream"""
         stream_key = self._get_stream_key(workflow_id)
+        if self.backend == EventStreamBackend.STREAM:
+            # trimmed entries still count, so use the last ID rather than XLEN
+            try:
+                last = await self.redis_client.xrevrange(stream_key, "+", "-", count=1)
+                return self._stream_id_to_index(last[0][0]) + 1 if last else 0
+            except ResponseError as e:
+                if not self._is_wrong_type(e):
+                    raise
         return await self.redis_client.llen(stream_key)
-    
+
     async def delete_stream(self, workflow_id: str) -> bool:
         """
         Delete the entire event stream for a workflow.
-        
+
         Returns True if the stream was deleted, False if it didn't exist.
         """
         stream_key = self._get_stream_key(workflow_id)
         meta_key = self._get_meta_key(workflow_id)
-        
+
         # Delete both the stream and metadata
         deleted = await self.redis_client.delete(stream_key, meta_key)
-        
+
         return deleted > 0
-    
-    async def close(self):
-        """Close the Redis connection"""
-        await self.redis_client.aclose()
+
+    async def migrate_lists_to_streams(self) -> int:
+        """
+        Convert every list-based events:* key into a Redis Stream, preserving event order
+        so existing from_index values still point at the same events.
+
+        Returns the number of conversations migrated.
+        """
+        migrated = 0
+        async for key in self.redis_client.scan_iter(match="events:*", _type="list"):
+            moved = await self._migrate_list(key)
+            if moved is not None:
+                migrated += 1
+                print(f"Migrated {key}: {moved} events")
+        return migrated
+
+    async def _migrate_list(self, key: str) -> Optional[int]:
+        """
+        Replace one list with a stream holding the same events. WATCH makes the
+        transaction fail if a writer appends after the list was read, in which
+        case it is read again, so no event is lost.
+
+        Returns the number of events moved, None if the key is no longer a list.
+        """
+        temp_key = f"{key}:migrating"
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    if await pipe.type(key) != "list":
+                        await pipe.unwatch()
+                        return None
+                    event_strings = await pipe.lrange(key, 0, -1)
+                    pipe.multi()
+                    pipe.delete(temp_key)
+                    for index, event_str in enumerate(event_strings):
+                        pipe.xadd(temp_key, {"event": event_str}, id=self._index_to_stream_id(index))
+                    # RENAME atomically replaces the list with the stream
+                    pipe.rename(temp_key, key)
+                    await pipe.execute()
+                    return len(event_strings)
+                except WatchError:
+                    continue
+
+
+# --- Command Line Interface (CLI) Setup ---
+
+async def migrate():
+    manager = EventStreamManager(backend=EventStreamBackend.STREAM.value)
+    try:
+        migrated = await manager.migrate_lists_to_streams()
+        print(f"Migrated {migrated} conversations to Redis Streams")
+    finally:
+        await close_redis_pools()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Maintain the Redis chat event streams.",
+        epilog="Example usage:\n"
+               "  python -m common.event_stream_manager --migrate-to-streams"
+    )
+    parser.add_argument(
+        '--migrate-to-streams',
+        action='store_true',
+        required=True,
+        help='Convert existing list-based events:* keys to Redis Streams.'
+    )
+    parser.parse_args()
+    asyncio.run(migrate())
+
+
+if __name__ == "__main__":
+    main()
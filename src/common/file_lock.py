@@ -0,0 +1,175 @@
+"""
+File Locking Helpers for the JSON Managers
+
+The JSON managers do read-modify-write cycles on shared files. When activities run
+concurrently (threads on one worker or several worker processes) those cycles race and
+lose updates. locked_file() serializes them with an advisory lock on a sidecar
+"<file>.lock" file, write_json_atomic() makes sure readers never see a half written file,
+and file_version() lets a manager that caches data detect that the file changed underneath it.
+
+Example:
+    with locked_file(path):
+        with open(path) as f:
+            data = json.load(f)
+        data["123"] = {...}
+        write_json_atomic(path, data)
+
+Run "python -m common.file_lock --stress" to hammer the managers with parallel writes
+and verify that no updates are lost.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+def _thread_lock(path: str) -> threading.Lock:
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(path, threading.Lock())
+
+@contextmanager
+def locked_file(path: str) -> Iterator[None]:
+    """
+    Holds an exclusive lock on path for the duration of the block.
+    The lock is not re-entrant.
+    """
+    path = os.path.abspath(path)
+    with _thread_lock(path):
+        if fcntl is None:
+            yield
+            return
+        with open(f"{path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def file_version(path: str) -> Optional[Tuple[int, int, int]]:
+    """
+    Identifies the current contents of a file. None if it doesn't exist.
+    Files are always replaced (see write_json_atomic) so the inode changes on every write.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def write_json_atomic(path: str, data: Any, indent: int = 4) -> None:
+    """
+    Writes JSON to a temp file in the same directory and renames it over path.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+# --- Stress test ---
+
+def _hammer(kind: str, path: str, worker: int, operations: int) -> int:
+    """ Adds then deletes records from one worker, returning how many records it left behind """
+    from common.beneficiaries_manager import BeneficiariesManager
+    from common.client_manager import ClientManager
+    from common.investment_manager import InvestmentAccount, InvestmentManager
+
+    client_id = f"stress-{worker}"
+    kept = 0
+    for i in range(operations):
+        if kind == "clients":
+            ClientManager(path).add_client(f"{client_id}-{i}", "First", "Last", "Addr", "555", "e@x.com", "single")
+            kept += 1
+        elif kind == "investments":
+            manager = InvestmentManager(path)
+            account = manager.add_investment_account(InvestmentAccount(client_id, f"acct-{i}", 1.0))
+            if i % 2:
+                manager.delete_investment_account(client_id, account["investment_id"])
+            else:
+                kept += 1
+        else:
+            manager = BeneficiariesManager(path)
+            manager.add_beneficiary(client_id, "First", f"Last{i}", "child")
+            if i % 2:
+                newest = manager.list_beneficiaries(client_id)[-1]
+                manager.delete_beneficiary(client_id, newest["beneficiary_id"])
+            else:
+                kept += 1
+    if kind == "beneficiaries":
+        BeneficiariesManager(path).store.flush()
+    return kept
+
+def stress(workers: int, operations: int, use_processes: bool) -> bool:
+    """
+    Runs parallel add/delete calls against copies of the data files and checks the record counts.
+    """
+    from common.beneficiaries_manager import BENEFICIARIES_FILE
+    from common.client_manager import CLIENTS_FILE
+    from common.investment_manager import INVESTMENTS_FILE
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    all_passed = True
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for kind, source in (("clients", CLIENTS_FILE),
+                             ("investments", INVESTMENTS_FILE),
+                             ("beneficiaries", BENEFICIARIES_FILE)):
+            path = os.path.join(tmp_dir, os.path.basename(source))
+            shutil.copy(source, path)
+            start = time.perf_counter()
+            with executor_class(max_workers=workers) as executor:
+                kept = list(executor.map(_hammer, [kind] * workers, [path] * workers,
+                                         range(workers), [operations] * workers))
+            elapsed = time.perf_counter() - start
+            with open(path) as f:
+                data = json.load(f)
+            if kind == "clients":
+                found = [sum(1 for c in data if c.startswith(f"stress-{w}-")) for w in range(workers)]
+            else:
+                found = [len(data.get(f"stress-{w}", [])) for w in range(workers)]
+            passed = found == kept
+            all_passed = all_passed and passed
+            print(f"{kind:>13}: {'OK  ' if passed else 'LOST'} expected {sum(kept)} records, "
+                  f"found {sum(found)} ({workers} workers x {operations} ops in {elapsed:.2f}s)")
+    return all_passed
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Stress test the JSON managers with concurrent writes.",
+        epilog="Example usage:\n"
+               "  python -m common.file_lock --stress --workers 8 --operations 50 --processes"
+    )
+    parser.add_argument('--stress', action='store_true', required=True,
+                        help='Run parallel add/delete calls and verify no writes are lost.')
+    parser.add_argument('--workers', type=int, default=8, help='Number of concurrent writers.')
+    parser.add_argument('--operations', type=int, default=50, help='Operations per writer.')
+    parser.add_argument('--processes', action='store_true',
+                        help='Use processes instead of threads (like several workers sharing the files).')
+    args = parser.parse_args()
+    if not stress(args.workers, args.operations, args.processes):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,9 @@ from dataclasses import dataclass
 import uuid
 import argparse
 
+from common.file_lock import file_version, locked_file, write_json_atomic
+from common.repository import InvestmentRepository
+
 script_dir = os.path.dirname(__file__)
 relative_path = '../../data/investments.json'
 INVESTMENTS_FILE =  os.path.join(script_dir, relative_path)
@@ -15,13 +18,14 @@ class InvestmentAccount:
     name: str
     balance: float
 
-class InvestmentManager:
+class InvestmentManager(InvestmentRepository):
     def __init__(self, json_file=INVESTMENTS_FILE):
         self.json_file = json_file
         self._load_data()
 
     def _load_data(self):
         """Loads investment client data from the JSON file."""
+        self.version = file_version(self.json_file)
         if os.path.exists(self.json_file):
             with open(self.json_file, 'r') as f:
                 try:
@@ -36,16 +40,25 @@ class InvestmentManager:
         else:
             self.data = {}
 
+    def _refresh_if_stale(self):
+        """
+        Optimistic version check: self.data was loaded when the manager was created,
+        so reload it if the file has been written since.
+        """
+        if file_version(self.json_file) != self.version:
+            self._load_data()
+
     def _save_data(self):
-        """Saves current investment client data to the JSON file."""
-        with open(self.json_file, 'w') as f:
-            json.dump(self.data, f, indent=2)
+        """Saves current investment client data to the JSON file. Call while holding the file lock."""
+        write_json_atomic(self.json_file, self.data, indent=2)
+        self.version = file_version(self.json_file)
 
     def list_investment_accounts(self, client_id):
         """
         Returns a list of investment accounts for a given client_id.
         Returns an empty list if the client_id does not exist.
         """
+        self._refresh_if_stale()
         if client_id not in self.data:
             return []  # No investment accounts for this client
 
@@ -65,51 +78,55 @@ class InvestmentManager:
             print("Error: Balance must be a numeric value.")
             return None
 
-        if new_account.client_id not in self.data:
-            self.data[new_account.client_id] = []
+        with locked_file(self.json_file):
+            self._refresh_if_stale()
+            if new_account.client_id not in self.data:
+                self.data[new_account.client_id] = []
 
-        # Generate a unique beneficiary ID for this investment account
-        existing_ids = {i['investment_id'] for i in self.data[new_account.client_id]}
+            # Generate a unique beneficiary ID for this investment account
+            existing_ids = {i['investment_id'] for i in self.data[new_account.client_id]}
 
-        # Use UUID for robust uniqueness, then truncate for a shorter, readable ID
-        new_investment_id = f"i-{str(uuid.uuid4())[:8]}"
-        while new_investment_id in existing_ids:
+            # Use UUID for robust uniqueness, then truncate for a shorter, readable ID
             new_investment_id = f"i-{str(uuid.uuid4())[:8]}"
+            while new_investment_id in existing_ids:
+                new_investment_id = f"i-{str(uuid.uuid4())[:8]}"
 
-        new_investment_account = {
-            "investment_id": new_investment_id,
-            "name": new_account.name,
-            "balance": new_account.balance
-        }
+            new_investment_account = {
+                "investment_id": new_investment_id,
+                "name": new_account.name,
+                "balance": new_account.balance
+            }
 
-        self.data[new_account.client_id].append(new_investment_account)
-        self._save_data()
-        return new_investment_account  # Return the newly added investment account details
+            self.data[new_account.client_id].append(new_investment_account)
+            self._save_data()
+            return new_investment_account  # Return the newly added investment account details
 
     def delete_investment_account(self, client_id, investment_id):
         """
         Deletes an investment account for a given client_id and investment_id.
         Returns True if deleted, False otherwise.
         """
-        if client_id not in self.data:
-            return False  # Client not found
-
-        initial_count = len(self.data[client_id])
-
-        # Filter out the account to be deleted
-        self.data[client_id] = [
-            investment_account for investment_account in self.data[client_id]
-            if investment_account["investment_id"] != investment_id
-        ]
-
-        if len(self.data[client_id]) < initial_count:
-            # If the list is now empty for this client, we might want to remove the client_id entry entirely
-            if not self.data[client_id]:
-                del self.data[client_id]
-            self._save_data()
-            return True
-        else:
-            return False  # Investment account not found for this client
+        with locked_file(self.json_file):
+            self._refresh_if_stale()
+            if client_id not in self.data:
+                return False  # Client not found
+
+            initial_count = len(self.data[client_id])
+
+            # Filter out the account to be deleted
+            self.data[client_id] = [
+                investment_account for investment_account in self.data[client_id]
+                if investment_account["investment_id"] != investment_id
+            ]
+
+            if len(self.data[client_id]) < initial_count:
+                # If the list is now empty for this client, we might want to remove the client_id entry entirely
+                if not self.data[client_id]:
+                    del self.data[client_id]
+                self._save_data()
+                return True
+            else:
+                return False  # Investment account not found for this client
 
 
 def main():
@@ -8,6 +8,15 @@ for manual os.getenv() calls throught the codebase.
 Environment Variables:
     REDIS_HOST: Redis hostname (default: localhost)
     REDIS_PORT: Redis port (default: 6379)
+    REDIS_MAX_CONNECTIONS: Size of the shared pool for short commands (default: 100). Every
+        process has its own pool, and a command waits up to 20s for a free connection, so size
+        it for the process's concurrent Redis calls (the worker runs up to ACTIVITY_THREADS
+        activities at once) and keep the sum over all processes below Redis' maxclients.
+    REDIS_MAX_SUBSCRIBER_CONNECTIONS: Size of the separate pool for long blocking reads
+        (default: 50). Every open chat event subscription (pub/sub or XREAD BLOCK) holds one
+        of these for as long as it is open, so this is also the API's limit on concurrent
+        /stream-chat-history connections. Keeping them apart means open browser tabs can
+        never starve activities and API calls of connections.
 
 Example:
     # Automatically loads from environment variables
@@ -37,8 +46,13 @@ class RedisConfig:
 
     hostname: str = "localhost"
     port: int = 6379
+    max_connections: int = 100
+    max_subscriber_connections: int = 50
 
     def __post_init__(self):
         """ Load configuration from envrionment variables if available """
         self.hostname = os.getenv("REDIS_HOST", self.hostname)
-        self.port = int(os.getenv("REDIS_PORT", self.port))
\ No newline at end of file
+        self.port = int(os.getenv("REDIS_PORT", self.port))
+        self.max_connections = int(os.getenv("REDIS_MAX_CONNECTIONS", self.max_connections))
+        self.max_subscriber_connections = int(os.getenv("REDIS_MAX_SUBSCRIBER_CONNECTIONS",
+                                                        self.max_subscriber_connections))
\ No newline at end of file
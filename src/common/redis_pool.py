@@ -0,0 +1,73 @@
+"""
+Shared Redis Connection Pool Module
+
+Every Redis user in a process (event stream activities, the API and the claim check
+codec) borrows connections from one pool per Redis server instead of opening and
+closing a client per call. Pools are created lazily on first use and must be closed
+when the process shuts down (worker exit, FastAPI lifespan teardown, codec server cleanup).
+
+Long blocking reads (pub/sub subscriptions, XREAD BLOCK) hold a connection for as long
+as they run. They use get_subscriber_client, which has its own, separately sized pool
+(REDIS_MAX_SUBSCRIBER_CONNECTIONS), so they can never use up the connections short
+commands need. See RedisConfig for sizing both pools.
+
+Example:
+    client = get_redis_client(RedisConfig(), decode_responses=True)
+    await client.rpush("key", "value")
+    ...
+    await close_redis_pools()
+"""
+
+import logging
+from typing import Dict, Optional, Tuple
+
+import redis.asyncio as redis
+
+from common.redis_config import RedisConfig
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a free connection when the pool is exhausted
+POOL_TIMEOUT = 20
+
+# (host, port, decode_responses, subscriber pool)
+_pools: Dict[Tuple[str, int, bool, bool], redis.BlockingConnectionPool] = {}
+
+def _get_pool(config: RedisConfig, decode_responses: bool, subscriber: bool) -> redis.BlockingConnectionPool:
+    key = (config.hostname, config.port, decode_responses, subscriber)
+    pool = _pools.get(key)
+    if pool is None:
+        max_connections = config.max_subscriber_connections if subscriber else config.max_connections
+        logger.info(f"Creating Redis {'subscriber ' if subscriber else ''}connection pool for "
+                    f"{config.hostname}:{config.port} (max connections {max_connections})")
+        pool = redis.BlockingConnectionPool(
+            host=config.hostname,
+            port=config.port,
+            max_connections=max_connections,
+            timeout=POOL_TIMEOUT,
+            decode_responses=decode_responses,
+        )
+        _pools[key] = pool
+    return pool
+
+def get_redis_client(config: Optional[RedisConfig] = None, decode_responses: bool = False) -> redis.Redis:
+    """
+    Returns a client backed by the shared pool for the configured Redis server.
+
+    Clients are cheap wrappers around the pool, so callers don't need to close them.
+    Don't use it for blocking reads, see get_subscriber_client.
+    """
+    return redis.Redis(connection_pool=_get_pool(config or RedisConfig(), decode_responses, False))
+
+def get_subscriber_client(config: Optional[RedisConfig] = None, decode_responses: bool = False) -> redis.Redis:
+    """
+    Returns a client backed by the subscriber pool, for pub/sub and blocking reads that hold
+    their connection for a long time. The pool holds REDIS_MAX_SUBSCRIBER_CONNECTIONS.
+    """
+    return redis.Redis(connection_pool=_get_pool(config or RedisConfig(), decode_responses, True))
+
+async def close_redis_pools() -> None:
+    """ Disconnect every shared pool. Call once when the process shuts down """
+    while _pools:
+        _, pool = _pools.popitem()
+        await pool.aclose()
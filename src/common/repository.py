@@ -0,0 +1,128 @@
+"""
+Storage Repository Interfaces
+
+The client, investment and beneficiary managers all implement the interfaces below.
+The JSON file managers are the default implementation; SqliteRepository
+(common/sqlite_repository.py) implements all three against a single SQLite database.
+
+Environment Variables:
+    DATA_STORE_BACKEND: "json" (default) or "sqlite"
+    SQLITE_DB_PATH: Path to the SQLite database (default: data/wealth_management.db)
+
+Example:
+    # The JSON manager by default, the shared SQLite repository with DATA_STORE_BACKEND=sqlite
+    clients = get_client_repository()
+    clients.get_client("123")
+"""
+
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+script_dir = os.path.dirname(__file__)
+SQLITE_DB_FILE = os.path.join(script_dir, '../../data/wealth_management.db')
+
+class DataStoreBackend(str, Enum):
+    JSON = "json"
+    SQLITE = "sqlite"
+
+@dataclass
+class DataStoreConfig:
+    """
+    Configuration for the data store
+
+    Automatically loads the backend and database location from environment variables
+    """
+
+    backend: DataStoreBackend = DataStoreBackend.JSON
+    sqlite_path: str = SQLITE_DB_FILE
+
+    def __post_init__(self):
+        """ Load configuration from environment variables if available """
+        self.backend = DataStoreBackend(os.getenv("DATA_STORE_BACKEND", self.backend).lower())
+        self.sqlite_path = os.getenv("SQLITE_DB_PATH", self.sqlite_path)
+
+    @property
+    def use_sqlite(self) -> bool:
+        return self.backend == DataStoreBackend.SQLITE
+
+
+class ClientRepository(ABC):
+    @abstractmethod
+    def get_client(self, client_id: str) -> dict:
+        """ Returns the client's fields, or a dict with an "error" key """
+
+    @abstractmethod
+    def add_client(self, client_id: str, first_name: str,
+                   last_name: str, address: str, phone: str,
+                   email: str, marital_status: str) -> str:
+        """ Adds a client, returning a message describing the result """
+
+    @abstractmethod
+    def update_client(self, client_id: str, new_info: dict) -> str:
+        """ Updates some of a client's fields, returning a message describing the result """
+
+
+class InvestmentRepository(ABC):
+    @abstractmethod
+    def list_investment_accounts(self, client_id: str) -> List[Dict[str, Any]]:
+        """ Returns the client's investment accounts, or an empty list """
+
+    @abstractmethod
+    def add_investment_account(self, new_account) -> Optional[Dict[str, Any]]:
+        """ Adds an InvestmentAccount, returning the new account or None if it is invalid """
+
+    @abstractmethod
+    def delete_investment_account(self, client_id: str, investment_id: str) -> bool:
+        """ Returns True if the account was deleted """
+
+
+class BeneficiaryRepository(ABC):
+    @abstractmethod
+    def list_beneficiaries(self, client_id: str) -> List[Dict[str, Any]]:
+        """ Returns the client's beneficiaries, or an empty list """
+
+    @abstractmethod
+    def get_beneficiary(self, client_id: str, beneficiary_id: str) -> Optional[Dict[str, Any]]:
+        """ Returns a single beneficiary, or None """
+
+    @abstractmethod
+    def add_beneficiary(self, client_id: str, first_name: str, last_name: str, relationship: str) -> None:
+        """ Adds a beneficiary with a generated beneficiary_id """
+
+    @abstractmethod
+    def delete_beneficiary(self, client_id: str, beneficiary_id: str) -> None:
+        """ Deletes a beneficiary """
+
+
+# --- Factories ---
+# The managers and SqliteRepository import this module, so they are imported when called
+
+def get_client_repository(config: Optional[DataStoreConfig] = None) -> ClientRepository:
+    """ The client repository for the configured backend """
+    config = config or DataStoreConfig()
+    if config.use_sqlite:
+        from common.sqlite_repository import SqliteRepository
+        return SqliteRepository.shared(config.sqlite_path)
+    from common.client_manager import ClientManager
+    return ClientManager()
+
+def get_investment_repository(config: Optional[DataStoreConfig] = None) -> InvestmentRepository:
+    """ The investment repository for the configured backend """
+    config = config or DataStoreConfig()
+    if config.use_sqlite:
+        from common.sqlite_repository import SqliteRepository
+        return SqliteRepository.shared(config.sqlite_path)
+    from common.investment_manager import InvestmentManager
+    return InvestmentManager()
+
+def get_beneficiaries_repository(config: Optional[DataStoreConfig] = None) -> BeneficiaryRepository:
+    """ The beneficiary repository for the configured backend """
+    config = config or DataStoreConfig()
+    if config.use_sqlite:
+        from common.sqlite_repository import SqliteRepository
+        return SqliteRepository.shared(config.sqlite_path)
+    from common.beneficiaries_manager import BeneficiariesManager
+    return BeneficiariesManager()
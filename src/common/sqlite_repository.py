@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import logging
+from typing import Any, Dict, List, Optional
+
+from common.repository import BeneficiaryRepository, ClientRepository, DataStoreConfig, InvestmentRepository
+
+logger = logging.getLogger(__name__)
+
+CLIENT_FIELDS = ("first_name", "last_name", "address", "phone", "email", "marital_status")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    client_id TEXT PRIMARY KEY,
+    first_name TEXT,
+    last_name TEXT,
+    address TEXT,
+    phone TEXT,
+    email TEXT,
+    marital_status TEXT
+);
+CREATE TABLE IF NOT EXISTS investments (
+    id INTEGER PRIMARY KEY,
+    client_id TEXT NOT NULL,
+    investment_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    balance REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS investments_client_id ON investments (client_id, investment_id);
+CREATE TABLE IF NOT EXISTS beneficiaries (
+    id INTEGER PRIMARY KEY,
+    client_id TEXT NOT NULL,
+    beneficiary_id TEXT NOT NULL,
+    first_name TEXT,
+    last_name TEXT,
+    relationship TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS beneficiaries_client_id ON beneficiaries (client_id, beneficiary_id);
+"""
+
+class SqliteRepository(ClientRepository, InvestmentRepository, BeneficiaryRepository):
+    """
+    Stores clients, investments and beneficiaries in one SQLite database.
+
+    The database runs in WAL mode so readers don't block the writer, and every table is
+    indexed on client_id so a lookup or write only touches that client's rows instead of
+    rewriting the whole data set. Statements use fixed SQL with bound parameters so
+    sqlite3's statement cache reuses the prepared statements. Each thread gets its own
+    connection as sqlite3 connections can't be shared across threads.
+    """
+
+    _shared: Dict[str, "SqliteRepository"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    @classmethod
+    def shared(cls, db_path: Optional[str] = None) -> "SqliteRepository":
+        """ Returns the process-wide repository for a database """
+        db_path = os.path.abspath(db_path or DataStoreConfig().sqlite_path)
+        with cls._shared_lock:
+            repository = cls._shared.get(db_path)
+            if repository is None:
+                repository = cls(db_path)
+                cls._shared[db_path] = repository
+            return repository
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Clients ---
+
+    def get_client(self, client_id: str) -> dict:
+        try:
+            row = self._connection().execute(
+                "SELECT first_name, last_name, address, phone, email, marital_status "
+                "FROM clients WHERE client_id = ?", (client_id,)).fetchone()
+            if row is None:
+                return {"error": f"Client {client_id} not found"}
+            return dict(row)
+        except Exception as e:
+            return {"error": f"Exception occurred while retrieving Client {client_id} error: {e}"}
+
+    def add_client(self, client_id: str, first_name: str,
+                   last_name: str, address: str, phone: str,
+                   email: str, marital_status: str) -> str:
+        try:
+            with self._connection() as conn:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO clients (client_id, first_name, last_name, address, phone, email, marital_status) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (client_id, first_name, last_name, address, phone, email, marital_status))
+            if cursor.rowcount == 0:
+                return "Client already exists"
+            return f"Client {client_id} added"
+        except Exception as e:
+            return f"Exception occurred while adding Client {client_id} error: {e}"
+
+    def update_client(self, client_id: str, new_info: dict) -> str:
+        try:
+            # only known columns can be updated; anything else would never be returned by get_client
+            fields = [field for field in CLIENT_FIELDS if field in new_info]
+            if not fields:
+                return "No client fields to update"
+            assignments = ", ".join(f"{field} = ?" for field in fields)
+            with self._connection() as conn:
+                cursor = conn.execute(
+                    f"UPDATE clients SET {assignments} WHERE client_id = ?",
+                    [new_info[field] for field in fields] + [client_id])
+            if cursor.rowcount == 0:
+                return f"Client {client_id} not found"
+            return "Client information successfully updated"
+        except Exception as e:
+            return f"Exception occurred while updating client {client_id} error: {e}"
+
+    # --- Investments ---
+
+    def list_investment_accounts(self, client_id: str) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT investment_id, name, balance FROM investments WHERE client_id = ? ORDER BY id",
+            (client_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def add_investment_account(self, new_account) -> Optional[Dict[str, Any]]:
+        try:
+            if new_account.balance < 0:
+                print("Error: Balance cannot be negative.")
+                return None
+        except (TypeError, ValueError):
+            print("Error: Balance must be a numeric value.")
+            return None
+
+        while True:
+            # Use UUID for robust uniqueness, then truncate for a shorter, readable ID
+            new_investment_id = f"i-{str(uuid.uuid4())[:8]}"
+            try:
+                with self._connection() as conn:
+                    conn.execute(
+                        "INSERT INTO investments (client_id, investment_id, name, balance) VALUES (?, ?, ?, ?)",
+                        (new_account.client_id, new_investment_id, new_account.name, new_account.balance))
+                break
+            except sqlite3.IntegrityError:
+                continue  # rare collision with the truncated ID
+        return {
+            "investment_id": new_investment_id,
+            "name": new_account.name,
+            "balance": new_account.balance
+        }
+
+    def delete_investment_account(self, client_id: str, investment_id: str) -> bool:
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM investments WHERE client_id = ? AND investment_id = ?",
+                (client_id, investment_id))
+        return cursor.rowcount > 0
+
+    # --- Beneficiaries ---
+
+    def list_beneficiaries(self, client_id: str) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT beneficiary_id, first_name, last_name, relationship FROM beneficiaries "
+            "WHERE client_id = ? ORDER BY id", (client_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_beneficiary(self, client_id: str, beneficiary_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT beneficiary_id, first_name, last_name, relationship FROM beneficiaries "
+            "WHERE client_id = ? AND beneficiary_id = ?", (client_id, beneficiary_id)).fetchone()
+        return dict(row) if row is not None else None
+
+    def add_beneficiary(self, client_id: str, first_name: str, last_name: str, relationship: str) -> None:
+        while True:
+            new_id = f"b-{str(uuid.uuid4())[:8]}"
+            try:
+                with self._connection() as conn:
+                    conn.execute(
+                        "INSERT INTO beneficiaries (client_id, beneficiary_id, first_name, last_name, relationship) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (client_id, new_id, first_name, last_name, relationship))
+                break
+            except sqlite3.IntegrityError:
+                continue
+        logger.info(f"\nBeneficiary '{first_name} {last_name}' (ID: {new_id}) added to client '{client_id}'.")
+
+    def delete_beneficiary(self, client_id: str, beneficiary_id: str) -> None:
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM beneficiaries WHERE client_id = ? AND beneficiary_id = ?",
+                (client_id, beneficiary_id))
+        if cursor.rowcount > 0:
+            logger.info(f"\nBeneficiary with ID '{beneficiary_id}' deleted from client '{client_id}'.")
+        else:
+            logger.error(f"\nBeneficiary with ID '{beneficiary_id}' not found in client '{client_id}'.")
+
+    # --- Import ---
+
+    def import_json(self, clients_file: str, investments_file: str, beneficiaries_file: str) -> None:
+        """
+        Loads the existing JSON data files, replacing rows for the clients they contain.
+        Beneficiary changes still in the journal are written to the JSON file first.
+        """
+        from common.beneficiaries_manager import BeneficiariesStore
+
+        if beneficiaries_file and os.path.exists(beneficiaries_file):
+            BeneficiariesStore.for_file(beneficiaries_file).flush()
+
+        def load(path: str) -> dict:
+            if not os.path.exists(path) or os.stat(path).st_size == 0:
+                return {}
+            with open(path, 'r') as f:
+                return json.load(f)
+
+        clients = load(clients_file)
+        investments = load(investments_file)
+        beneficiaries = load(beneficiaries_file)
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO clients (client_id, first_name, last_name, address, phone, email, marital_status) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(client_id, *(client.get(field) for field in CLIENT_FIELDS)) for client_id, client in clients.items()])
+            conn.executemany("DELETE FROM investments WHERE client_id = ?", [(c,) for c in investments])
+            conn.executemany(
+                "INSERT INTO investments (client_id, investment_id, name, balance) VALUES (?, ?, ?, ?)",
+                [(client_id, i["investment_id"], i["name"], i["balance"])
+                 for client_id, accounts in investments.items() for i in accounts])
+            conn.executemany("DELETE FROM beneficiaries WHERE client_id = ?", [(c,) for c in beneficiaries])
+            conn.executemany(
+                "INSERT INTO beneficiaries (client_id, beneficiary_id, first_name, last_name, relationship) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(client_id, b["beneficiary_id"], b["first_name"], b["last_name"], b["relationship"])
+                 for client_id, people in beneficiaries.items() for b in people])
+        print(f"Imported {len(clients)} clients, {len(investments)} investment portfolios "
+              f"and {len(beneficiaries)} beneficiary lists into {self.db_path}")
+
+
+# --- Command Line Interface (CLI) Setup ---
+
+def benchmark(num_clients: int, iterations: int):
+    """
+    Times reads and writes against the JSON ClientManager and the SQLite repository
+    with num_clients clients in each.
+    """
+    from common.client_manager import ClientManager
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "clients.json")
+        clients = {
+            str(i): {"first_name": f"First{i}", "last_name": f"Last{i}", "address": f"{i} Main Street",
+                     "phone": "888-555-1212", "email": f"c{i}@example.com", "marital_status": "single"}
+            for i in range(num_clients)
+        }
+        with open(json_path, "w") as f:
+            json.dump(clients, f)
+        repository = SqliteRepository(os.path.join(tmp_dir, "bench.db"))
+        repository.import_json(json_path, "", "")
+
+        json_manager = ClientManager(json_path)
+        for name, store in (("json", json_manager), ("sqlite", repository)):
+            start = time.perf_counter()
+            for i in range(iterations):
+                store.get_client(str(i * 7 % num_clients))
+            read_ms = (time.perf_counter() - start) * 1000 / iterations
+            start = time.perf_counter()
+            for i in range(iterations):
+                store.update_client(str(i * 7 % num_clients), {"phone": f"999-555-{i:04d}"})
+            write_ms = (time.perf_counter() - start) * 1000 / iterations
+            print(f"{name:>6}: get_client {read_ms:8.3f} ms  update_client {write_ms:8.3f} ms  ({num_clients} clients)")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Manage the SQLite data store.",
+        epilog="Example usage:\n"
+               "  python -m common.sqlite_repository --import-json\n"
+               "  python -m common.sqlite_repository --benchmark 100000"
+    )
+    action_group = parser.add_mutually_exclusive_group(required=True)
+    action_group.add_argument(
+        '--import-json',
+        action='store_true',
+        help='Import data/clients.json, data/investments.json and data/beneficiaries.json into SQLITE_DB_PATH.'
+    )
+    action_group.add_argument(
+        '--benchmark',
+        type=int,
+        metavar='NUM_CLIENTS',
+        help='Compare the JSON and SQLite client stores with this many clients.'
+    )
+    parser.add_argument(
+        '--iterations',
+        type=int,
+        default=20,
+        help='Number of reads and writes to time for --benchmark.'
+    )
+    args = parser.parse_args()
+
+    if args.import_json:
+        from common.beneficiaries_manager import BENEFICIARIES_FILE
+        from common.client_manager import CLIENTS_FILE
+        from common.investment_manager import INVESTMENTS_FILE
+        SqliteRepository.shared().import_json(CLIENTS_FILE, INVESTMENTS_FILE, BENEFICIARIES_FILE)
+    else:
+        benchmark(args.benchmark, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,8 +10,9 @@ function App() {
   const [statusContent, setStatusContent] = useState('');
   const chatWindowRef = useRef(null);
   const eventCountRef = useRef(0);
-  let [isPolling, setIsPolling] = useState(false);
-  const [isWaitingForAIResponse, setIsWaitingForAIResponse] = useState(false);
+  const [isStreaming, setIsStreaming] = useState(false);
+  // bumped to open a new event stream after the API refused one (503 when it is at capacity)
+  const [streamAttempt, setStreamAttempt] = useState(0);
   const defaultHeaderText = 'Chat session started.';
   const workflow_id_prefix = 'oai-temporal-agent-';
   const [workflow_id, setWorkflowId] = useState('');
@@ -22,37 +23,49 @@ function App() {
     }
   }, [messages]);
 
-    // This useEffect hook manages the polling logic.
+  // This useEffect hook manages the event stream.
+  // The API pushes new events as soon as they are appended, so nothing is
+  // requested while the conversation is idle.
   useEffect(() => {
-    let intervalId;
+    if (!isStreaming || !workflow_id) {
+      return undefined;
+    }
 
-    if (isPolling) {
-      // Define the polling function
-      const pollApi = async () => {
-        try {
-           await fetchChatHistory(defaultHeaderText)
-        } catch (error) {
-          console.error('Error polling API:', error);
-        }
-      };
+    const eventSource = new EventSource(
+      `${API_BASE_URL}/stream-chat-history?workflow_id=${workflow_id}&from_index=${eventCountRef.current}`
+    );
 
-      // Call the function immediately on start
-      pollApi();
+    eventSource.onmessage = (event) => {
+      try {
+        const index = parseInt(event.lastEventId, 10);
+        // Ignore anything already processed (e.g. replayed after a reconnect)
+        if (!isNaN(index) && index < eventCountRef.current) {
+          return;
+        }
+        processEvents([JSON.parse(event.data)]);
+      } catch (error) {
+        console.error('Error processing event:', error);
+      }
+    };
 
-      // Set up the interval with dynamic frequency:
-      // 2 seconds when waiting for AI response, 5 seconds when waiting for user input
-      const pollingInterval = isWaitingForAIResponse ? 2000 : 5000;
-      console.log(`Setting polling interval to ${pollingInterval}ms (waiting for AI: ${isWaitingForAIResponse})`);
-      intervalId = setInterval(pollApi, pollingInterval);
-    }
+    let retryTimer;
+    eventSource.onerror = (error) => {
+      // EventSource reconnects on its own and resumes from the last event id,
+      // except after an error response, which closes it for good
+      console.error('Event stream error:', error);
+      if (eventSource.readyState === EventSource.CLOSED) {
+        retryTimer = setTimeout(() => setStreamAttempt((attempt) => attempt + 1), 5000);
+      }
+    };
 
     // The cleanup function is crucial for preventing memory leaks
     // It runs when the component unmounts or when the dependencies change
     return () => {
-      clearInterval(intervalId);
-      console.log('Polling stopped.');
+      clearTimeout(retryTimer);
+      eventSource.close();
+      console.log('Event stream closed.');
     };
-  }, [isPolling, isWaitingForAIResponse]); // The effect re-runs whenever the isPolling or isWaitingForAIResponse state changes
+  }, [isStreaming, workflow_id, streamAttempt]); // The effect re-runs whenever streaming is toggled, the workflow changes or a retry is due
 
   const handleStartChat = async () => {
     try {
@@ -72,20 +85,19 @@ function App() {
           setIsChatActive(true);
           eventCountRef.current = 0;
           setSessionId(newSessionId);
-          setIsPolling(true); // Start polling immediately when chat becomes active
-          setIsWaitingForAIResponse(false); // Start with slower polling until user sends a message
+          setIsStreaming(true); // Start streaming events immediately when chat becomes active
         } else {
           setMessages([{text: `Workflow didn't start. Error ${result.message}`, type: 'bot'}]);
-          setIsPolling(false);
+          setIsStreaming(false);
         }
       } else {
         setMessages( [{text: `Bad/invalid response from API: ${response.status}`, type: 'bot'}]);
-        setIsPolling(false);
+        setIsStreaming(false);
       }
     } catch (error) {
       console.error('Error starting chat session:', error);
       setMessages([{ text: 'Failed to start chat session.', type: 'bot' }]);
-      setIsPolling(false);
+      setIsStreaming(false);
     }
   };
 
@@ -98,7 +110,6 @@ function App() {
     const userMessage = { text: input, type: 'user' };
     setMessages(prev => [...prev, userMessage]);
     setInput('');
-    setIsWaitingForAIResponse(true); // Switch to faster polling (2s) while waiting for AI response
     console.log("before sending the prompt, messages are ", messages);
 
     try {
@@ -133,14 +144,13 @@ function App() {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ session_id: sessionId }),
       });
-      setIsPolling(false);
-      setIsWaitingForAIResponse(false); // Reset polling state
+      setIsStreaming(false);
       setMessages(prev => [...prev, { text: 'Chat session ended.', type: 'bot' }]);
       setSessionId(null);
       setIsChatActive(false);
     } catch (error) {
         console.error('Error ending chat session:', error);
-        setIsPolling(false);
+        setIsStreaming(false);
     }
   };
 
@@ -153,39 +163,26 @@ function App() {
     }
   };
 
-  const fetchChatHistory = async (headerText) => {
-    const currentEventCount = eventCountRef.current;
-    console.log("fetching chat history, event count is ", currentEventCount);
-
-    let data = null;
-    // if (!sessionId) return;
-    try {
-      const response = await fetch(`${API_BASE_URL}/get-chat-history?workflow_id=${workflow_id}&from_index=${currentEventCount}`);
-      data = await response.json();
-    } catch (error) {
-      console.error('Error fetching chat history:', error);
-      return;
-    }
-
+  const processEvents = (data) => {
     if (data === null || data.length === 0) {
       return;
     }
 
+    const currentEventCount = eventCountRef.current;
     const newEventCount = currentEventCount + data.length;
     console.log(`Processing ${data.length} new events, eventCount: ${currentEventCount} -> ${newEventCount}`);
     
     eventCountRef.current = newEventCount;
 
     const newMessages = [];
-    let receivedBotResponse = false;
     data.forEach(item => {
       switch (item.type) {
         case 'chat_interaction':
-          newMessages.push(
-            { text: item.content.user_prompt, type: 'user' },
-            { text: item.content.text_response, type: 'bot' }
-          );
-          receivedBotResponse = true;
+          newMessages.push({ text: item.content.user_prompt, type: 'user' });
+          // prompts answered together with a later one have no response of their own
+          if (item.content.text_response) {
+            newMessages.push({ text: item.content.text_response, type: 'bot' });
+          }
           break;
         case 'status_update':
           setStatusContent(item.content.status);
@@ -195,9 +192,6 @@ function App() {
       }
     });
     
-    if (receivedBotResponse) {
-      setIsWaitingForAIResponse(false);
-    }
     if (newMessages.length > 0) {
       setMessages(prev => {
         // Check if first new message is duplicate of last existing message
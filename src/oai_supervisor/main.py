@@ -19,8 +19,7 @@ from agents import (
 from common.account_context import ClientContext
 from common.agent_constants import BENE_AGENT_NAME, BENE_HANDOFF, BENE_INSTRUCTIONS, INVEST_AGENT_NAME, INVEST_HANDOFF, \
     INVEST_INSTRUCTIONS, SUPERVISOR_AGENT_NAME, SUPERVISOR_HANDOFF, SUPERVISOR_INSTRUCTIONS
-from common.beneficiaries_manager import BeneficiariesManager
-from common.investment_manager import InvestmentManager
+from common.repository import get_beneficiaries_repository, get_investment_repository
 
 ### Logging Configuration
 # logging.basicConfig(level=logging.INFO,
@@ -32,8 +31,8 @@ logger.info("Wealth Management Chatbot Example Starting")
 
 ### Managers
 
-investment_acct_mgr = InvestmentManager()
-beneficiaries_mgr = BeneficiariesManager()
+investment_acct_mgr = get_investment_repository()
+beneficiaries_mgr = get_beneficiaries_repository()
 
 ### Tools
 
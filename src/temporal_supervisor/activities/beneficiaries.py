@@ -4,7 +4,7 @@ from dataclasses import dataclass
 
 from temporalio import activity, workflow
 
-from common.beneficiaries_manager import BeneficiariesManager
+from common.repository import get_beneficiaries_repository
 
 with workflow.unsafe.imports_passed_through():
     from pydantic import BaseModel
@@ -23,26 +23,28 @@ class BeneficiaryInput:
 class Beneficiaries:
     # Note for this demo, it references a file
     # a production level version would point to a data store
+    # These are sync activities as the file I/O blocks; the worker
+    # runs them on its activity_executor thread pool
     @staticmethod
     @activity.defn
-    async def list_beneficiaries(client_id: str) -> list:
+    def list_beneficiaries(client_id: str) -> list:
         activity.logger.info(f"list_beneficiaries: Listing beneficiaries for {client_id}")
-        beneficiaries_mgr = BeneficiariesManager()
+        beneficiaries_mgr = get_beneficiaries_repository()
         return beneficiaries_mgr.list_beneficiaries(client_id)
 
     @staticmethod
     @activity.defn
-    async def add_beneficiary(new_beneficiary: Beneficiary):
+    def add_beneficiary(new_beneficiary: Beneficiary):
         activity.logger.info(f"add_beneficiary: input: {new_beneficiary.client_id}, "
                              f"{new_beneficiary.first_name}, {new_beneficiary.last_name}, "
                              f"{new_beneficiary.relationship}")
-        beneficiaries_mgr = BeneficiariesManager()
+        beneficiaries_mgr = get_beneficiaries_repository()
         beneficiaries_mgr.add_beneficiary(new_beneficiary.client_id, new_beneficiary.first_name,
                                           new_beneficiary.last_name, new_beneficiary.relationship)
 
     @staticmethod
     @activity.defn
-    async def delete_beneficiary(client_id: str, beneficiary_id: str):
+    def delete_beneficiary(client_id: str, beneficiary_id: str):
         activity.logger.info(f"delete_beneficiary: account ID {client_id}, beneficiary_id: {beneficiary_id}")
-        beneficiaries_mgr = BeneficiariesManager()
+        beneficiaries_mgr = get_beneficiaries_repository()
         beneficiaries_mgr.delete_beneficiary(client_id, beneficiary_id)
\ No newline at end of file
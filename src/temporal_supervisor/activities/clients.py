@@ -5,7 +5,7 @@ from temporalio import activity, workflow
 from temporalio.common import RetryPolicy
 
 with workflow.unsafe.imports_passed_through():
-    from common.client_manager import ClientManager
+    from common.repository import get_client_repository
 
 @dataclass
 class WealthManagementClient:
@@ -23,12 +23,12 @@ class ClientActivities:
                                maximum_interval=timedelta(seconds=30))
     @staticmethod
     @activity.defn
-    async def add_client(new_client: WealthManagementClient) -> str:
+    def add_client(new_client: WealthManagementClient) -> str:
         activity.logger.info(f"add_account. input: {new_client.first_name} "
                              f"{new_client.last_name} {new_client.address} "
                              f"{new_client.phone} {new_client.email} "
                              f"{new_client.marital_status}")
-        account_manager = ClientManager()
+        account_manager = get_client_repository()
         return account_manager.add_client(client_id=new_client.client_id,
                                           first_name=new_client.first_name,
                                           last_name=new_client.last_name,
@@ -39,9 +39,9 @@ class ClientActivities:
 
     @staticmethod
     @activity.defn
-    async def get_client(client_id: str) -> WealthManagementClient | None:
+    def get_client(client_id: str) -> WealthManagementClient | None:
         activity.logger.info(f"get_client. input: {client_id}")
-        client_manager = ClientManager()
+        client_manager = get_client_repository()
         client_dict = client_manager.get_client(client_id=client_id)
         activity.logger.info(f"client_dict is {client_dict}")
         if "error" in client_dict:
@@ -57,9 +57,9 @@ class ClientActivities:
 
     @staticmethod
     @activity.defn
-    async def update_client(client_id: str, field_dict: dict) -> str:
+    def update_client(client_id: str, field_dict: dict) -> str:
         activity.logger.info(f"update_client. input: {field_dict}")
-        client_manager = ClientManager()
+        client_manager = get_client_repository()
         result = client_manager.update_client(client_id, field_dict)
         activity.logger.info(f"The result of updating client: {result}")
         return result
@@ -10,6 +10,8 @@ class EventStreamActivities:
     Activities for event stream operations.
     
     These are lightweight operations for Redis-based event streaming.
+    The managers share the process-wide Redis connection pool, so there is
+    nothing to open or close per call.
     """
     
     @staticmethod
@@ -17,30 +19,33 @@ class EventStreamActivities:
     async def append_chat_interaction(workflow_id: str, chat_interaction: ChatInteraction) -> int:
         """Append a chat interaction to the event stream"""
         manager = EventStreamManager()
-        try:
-            sequence = await manager.append_chat_interaction(
-                workflow_id=workflow_id,
-                chat_interaction=chat_interaction
-            )
-            activity.logger.info(f"Appended chat interaction to stream {workflow_id}, sequence {sequence}")
-            return sequence
-        finally:
-            await manager.close()
+        sequence = await manager.append_chat_interaction(
+            workflow_id=workflow_id,
+            chat_interaction=chat_interaction
+        )
+        activity.logger.info(f"Appended chat interaction to stream {workflow_id}, sequence {sequence}")
+        return sequence
     
+    @staticmethod
+    @activity.defn
+    async def append_events(workflow_id: str, events: list[ChatInteraction | StatusUpdate]) -> int:
+        """Append a batch of chat interactions and status updates to the event stream in one round trip"""
+        manager = EventStreamManager()
+        sequence = await manager.append_events(workflow_id=workflow_id, domain_objects=events)
+        activity.logger.info(f"Appended {len(events)} events to stream {workflow_id}, sequence {sequence}")
+        return sequence
+
     @staticmethod
     @activity.defn
     async def append_status_update(workflow_id: str, status_update: StatusUpdate) -> int:
         """Append a status update to the event stream"""
         manager = EventStreamManager()
-        try:
-            sequence = await manager.append_status_update(
-                workflow_id=workflow_id,
-                status_update=status_update
-            )
-            activity.logger.info(f"Appended status update to stream {workflow_id}, sequence {sequence}")
-            return sequence
-        finally:
-            await manager.close()
+        sequence = await manager.append_status_update(
+            workflow_id=workflow_id,
+            status_update=status_update
+        )
+        activity.logger.info(f"Appended status update to stream {workflow_id}, sequence {sequence}")
+        return sequence
     
 
     @staticmethod
@@ -48,7 +53,4 @@ class EventStreamActivities:
     async def delete_conversation(workflow_id: str) -> bool:
         """Delete the conversation for a workflow"""
         manager = EventStreamManager()
-        try:
-            return await manager.delete_stream(workflow_id)
-        finally:
-            await manager.close()
\ No newline at end of file
+        return await manager.delete_stream(workflow_id)
\ No newline at end of file
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from temporalio import activity
+
+from common.redis_config import RedisConfig
+from common.redis_pool import get_redis_client
+from common.util import str_to_bool
+
+GUARDRAIL_CACHE_KEY_PREFIX = "guardrail-verdict:"
+
+def normalize_guardrail_input(text: str) -> str:
+    """
+    Lowercases, drops punctuation and replaces numbers (client ids, amounts) with a
+    placeholder so "Yes!", "yes" and "client 123" / "client 456" share a verdict
+    """
+    text = re.sub(r"\d+", "0", text.lower())
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+def guardrail_cache_key(agent_name: str, last_message: str) -> str:
+    """ The cache key for a message sent to agent_name. Pure, so it can be computed in the workflow """
+    digest = hashlib.sha256(f"{agent_name}\n{normalize_guardrail_input(last_message)}".encode()).hexdigest()
+    return f"{GUARDRAIL_CACHE_KEY_PREFIX}{digest}"
+
+@dataclass
+class GuardrailCacheConfig:
+    """
+    Environment Variables:
+        GUARDRAIL_CACHE_ENABLED: Cache routing guardrail verdicts (default: True)
+        GUARDRAIL_CACHE_USE_REDIS: Share verdicts across workers through Redis (default: False)
+        GUARDRAIL_CACHE_TTL_SECONDS: How long a verdict is reused (default: 86400)
+        GUARDRAIL_CACHE_MAX_ENTRIES: Verdicts kept in memory per worker (default: 10000)
+    """
+
+    enabled: bool = True
+    use_redis: bool = False
+    ttl_seconds: int = 86400
+    max_entries: int = 10000
+
+    def __post_init__(self):
+        """ Load configuration from environment variables if available """
+        self.enabled = str_to_bool(os.getenv("GUARDRAIL_CACHE_ENABLED", str(self.enabled)))
+        self.use_redis = str_to_bool(os.getenv("GUARDRAIL_CACHE_USE_REDIS", str(self.use_redis)))
+        self.ttl_seconds = int(os.getenv("GUARDRAIL_CACHE_TTL_SECONDS", self.ttl_seconds))
+        self.max_entries = int(os.getenv("GUARDRAIL_CACHE_MAX_ENTRIES", self.max_entries))
+
+#
+# Verdicts are shared by every conversation on the worker, and with
+# use_redis across workers. The workflow only talks to it through the
+# local activities below, so a cache hit is recorded in history and
+# replays the same way no matter what the cache holds later.
+#
+class GuardrailVerdictCache:
+
+    def __init__(self, config: Optional[GuardrailCacheConfig] = None):
+        self.config = config or GuardrailCacheConfig()
+        self.hits = 0
+        self.misses = 0
+        # key -> (expires at, verdict)
+        self._entries: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            return entry[1]
+        self._entries.pop(key, None)
+
+        if self.config.use_redis:
+            value = await get_redis_client(RedisConfig()).get(key)
+            if value is not None:
+                verdict = json.loads(value)
+                self._put_local(key, verdict)
+                return verdict
+        return None
+
+    async def put(self, key: str, verdict: dict) -> None:
+        self._put_local(key, verdict)
+        if self.config.use_redis:
+            await get_redis_client(RedisConfig()).set(key, json.dumps(verdict), ex=self.config.ttl_seconds)
+
+    def _put_local(self, key: str, verdict: dict) -> None:
+        self._entries[key] = (time.monotonic() + self.config.ttl_seconds, verdict)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.max_entries:
+            self._entries.popitem(last=False)
+
+_cache: Optional[GuardrailVerdictCache] = None
+
+def verdict_cache() -> GuardrailVerdictCache:
+    """ The worker wide cache """
+    global _cache
+    if _cache is None:
+        _cache = GuardrailVerdictCache()
+    return _cache
+
+class GuardrailCacheActivities:
+    """
+    Local activities the routing guardrail uses to look up and store verdicts.
+    """
+
+    @staticmethod
+    @activity.defn
+    async def lookup_verdict(key: str) -> Optional[dict]:
+        cache = verdict_cache()
+        if not cache.config.enabled:
+            return None
+        verdict = await cache.get(key)
+        meter = activity.metric_meter()
+        if verdict is None:
+            cache.misses += 1
+            meter.create_counter("guardrail_cache_misses", "Guardrail verdicts that needed a model call").add(1)
+        else:
+            cache.hits += 1
+            meter.create_counter("guardrail_cache_hits", "Guardrail verdicts served from the cache").add(1)
+        activity.logger.info(f"Guardrail cache {'miss' if verdict is None else 'hit'}, "
+                             f"hit rate {cache.hit_rate:.0%} ({cache.hits}/{cache.hits + cache.misses})")
+        return verdict
+
+    @staticmethod
+    @activity.defn
+    async def store_verdict(key: str, verdict: dict) -> None:
+        cache = verdict_cache()
+        if cache.config.enabled:
+            await cache.put(key, verdict)
@@ -1,4 +1,7 @@
+import asyncio
+import time
 from dataclasses import asdict
+from typing import Optional
 
 from temporalio import workflow, activity
 from temporalio.client import WorkflowHandle, Client
@@ -28,18 +31,33 @@ async def open_new_investment_account(account_input: OpenInvestmentAccountInput)
     return child_workflow_id
 
 class OpenAccount:
+    # Fallback client used outside of an activity (e.g. scripts). Connecting
+    # is expensive (TLS, plugins) so it is done once and reused.
+    _client: Optional[Client] = None
+
+    @staticmethod
+    async def get_temporal_client() -> Client:
+        # inside an activity, reuse the worker's already connected client
+        try:
+            return activity.client()
+        except RuntimeError:
+            pass
+
+        if OpenAccount._client is None:
+            client_helper = ClientHelper()
+            print(f"(OpenAccount.get_temporal_client) address is {client_helper.address}")
+            OpenAccount._client = await Client.connect(target_host=client_helper.address,
+                                                       namespace=client_helper.namespace,
+                                                       tls=client_helper.get_tls_config(),
+                                                       plugins=[
+                                                          # OpenAIAgentsPlugin(),
+                                                          ClaimCheckPlugin()
+                                                       ])
+        return OpenAccount._client
 
     @staticmethod
     async def get_workflow_handle(workflow_id) -> WorkflowHandle:
-        client_helper = ClientHelper()
-        print(f"(OpenAccount.get_temporal_client) address is {client_helper.address}")
-        the_client = await Client.connect(target_host=client_helper.address,
-                                          namespace=client_helper.namespace,
-                                          tls=client_helper.get_tls_config(),
-                                          plugins=[
-                                             # OpenAIAgentsPlugin(),
-                                             ClaimCheckPlugin()
-                                         ])
+        the_client = await OpenAccount.get_temporal_client()
         return the_client.get_workflow_handle_for(OpenInvestmentAccountWorkflow.run, workflow_id)
 
     @staticmethod
@@ -67,3 +85,24 @@ class OpenAccount:
         result = await handle.execute_update(OpenInvestmentAccountWorkflow.update_client_details,
                                              args=[client_details_dict])
         return result
+
+
+async def benchmark(iterations: int = 20):
+    """ Compares connecting per call (the old behavior) with the cached client """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        OpenAccount._client = None
+        await OpenAccount.get_workflow_handle("benchmark")
+    uncached = (time.perf_counter() - start) / iterations
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await OpenAccount.get_workflow_handle("benchmark")
+    cached = (time.perf_counter() - start) / iterations
+
+    print(f"connect per call: {uncached * 1000:.2f} ms/call")
+    print(f"cached client:    {cached * 1000:.2f} ms/call")
+
+if __name__ == '__main__':
+    # requires a running Temporal service, e.g. temporal server start-dev
+    asyncio.run(benchmark())
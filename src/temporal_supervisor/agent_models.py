@@ -0,0 +1,151 @@
+"""
+Per-Agent Model Configuration for the Worker
+
+Agents in the workflow leave their model unset and name themselves in their model
+settings' metadata (agent_model_settings), since the workflow can't read the
+environment. The MeteredModel that CustomModelProvider in run_worker.py hands out
+reads that name on every call and picks the real model and model settings here.
+Lightweight steps like the routing guardrail and the supervisor's triage default to a
+faster, cheaper model.
+
+Environment Variables:
+    DEFAULT_MODEL: Model for agents without their own entry (default: gpt-4o)
+    <AGENT>_MODEL: Model for one agent, the agent name upper-cased with underscores,
+        e.g. ROUTING_GUARDRAIL_MODEL, SUPERVISOR_AGENT_MODEL, BENEFICIARY_AGENT_MODEL
+    <AGENT>_TEMPERATURE: Its temperature, e.g. ROUTING_GUARDRAIL_TEMPERATURE
+    <AGENT>_MAX_TOKENS: Its output token limit, e.g. ROUTING_GUARDRAIL_MAX_TOKENS
+
+Every model call records agent_model_latency, agent_model_requests,
+agent_model_input_tokens and agent_model_output_tokens with agent and model
+attributes, so the cost and speed of each choice can be compared.
+"""
+
+import os
+import re
+import time
+from dataclasses import dataclass, field, replace
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+
+from agents import Model, ModelSettings
+from temporalio import activity
+
+from common.agent_constants import BENE_AGENT_NAME, INVEST_AGENT_NAME, OPEN_ACCOUNT_AGENT_NAME, \
+    ROUTING_GUARDRAIL_NAME, SUPERVISOR_AGENT_NAME
+
+AGENT_NAMES = [ROUTING_GUARDRAIL_NAME, SUPERVISOR_AGENT_NAME, BENE_AGENT_NAME, INVEST_AGENT_NAME,
+               OPEN_ACCOUNT_AGENT_NAME]
+
+# model settings metadata entry naming the agent; MeteredModel removes it before calling the model
+AGENT_METADATA_KEY = "agent"
+
+def agent_model_settings(agent_name: str) -> ModelSettings:
+    """ The model settings of an agent in the workflow, so the worker knows whose call it is """
+    return ModelSettings(metadata={AGENT_METADATA_KEY: agent_name})
+
+def split_agent_name(model_settings: ModelSettings) -> Tuple[Optional[str], ModelSettings]:
+    """ The agent named by agent_model_settings and the settings without that name """
+    metadata = dict(model_settings.metadata or {})
+    agent_name = metadata.pop(AGENT_METADATA_KEY, None)
+    return agent_name, replace(model_settings, metadata=metadata or None)
+
+def env_prefix(agent_name: str) -> str:
+    """ "Routing Guardrail" -> "ROUTING_GUARDRAIL" """
+    return re.sub(r"\W+", "_", agent_name).strip("_").upper()
+
+@dataclass
+class AgentModel:
+    model: Optional[str] = None
+    settings: ModelSettings = field(default_factory=ModelSettings)
+
+def _default_agent_models() -> Dict[str, AgentModel]:
+    # classification and triage only need a small model; the guardrail's output is not capped
+    # because its answer is structured JSON and a truncated answer can't be parsed
+    return {
+        ROUTING_GUARDRAIL_NAME: AgentModel("gpt-4o-mini", ModelSettings(temperature=0)),
+        SUPERVISOR_AGENT_NAME: AgentModel("gpt-4o-mini", ModelSettings(temperature=0)),
+    }
+
+@dataclass
+class AgentModelConfig:
+    """
+    Model and model settings per agent name, see the module docstring for the environment variables
+    """
+
+    default_model: str = "gpt-4o"
+    agents: Dict[str, AgentModel] = field(default_factory=_default_agent_models)
+
+    def __post_init__(self):
+        """ Load configuration from environment variables if available """
+        self.default_model = os.getenv("DEFAULT_MODEL", self.default_model)
+        for agent_name in AGENT_NAMES:
+            prefix = env_prefix(agent_name)
+            entry = self.agents.setdefault(agent_name, AgentModel())
+            entry.model = os.getenv(f"{prefix}_MODEL", entry.model)
+            temperature = os.getenv(f"{prefix}_TEMPERATURE")
+            max_tokens = os.getenv(f"{prefix}_MAX_TOKENS")
+            if temperature is not None:
+                entry.settings.temperature = float(temperature)
+            if max_tokens is not None:
+                entry.settings.max_tokens = int(max_tokens)
+
+    def resolve(self, agent_name: Optional[str], model_name: Optional[str] = None) -> Tuple[str, ModelSettings]:
+        """
+        The model and settings for an agent's call: the model the agent set, if any,
+        else the one configured for the agent, else the default model. Runs started
+        when agents set their model to their own name still resolve by that name.
+        """
+        if model_name in self.agents:
+            agent_name, model_name = model_name, None
+        entry = self.agents.get(agent_name) if agent_name else None
+        if entry is None:
+            return model_name or self.default_model, ModelSettings()
+        return model_name or entry.model or self.default_model, entry.settings
+
+#
+# Picks the model for the agent named in the model settings of each call,
+# applies the configured settings on top of the ones the agent sent (the
+# configuration wins) and records latency and token usage per agent and
+# model on the activity's metric meter.
+#
+class MeteredModel(Model):
+
+    def __init__(self, config: AgentModelConfig, model_name: Optional[str], make_model: Callable[[str], Model]):
+        self.config = config
+        # what the agent set as its model, None for most agents
+        self.model_name = model_name
+        self.make_model = make_model
+
+    def _resolve(self, model_settings: ModelSettings) -> Tuple[str, str, Model, ModelSettings]:
+        agent_name, model_settings = split_agent_name(model_settings)
+        resolved_name, settings = self.config.resolve(agent_name, self.model_name)
+        agent_name = agent_name or self.model_name or "default"
+        return agent_name, resolved_name, self.make_model(resolved_name), model_settings.resolve(settings)
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs,
+                           tracing, *, previous_response_id, conversation_id, prompt):
+        agent_name, resolved_name, model, model_settings = self._resolve(model_settings)
+        start = time.perf_counter()
+        response = await model.get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs,
+            tracing, previous_response_id=previous_response_id, conversation_id=conversation_id, prompt=prompt)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        usage = response.usage
+
+        if activity.in_activity():
+            attributes = {"agent": agent_name, "model": resolved_name}
+            meter = activity.metric_meter().with_additional_attributes(attributes)
+            meter.create_histogram("agent_model_latency", "Model call latency", "ms").record(int(elapsed_ms))
+            meter.create_counter("agent_model_requests", "Model calls").add(1)
+            meter.create_counter("agent_model_input_tokens", "Prompt tokens sent").add(usage.input_tokens)
+            meter.create_counter("agent_model_output_tokens", "Completion tokens received").add(usage.output_tokens)
+            activity.logger.info(f"{agent_name} on {resolved_name}: {elapsed_ms:.0f} ms, "
+                                 f"{usage.input_tokens} input and {usage.output_tokens} output tokens")
+        return response
+
+    def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs,
+                        tracing, *, previous_response_id, conversation_id, prompt) -> AsyncIterator:
+        # workflows don't stream, this is only here to complete the Model interface
+        _, _, model, model_settings = self._resolve(model_settings)
+        return model.stream_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs,
+            tracing, previous_response_id=previous_response_id, conversation_id=conversation_id, prompt=prompt)
@@ -1,55 +1,313 @@
-import uuid
-import redis.asyncio as redis
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from typing import Iterable, List, Optional
 
 from temporalio.api.common.v1 import Payload
 from temporalio.converter import PayloadCodec
+from temporalio.runtime import Runtime
 
 from common.redis_config import RedisConfig
+from common.redis_pool import get_redis_client
+from common.util import str_to_bool
 
+CLAIM_CHECK_KEY_PREFIX = "claim-check:"
+
+# how long a key this codec stored or refreshed is trusted without asking Redis again
+# when there is no TTL; keeps in-use keys fresh for the sweeper's idle-time check
+KNOWN_KEY_REFRESH_SECONDS = 300
+
+@dataclass
+class ClaimCheckConfig:
+    """
+    Tuning for the claim check codec
+
+    Environment Variables:
+        CLAIM_CHECK_BATCH_SIZE: Max payloads per MSET/MGET round trip (default: 100)
+        CLAIM_CHECK_MAX_IN_FLIGHT: Max concurrent round trips for one encode/decode call (default: 4)
+        CLAIM_CHECK_THRESHOLD_BYTES: Payloads this size or smaller stay inline (default: 0, claim check everything)
+        CLAIM_CHECK_KNOWN_KEYS: How many recently stored keys to remember so repeats skip Redis (default: 10000)
+        CLAIM_CHECK_TTL_SECONDS: Expire claim checks this long after they were last stored (default: 0, never)
+        CLAIM_CHECK_REFRESH_ON_DECODE: Reset the TTL when a claim check is read (default: False)
+        CLAIM_CHECK_CACHE_BYTES: Size of the in-process decode cache (default: 67108864, 0 disables it)
+    """
+
+    batch_size: int = 100
+    max_in_flight: int = 4
+    threshold_bytes: int = 0
+    known_keys: int = 10000
+    ttl_seconds: int = 0
+    refresh_on_decode: bool = False
+    cache_bytes: int = 64 * 1024 * 1024
+
+    def __post_init__(self):
+        """ Load configuration from environment variables if available """
+        self.batch_size = int(os.getenv("CLAIM_CHECK_BATCH_SIZE", self.batch_size))
+        self.max_in_flight = int(os.getenv("CLAIM_CHECK_MAX_IN_FLIGHT", self.max_in_flight))
+        self.threshold_bytes = int(os.getenv("CLAIM_CHECK_THRESHOLD_BYTES", self.threshold_bytes))
+        self.known_keys = int(os.getenv("CLAIM_CHECK_KNOWN_KEYS", self.known_keys))
+        self.ttl_seconds = int(os.getenv("CLAIM_CHECK_TTL_SECONDS", self.ttl_seconds))
+        self.refresh_on_decode = str_to_bool(os.getenv("CLAIM_CHECK_REFRESH_ON_DECODE", str(self.refresh_on_decode)))
+        self.cache_bytes = int(os.getenv("CLAIM_CHECK_CACHE_BYTES", self.cache_bytes))
+
+    @property
+    def known_key_refresh_seconds(self) -> float:
+        """ How long a stored key is trusted before the codec goes back to Redis, which refreshes it """
+        return self.ttl_seconds / 2 if self.ttl_seconds else KNOWN_KEY_REFRESH_SECONDS
+
+@dataclass
+class ClaimCheckMetrics:
+    """
+    Running totals for a codec. The same values are also emitted as counters on the
+    Temporal runtime's metric meter, so they show up wherever worker metrics are exported.
+    """
+
+    payloads_offloaded: int = 0
+    payloads_inline: int = 0
+    payloads_deduplicated: int = 0
+    bytes_offloaded: int = 0
+    bytes_written: int = 0
+    bytes_saved: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+    def __post_init__(self):
+        meter = Runtime.default().metric_meter
+        self._offloaded_counter = meter.create_counter(
+            "claim_check_payloads_offloaded", "Payloads stored in Redis")
+        self._inline_counter = meter.create_counter(
+            "claim_check_payloads_inline", "Payloads below the threshold left inline")
+        self._bytes_saved_counter = meter.create_counter(
+            "claim_check_bytes_saved", "Bytes kept out of Temporal history by claim checks", "By")
+        self._deduplicated_counter = meter.create_counter(
+            "claim_check_payloads_deduplicated", "Offloaded payloads that were already stored in Redis")
+        self._bytes_written_counter = meter.create_counter(
+            "claim_check_bytes_written", "Bytes written to Redis", "By")
+        self._cache_hits_counter = meter.create_counter(
+            "claim_check_cache_hits", "Claim checks decoded from the local cache")
+        self._cache_misses_counter = meter.create_counter(
+            "claim_check_cache_misses", "Claim checks fetched from Redis")
+
+    def record_inline(self, count: int) -> None:
+        if count:
+            self.payloads_inline += count
+            self._inline_counter.add(count)
+
+    def record_offloaded(self, count: int, original_bytes: int, claim_check_bytes: int) -> None:
+        self.payloads_offloaded += count
+        self.bytes_offloaded += original_bytes
+        self.bytes_saved += original_bytes - claim_check_bytes
+        self._offloaded_counter.add(count)
+        self._bytes_saved_counter.add(max(0, original_bytes - claim_check_bytes))
+
+    def record_written(self, written_bytes: int, deduplicated: int) -> None:
+        self.bytes_written += written_bytes
+        self.payloads_deduplicated += deduplicated
+        self._bytes_written_counter.add(written_bytes)
+        if deduplicated:
+            self._deduplicated_counter.add(deduplicated)
+
+    def record_cache(self, hits: int, misses: int) -> None:
+        self.cache_hits += hits
+        self.cache_misses += misses
+        if hits:
+            self._cache_hits_counter.add(hits)
+        if misses:
+            self._cache_misses_counter.add(misses)
+
+#
+# LRU of serialized payloads by claim check id, bounded by their total size.
+# Claim checks are content addressed and never change, so entries never go stale.
 #
-# Substitutes the payload for a GUID
-# and stores the original payload in Redis
+class DecodeCache:
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes or key in self._entries:
+            return
+        self._entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+#
+# Substitutes the payload for a key derived from its content
+# and stores the original payload in Redis under that key.
+# Identical payloads share one key, so they are only written once.
+# Payloads at or below threshold_bytes are left as they are.
+# With ttl_seconds set, keys expire unless they are stored again
+# (or read, with refresh_on_decode) within the TTL.
+# Decoded and encoded payloads are kept in a local DecodeCache so replays
+# don't go back to Redis; cache hits do not refresh the TTL.
 #
 class ClaimCheckCodec(PayloadCodec):
 
-    def __init__(self, config: RedisConfig):
-        self.redis_client = redis.Redis(host=config.hostname, port=config.port)
+    def __init__(self, config: RedisConfig, claim_check_config: Optional[ClaimCheckConfig] = None):
+        # connections come from the shared pool which is closed
+        # when the process shuts down (see close_redis_pools)
+        self.redis_client = get_redis_client(config)
+        self.claim_check_config = claim_check_config or ClaimCheckConfig()
+        self.metrics = ClaimCheckMetrics()
+        # keys this codec recently stored or refreshed -> when (time.monotonic())
+        self._known_keys: "OrderedDict[str, float]" = OrderedDict()
+        self.cache = DecodeCache(self.claim_check_config.cache_bytes) \
+            if self.claim_check_config.cache_bytes > 0 else None
+
+    async def _run_batched(self, items: list, fn) -> list:
+        """
+        Splits items into batches of batch_size and runs fn on each, with at most
+        max_in_flight batches talking to Redis at once. Results keep their order.
+        """
+        batch_size = max(1, self.claim_check_config.batch_size)
+        batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        if len(batches) == 1:
+            return await fn(batches[0])
+
+        semaphore = asyncio.Semaphore(max(1, self.claim_check_config.max_in_flight))
+
+        async def run(batch: list) -> list:
+            async with semaphore:
+                return await fn(batch)
+
+        results = await asyncio.gather(*[run(batch) for batch in batches])
+        return [result for batch_result in results for result in batch_result]
 
-    #
-    # TODO: Figure out when/how to close the redis_client
-    #       Can't be done in a __del__ as it aClose() needs to be awaited
-    #
     async def encode(self, payloads: Iterable[Payload]) -> List[Payload]:
-        out: list[Payload] = []
-        for p in payloads:
-            encoded = await self.encode_payload(p)
-            out.append(encoded)
+        out: List[Payload] = list(payloads)
+        threshold = self.claim_check_config.threshold_bytes
+        offload = [i for i, p in enumerate(out) if p.ByteSize() > threshold]
+        self.metrics.record_inline(len(out) - len(offload))
+        if not offload:
+            return out
 
+        encoded = await self._run_batched([out[i] for i in offload], self._encode_batch)
+        for i, claim_check in zip(offload, encoded):
+            out[i] = claim_check
         return out
 
     async def decode(self, payloads: Iterable[Payload]) -> List[Payload]:
-        out: List[Payload] = []
-        for p in payloads:
-            if p.metadata.get("temporal.io/claim-check-codec", b"").decode() != "v1":
-                out.append(p)
-                continue
-
-            redis_id = p.data.decode("utf-8")
-            value = await self.redis_client.get(redis_id)
-            new_payload = Payload.FromString(value)
-            out.append(new_payload)
+        out: List[Payload] = list(payloads)
+        claim_checked = [
+            i for i, p in enumerate(out)
+            if p.metadata.get("temporal.io/claim-check-codec", b"").decode() == "v1"
+        ]
+        if not claim_checked:
+            return out
+
+        redis_ids = [out[i].data.decode("utf-8") for i in claim_checked]
+        values = [self.cache.get(id) for id in redis_ids] if self.cache is not None else [None] * len(redis_ids)
+        # one fetch per distinct id that isn't cached
+        missing = list(dict.fromkeys(id for id, value in zip(redis_ids, values) if value is None))
+        self.metrics.record_cache(len(redis_ids) - len(missing), len(missing))
+        if missing:
+            fetched = dict(zip(missing, await self._run_batched(missing, self._fetch_batch)))
+            values = [fetched[id] if value is None else value for id, value in zip(redis_ids, values)]
+
+        for i, redis_id, value in zip(claim_checked, redis_ids, values):
+            if value is None:
+                raise ValueError(f"Claim check {redis_id} was not found in Redis")
+            if self.cache is not None:
+                self.cache.put(redis_id, value)
+            out[i] = Payload.FromString(value)
         return out
 
-    async def encode_payload(self, payload: Payload) -> Payload:
-        id = str(uuid.uuid4())
-        value = payload.SerializeToString()
-        await self.redis_client.set(id, value)
-        out = Payload(
+    @staticmethod
+    def content_key(value: bytes) -> str:
+        """ The Redis key for a serialized payload """
+        return f"{CLAIM_CHECK_KEY_PREFIX}{hashlib.sha256(value).hexdigest()}"
+
+    def _recently_stored(self, key: str, now: float) -> bool:
+        """ Whether key is certainly still in Redis, so it doesn't need to be checked """
+        stored_at = self._known_keys.get(key)
+        return stored_at is not None and now - stored_at < self.claim_check_config.known_key_refresh_seconds
+
+    def _remember(self, keys: Iterable[str], now: float) -> None:
+        for key in keys:
+            self._known_keys[key] = now
+            self._known_keys.move_to_end(key)
+        while len(self._known_keys) > self.claim_check_config.known_keys:
+            self._known_keys.popitem(last=False)
+
+    async def _encode_batch(self, payloads: List[Payload]) -> List[Payload]:
+        """
+        Stores a batch of payloads. Keys already in Redis are found (and refreshed) with
+        one pipelined round trip and only the missing ones are written.
+        """
+        values = [p.SerializeToString() for p in payloads]
+        ids = [self.content_key(v) for v in values]
+        ttl = self.claim_check_config.ttl_seconds
+        now = time.monotonic()
+
+        # the dict also collapses duplicates within the batch
+        candidates = {id: v for id, v in zip(ids, values) if not self._recently_stored(id, now)}
+        to_store = {}
+        if candidates:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for id in candidates:
+                # both report whether the key exists; EXPIRE resets the TTL
+                # and TOUCH resets the idle time the sweeper looks at
+                if ttl:
+                    pipe.expire(id, ttl)
+                else:
+                    pipe.touch(id)
+            exists = await pipe.execute()
+            to_store = {id: v for (id, v), found in zip(candidates.items(), exists) if not found}
+            if to_store and ttl:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for id, v in to_store.items():
+                    pipe.set(id, v, ex=ttl)
+                await pipe.execute()
+            elif to_store:
+                await self.redis_client.mset(to_store)
+            self._remember(candidates, now)
+
+        if self.cache is not None:
+            for id, v in zip(ids, values):
+                self.cache.put(id, v)
+        self.metrics.record_written(sum(len(v) for v in to_store.values()),
+                                    len(payloads) - len(to_store))
+        out = [self._claim_check_payload(id) for id in ids]
+        self.metrics.record_offloaded(len(out),
+                                      sum(len(v) for v in values),
+                                      sum(p.ByteSize() for p in out))
+        return out
+
+    async def _fetch_batch(self, redis_ids: List[str]) -> List[Optional[bytes]]:
+        """ Retrieves a batch of payloads with a single MGET, or pipelined GETEX to refresh the TTL """
+        ttl = self.claim_check_config.ttl_seconds
+        if not (ttl and self.claim_check_config.refresh_on_decode):
+            return await self.redis_client.mget(redis_ids)
+        pipe = self.redis_client.pipeline(transaction=False)
+        for id in redis_ids:
+            pipe.getex(id, ex=ttl)
+        return await pipe.execute()
+
+    @staticmethod
+    def _claim_check_payload(id: str) -> Payload:
+        return Payload(
             metadata= {
                 "encoding": b"claim-checked",
                 "temporal.io/claim-check-codec": b"v1",
             },
             data=id.encode("utf-8"),
         )
-        return out
+
+    async def encode_payload(self, payload: Payload) -> Payload:
+        return (await self._encode_batch([payload]))[0]
@@ -1,28 +1,42 @@
 import os
+from typing import Optional
 
 from temporalio.client import Plugin, ClientConfig
 from temporalio.converter import DataConverter
 
 from common.redis_config import RedisConfig
 from common.util import str_to_bool
-from temporal_supervisor.claim_check.claim_check_codec import ClaimCheckCodec
+from temporal_supervisor.claim_check.claim_check_codec import ClaimCheckCodec, ClaimCheckConfig
+from temporal_supervisor.claim_check.compression_codec import CompressionCodec, PayloadCodecChain
 
 class ClaimCheckPlugin(Plugin):
-    def __init__(self):
+    def __init__(self, threshold_bytes: Optional[int] = None):
         self.useClaimCheck = str_to_bool(os.getenv("USE_CLAIM_CHECK", "False"))
+        self.useCompression = str_to_bool(os.getenv("USE_COMPRESSION", "False"))
 
         # Redis configuration
         self.redis_config = RedisConfig()
 
+        # Codec tuning, loaded from the environment unless overridden here
+        self.claim_check_config = ClaimCheckConfig()
+        if threshold_bytes is not None:
+            self.claim_check_config.threshold_bytes = threshold_bytes
+
     def get_data_converter(self, config: ClientConfig) -> DataConverter:
         default_converter_class = config["data_converter"].payload_converter_class
+        codecs = []
+        # compression runs first so the claim check stores (and the threshold sees) the smaller payload
+        if self.useCompression:
+            print(f"using compression codec {self.useCompression}")
+            codecs.append(CompressionCodec())
         if self.useClaimCheck:
             print(f"using claim check codec {self.useClaimCheck}")
-            claim_check_codec = ClaimCheckCodec(self.redis_config)
+            codecs.append(ClaimCheckCodec(self.redis_config, self.claim_check_config))
 
+        if codecs:
             return DataConverter(
                 payload_converter_class=default_converter_class,
-                payload_codec=claim_check_codec
+                payload_codec=codecs[0] if len(codecs) == 1 else PayloadCodecChain(codecs)
             )
         else:
             return DataConverter(
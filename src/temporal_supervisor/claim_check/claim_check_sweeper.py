@@ -0,0 +1,163 @@
+"""
+Claim Check Sweeper
+
+Deletes claim-checked payloads in Redis that are no longer referenced by any workflow
+history Temporal still has. It is meant to run offline (e.g. from cron) next to
+CLAIM_CHECK_TTL_SECONDS, which handles keys on its own once they stop being used.
+
+The sweep:
+    1. SCANs Redis for claim check keys (and, with --include-legacy, the older uuid keys)
+    2. Fetches the raw history of every workflow matching --query and collects the claim
+       check ids it references. The client is connected without the claim check codec so
+       the references are not resolved.
+    3. Deletes the keys found in step 1 that are not referenced and have not been touched for
+       --min-idle-seconds. The idle check protects payloads that a worker just stored but
+       that are not in a history yet. A codec only touches a key it reuses once it has not
+       done so for its refresh window (CLAIM_CHECK_TTL_SECONDS / 2, or 300s without a TTL),
+       so --min-idle-seconds must be longer than that window.
+
+The counts are printed and returned; a one-shot run does not export metrics.
+
+Example:
+    python -m temporal_supervisor.claim_check.claim_check_sweeper --dry-run
+"""
+
+import argparse
+import asyncio
+import re
+from dataclasses import dataclass
+from typing import Set
+
+from google.protobuf.message import Message
+from temporalio.api.common.v1 import Payload
+from temporalio.client import Client
+
+from common.client_helper import ClientHelper
+from common.redis_config import RedisConfig
+from common.redis_pool import close_redis_pools, get_redis_client
+from temporal_supervisor.claim_check.claim_check_codec import CLAIM_CHECK_KEY_PREFIX, ClaimCheckConfig
+
+LEGACY_KEY_PATTERN = re.compile(rb"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+# All retained workflows, so payloads of closed workflows still decode in the UI
+DEFAULT_QUERY = ""
+
+@dataclass
+class SweepResult:
+    keys_reclaimed: int = 0
+    bytes_reclaimed: int = 0
+    keys_kept: int = 0
+
+def collect_claim_check_ids(message: Message, ids: Set[str]) -> None:
+    """ Adds the ids of all claim-checked payloads nested anywhere in message """
+    if isinstance(message, Payload):
+        if message.metadata.get("temporal.io/claim-check-codec") == b"v1":
+            ids.add(message.data.decode("utf-8"))
+        return
+    for field, value in message.ListFields():
+        if field.type != field.TYPE_MESSAGE:
+            continue
+        if field.message_type.GetOptions().map_entry:
+            values = value.values()
+        elif isinstance(value, Message):
+            values = [value]
+        else:  # repeated
+            values = value
+        for v in values:
+            if isinstance(v, Message):
+                collect_claim_check_ids(v, ids)
+
+async def referenced_claim_checks(client: Client, query: str, concurrency: int = 10) -> Set[str]:
+    """ Claim check ids referenced by the histories of the workflows matching query """
+    ids: Set[str] = set()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def collect(workflow_id: str, run_id: str):
+        async with semaphore:
+            history = await client.get_workflow_handle(workflow_id, run_id=run_id).fetch_history()
+            for event in history.events:
+                collect_claim_check_ids(event, ids)
+
+    tasks = [asyncio.create_task(collect(wf.id, wf.run_id))
+             async for wf in client.list_workflows(query or None)]
+    await asyncio.gather(*tasks)
+    print(f"{len(tasks)} workflows reference {len(ids)} claim checks")
+    return ids
+
+async def scan_claim_check_keys(redis_client, include_legacy: bool) -> Set[bytes]:
+    keys = {key async for key in redis_client.scan_iter(match=f"{CLAIM_CHECK_KEY_PREFIX}*", count=1000)}
+    if include_legacy:
+        keys |= {key async for key in redis_client.scan_iter(match="*-*-*-*-*", count=1000)
+                 if LEGACY_KEY_PATTERN.match(key)}
+    return keys
+
+async def sweep(client: Client, query: str, min_idle_seconds: int,
+                include_legacy: bool = False, dry_run: bool = False,
+                batch_size: int = 500) -> SweepResult:
+    redis_client = get_redis_client(RedisConfig())
+    result = SweepResult()
+
+    # scan before reading histories so that a payload stored in between is never a candidate
+    keys = await scan_claim_check_keys(redis_client, include_legacy)
+    referenced = await referenced_claim_checks(client, query)
+    candidates = [key for key in keys if key.decode() not in referenced]
+    print(f"{len(keys)} claim checks in Redis, {len(candidates)} unreferenced")
+
+    for i in range(0, len(candidates), batch_size):
+        batch = candidates[i:i + batch_size]
+        pipe = redis_client.pipeline(transaction=False)
+        for key in batch:
+            pipe.object("idletime", key)
+            pipe.strlen(key)
+        results = await pipe.execute(raise_on_error=False)
+
+        idle = []
+        reclaimed_bytes = 0
+        for key, idle_time, size in zip(batch, results[0::2], results[1::2]):
+            # errors (e.g. an LFU eviction policy has no idle time) or a recent touch: leave it
+            if not isinstance(idle_time, int) or idle_time < min_idle_seconds:
+                result.keys_kept += 1
+                continue
+            idle.append(key)
+            reclaimed_bytes += size if isinstance(size, int) else 0
+
+        if idle:
+            result.keys_reclaimed += len(idle) if dry_run else await redis_client.delete(*idle)
+            result.bytes_reclaimed += reclaimed_bytes
+
+    action = "would reclaim" if dry_run else "reclaimed"
+    print(f"{action} {result.keys_reclaimed} claim checks ({result.bytes_reclaimed} bytes), "
+          f"kept {result.keys_kept} used in the last {min_idle_seconds}s")
+    return result
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Delete claim checks that no workflow history references anymore.",
+        epilog="Example usage:\n"
+               "  python -m temporal_supervisor.claim_check.claim_check_sweeper --dry-run\n"
+               "  python -m temporal_supervisor.claim_check.claim_check_sweeper --query 'ExecutionStatus=\"Running\"'"
+    )
+    parser.add_argument('--query', type=str, default=DEFAULT_QUERY,
+                        help='Visibility query for the workflows whose payloads are kept (default: all retained)')
+    parser.add_argument('--min-idle-seconds', type=int, default=3600,
+                        help='Only delete keys that have not been stored or read for this long; must be longer '
+                             'than the codec refresh window (CLAIM_CHECK_TTL_SECONDS / 2, or 300s without a TTL)')
+    parser.add_argument('--include-legacy', action='store_true',
+                        help='Also sweep uuid keys written before claim checks were content addressed')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted')
+    args = parser.parse_args()
+    # a key in use can look idle for up to the refresh window of the codecs that use it
+    refresh_seconds = ClaimCheckConfig().known_key_refresh_seconds
+    if args.min_idle_seconds <= refresh_seconds:
+        parser.error(f"--min-idle-seconds must be longer than the codec refresh window ({refresh_seconds:g}s)")
+
+    client_helper = ClientHelper()
+    # no ClaimCheckPlugin: the sweeper needs the claim check references, not the payloads
+    client = await Client.connect(**client_helper.client_config)
+    try:
+        await sweep(client, args.query, args.min_idle_seconds, args.include_legacy, args.dry_run)
+    finally:
+        await close_redis_pools()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,199 @@
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import List, Optional
+
+from temporalio.api.common.v1 import Payload
+
+from common.redis_config import RedisConfig
+from common.redis_pool import close_redis_pools, get_redis_client
+from temporal_supervisor.claim_check.claim_check_codec import ClaimCheckCodec, ClaimCheckConfig
+from temporal_supervisor.claim_check.compression_codec import CompressionCodec, CompressionConfig, zstandard
+
+#
+# Microbenchmarks for the claim check and compression codecs. The batching
+# and dedup benchmarks require a running Redis (REDIS_HOST / REDIS_PORT),
+# e.g. redis-server. The compression benchmark runs without one.
+#
+
+def sample_payload(i: int) -> Payload:
+    """ Something shaped like an agent conversation item """
+    item = {
+        "role": "assistant",
+        "content": f"Here are the beneficiaries for client 123 (turn {i}): John Doe (son), "
+                   f"Jane Doe (daughter), Joan Doe (spouse). Would you like to add, delete or list them?",
+        "tool_calls": [{"name": "list_beneficiaries", "arguments": json.dumps({"client_id": "123"})}],
+    }
+    return Payload(metadata={"encoding": b"json/plain"}, data=json.dumps(item).encode())
+
+async def one_at_a_time(redis_client, payloads: List[Payload]) -> None:
+    """ The previous codec behavior: one SET and one GET round trip per payload """
+    ids = []
+    for p in payloads:
+        id = str(uuid.uuid4())
+        await redis_client.set(id, p.SerializeToString())
+        ids.append(id)
+    for id in ids:
+        Payload.FromString(await redis_client.get(id))
+
+async def batched(codec: ClaimCheckCodec, payloads: List[Payload]) -> None:
+    await codec.decode(await codec.encode(payloads))
+
+async def time_it(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+async def benchmark_batching(iterations: int):
+    config = RedisConfig()
+    redis_client = get_redis_client(config)
+    codec = ClaimCheckCodec(config)
+    print("batch  one-at-a-time (ms)  pipelined (ms)")
+    for size in (1, 10, 100):
+        payloads = [sample_payload(i) for i in range(size)]
+        sequential_ms = await time_it(lambda: one_at_a_time(redis_client, payloads), iterations)
+        batched_ms = await time_it(lambda: batched(codec, payloads), iterations)
+        print(f"{size:>5}  {sequential_ms:>18.2f}  {batched_ms:>14.2f}")
+
+def conversation_turns(turns: int) -> List[List[Payload]]:
+    """
+    The payloads one chat turn pushes through the codec: the user's message, the model
+    input (the whole conversation so far), the tool call and its result, and the final model
+    input and output. Every 10th turn retries the model call, re-encoding the same input.
+    """
+    def payload(value) -> Payload:
+        return Payload(metadata={"encoding": b"json/plain"}, data=json.dumps(value).encode())
+
+    history = []
+    beneficiaries = [{"first_name": "John", "last_name": "Doe", "relationship": "son"},
+                     {"first_name": "Jane", "last_name": "Doe", "relationship": "daughter"}]
+    all_turns = []
+    for turn in range(turns):
+        history.append({"role": "user", "content": f"Who are my beneficiaries? (turn {turn})"})
+        model_input = payload({"agent": "Beneficiary Agent", "input": history})
+        turn_payloads = [payload(history[-1]), model_input]
+        if turn % 10 == 9:
+            turn_payloads.append(model_input)
+        turn_payloads += [payload({"client_id": "123"}), payload(beneficiaries)]
+        history.append({"role": "assistant", "content": sample_payload(turn).data.decode()})
+        turn_payloads += [payload({"agent": "Beneficiary Agent", "input": history}), payload(history[-1])]
+        all_turns.append(turn_payloads)
+    return all_turns
+
+async def used_memory(redis_client) -> Optional[int]:
+    try:
+        return (await redis_client.info("memory"))["used_memory"]
+    except Exception:
+        return None
+
+async def benchmark_dedup(turns: int):
+    """ Write volume and Redis memory for random keys versus content-addressed keys """
+    config = RedisConfig()
+    redis_client = get_redis_client(config)
+    conversation = conversation_turns(turns)
+    print(f"{turns}-turn conversation, {sum(len(t) for t in conversation)} payloads")
+    print("keys            keys written  bytes written  redis memory")
+    for name in ("random", "content"):
+        codec = ClaimCheckCodec(config)
+        memory_before = await used_memory(redis_client)
+        keys, written = set(), 0
+        for turn_payloads in conversation:
+            if name == "random":
+                # the previous codec behavior: a fresh uuid key per payload
+                values = {str(uuid.uuid4()): p.SerializeToString() for p in turn_payloads}
+                await redis_client.mset(values)
+                written += sum(len(v) for v in values.values())
+                keys.update(values)
+            else:
+                encoded = await codec.encode(turn_payloads)
+                keys.update(p.data.decode() for p in encoded)
+        if name == "content":
+            written = codec.metrics.bytes_written
+        memory_after = await used_memory(redis_client)
+        memory = f"{memory_after - memory_before:>12}" if memory_before is not None else "         n/a"
+        print(f"{name:<14}  {len(keys):>12}  {written:>13}  {memory}")
+        await redis_client.delete(*keys)
+
+async def benchmark_replay(turns: int, replays: int = 5):
+    """
+    A worker replaying a conversation: every workflow task after a sticky cache miss
+    decodes the history again, one payload per decode call like the SDK does.
+    """
+    config = RedisConfig()
+    history = [p for turn_payloads in conversation_turns(turns) for p in turn_payloads]
+    encoded = await ClaimCheckCodec(config).encode(history)
+    print(f"{replays} replays of a {turns}-turn history ({len(encoded)} payloads)")
+    print("cache     keys fetched  hits   time (ms)")
+    for cache_bytes in (0, ClaimCheckConfig().cache_bytes):
+        claim_check_config = ClaimCheckConfig()
+        claim_check_config.cache_bytes = cache_bytes
+        codec = ClaimCheckCodec(config, claim_check_config)
+        start = time.perf_counter()
+        for _ in range(replays):
+            for p in encoded:
+                await codec.decode([p])
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        name = "on" if cache_bytes else "off"
+        print(f"{name:<8}  {codec.metrics.cache_misses:>12}  {codec.metrics.cache_hits:>4}  {elapsed_ms:>10.1f}")
+
+def agent_payloads(turns: int) -> List[Payload]:
+    """ The conversation payloads plus the data store files, which is what the tools return """
+    from common.beneficiaries_manager import BENEFICIARIES_FILE
+    from common.client_manager import CLIENTS_FILE
+    from common.investment_manager import INVESTMENTS_FILE
+
+    payloads = [p for turn_payloads in conversation_turns(turns) for p in turn_payloads]
+    for path in (CLIENTS_FILE, INVESTMENTS_FILE, BENEFICIARIES_FILE):
+        with open(path, "rb") as f:
+            payloads.append(Payload(metadata={"encoding": b"json/plain"}, data=f.read()))
+    return payloads
+
+async def benchmark_compression(iterations: int, turns: int):
+    """ Compression ratio and throughput for each algorithm and level """
+    payloads = agent_payloads(turns)
+    original = sum(p.ByteSize() for p in payloads)
+    settings = [("zlib", 1), ("zlib", 6), ("zlib", 9)]
+    if zstandard is not None:
+        settings += [("zstd", 1), ("zstd", 3), ("zstd", 9)]
+    else:
+        print("zstandard is not installed, skipping zstd")
+    print(f"{len(payloads)} payloads, {original} bytes")
+    print("algorithm  level  ratio  compressed  encode (MB/s)  decode (MB/s)")
+    for algorithm, level in settings:
+        config = CompressionConfig()
+        config.algorithm, config.level = algorithm, level
+        codec = CompressionCodec(config)
+        encoded = await codec.encode(payloads)
+        compressed = sum(p.ByteSize() for p in encoded)
+        encode_ms = await time_it(lambda: codec.encode(payloads), iterations)
+        decode_ms = await time_it(lambda: codec.decode(encoded), iterations)
+        print(f"{algorithm:<9}  {level:>5}  {original / compressed:>5.2f}  {compressed:>10}  "
+              f"{original / 1000 / encode_ms:>13.1f}  {original / 1000 / decode_ms:>13.1f}")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Claim check codec benchmarks")
+    parser.add_argument('--benchmark', choices=["all", "batching", "dedup", "replay", "compression"], default="all",
+                        help='Which benchmark to run (compression does not need Redis)')
+    parser.add_argument('--iterations', type=int, default=50, help='Encode/decode round trips per measurement')
+    parser.add_argument('--turns', type=int, default=50, help='Conversation length for the deduplication benchmark')
+    args = parser.parse_args()
+    try:
+        if args.benchmark in ("all", "batching"):
+            await benchmark_batching(args.iterations)
+            print()
+        if args.benchmark in ("all", "dedup"):
+            await benchmark_dedup(args.turns)
+            print()
+        if args.benchmark in ("all", "replay"):
+            await benchmark_replay(args.turns)
+            print()
+        if args.benchmark in ("all", "compression"):
+            await benchmark_compression(args.iterations, args.turns)
+    finally:
+        await close_redis_pools()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+import os
+import zlib
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence
+
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import PayloadCodec
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+COMPRESSION_METADATA_KEY = "temporal.io/compression-codec"
+
+@dataclass
+class CompressionConfig:
+    """
+    Tuning for the compression codec
+
+    Environment Variables:
+        COMPRESSION_ALGORITHM: zstd, zlib or auto (default: auto, zstd when the zstandard package is installed)
+        COMPRESSION_MIN_BYTES: Payloads smaller than this are left uncompressed (default: 1024)
+        COMPRESSION_LEVEL: Compression level, 0 for the algorithm's default (default: 0)
+    """
+
+    algorithm: str = "auto"
+    min_bytes: int = 1024
+    level: int = 0
+
+    def __post_init__(self):
+        """ Load configuration from environment variables if available """
+        self.algorithm = os.getenv("COMPRESSION_ALGORITHM", self.algorithm).lower()
+        self.min_bytes = int(os.getenv("COMPRESSION_MIN_BYTES", self.min_bytes))
+        self.level = int(os.getenv("COMPRESSION_LEVEL", self.level))
+        if self.algorithm == "auto":
+            self.algorithm = "zstd" if zstandard is not None else "zlib"
+        if self.algorithm not in ("zstd", "zlib"):
+            raise ValueError(f"Unknown compression algorithm {self.algorithm}")
+        if self.algorithm == "zstd" and zstandard is None:
+            raise ValueError("COMPRESSION_ALGORITHM=zstd requires the zstandard package")
+
+#
+# Compresses the serialized payload when it is at least min_bytes
+# and compression actually makes it smaller. Can be used on its own
+# or ahead of the claim check codec (see PayloadCodecChain).
+#
+class CompressionCodec(PayloadCodec):
+
+    def __init__(self, compression_config: Optional[CompressionConfig] = None):
+        self.compression_config = compression_config or CompressionConfig()
+        level = self.compression_config.level
+        if self.compression_config.algorithm == "zstd":
+            self._zstd_compressor = zstandard.ZstdCompressor(level=level or 3)
+        self._zlib_level = level or 6
+
+    def compress(self, data: bytes) -> bytes:
+        if self.compression_config.algorithm == "zstd":
+            return self._zstd_compressor.compress(data)
+        return zlib.compress(data, self._zlib_level)
+
+    @staticmethod
+    def decompress(algorithm: str, data: bytes) -> bytes:
+        if algorithm == "zlib":
+            return zlib.decompress(data)
+        if algorithm == "zstd":
+            if zstandard is None:
+                raise ValueError("Payload is zstd compressed but the zstandard package is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        raise ValueError(f"Unknown compression algorithm {algorithm}")
+
+    async def encode(self, payloads: Iterable[Payload]) -> List[Payload]:
+        out: List[Payload] = []
+        for p in payloads:
+            if p.ByteSize() < self.compression_config.min_bytes:
+                out.append(p)
+                continue
+            data = p.SerializeToString()
+            compressed = self.compress(data)
+            if len(compressed) >= len(data):
+                out.append(p)
+                continue
+            out.append(Payload(
+                metadata={
+                    "encoding": b"binary/compressed",
+                    COMPRESSION_METADATA_KEY: self.compression_config.algorithm.encode(),
+                },
+                data=compressed,
+            ))
+        return out
+
+    async def decode(self, payloads: Iterable[Payload]) -> List[Payload]:
+        out: List[Payload] = []
+        for p in payloads:
+            algorithm = p.metadata.get(COMPRESSION_METADATA_KEY)
+            if algorithm is None:
+                out.append(p)
+                continue
+            out.append(Payload.FromString(self.decompress(algorithm.decode(), p.data)))
+        return out
+
+#
+# Runs several codecs as one: encode in order, decode in reverse order.
+#
+class PayloadCodecChain(PayloadCodec):
+
+    def __init__(self, codecs: Sequence[PayloadCodec]):
+        self.codecs = list(codecs)
+
+    async def encode(self, payloads: Iterable[Payload]) -> List[Payload]:
+        out = list(payloads)
+        for codec in self.codecs:
+            out = await codec.encode(out)
+        return out
+
+    async def decode(self, payloads: Iterable[Payload]) -> List[Payload]:
+        out = list(payloads)
+        for codec in reversed(self.codecs):
+            out = await codec.decode(out)
+        return out
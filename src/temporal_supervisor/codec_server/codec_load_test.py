@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import time
+from typing import List
+
+import aiohttp
+from temporalio.api.common.v1 import Payload
+
+from common.redis_config import RedisConfig
+from common.redis_pool import close_redis_pools
+from temporal_supervisor.claim_check.claim_check_codec import ClaimCheckCodec
+from temporal_supervisor.claim_check.codec_benchmark import conversation_turns
+from temporal_supervisor.codec_server.codec_server import payloads_to_json
+
+#
+# Replays what the Temporal UI does when a workflow is opened: one /decode
+# request per history event, all fired at once. Seeds the claim checks into
+# the local Redis (REDIS_HOST / REDIS_PORT) first, then runs the bursts against
+# a running codec server, e.g.
+#   python -m temporal_supervisor.codec_server.codec_server --workers 4
+#   python -m temporal_supervisor.codec_server.codec_load_test --bursts 20
+#
+
+async def seed(turns: int) -> List[List[Payload]]:
+    """ Claim checks a conversation and returns the encoded payloads of each history event """
+    codec = ClaimCheckCodec(RedisConfig())
+    events = [p for turn_payloads in conversation_turns(turns) for p in turn_payloads]
+    return [[p] for p in await codec.encode(events)]
+
+async def burst(session: aiohttp.ClientSession, url: str, events: List[List[Payload]]) -> List[float]:
+    """ Decodes every event concurrently, returning each request's latency in ms """
+    async def decode(payloads: List[Payload]) -> float:
+        start = time.perf_counter()
+        async with session.post(f"{url}/decode", data=payloads_to_json(payloads),
+                                headers={"Content-Type": "application/json",
+                                         "X-Namespace": "default",
+                                         "Accept-Encoding": "gzip"}) as resp:
+            resp.raise_for_status()
+            await resp.read()
+        return (time.perf_counter() - start) * 1000
+
+    return await asyncio.gather(*[decode(payloads) for payloads in events])
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test the codec server with UI style decode bursts")
+    parser.add_argument('--url', type=str, default="http://127.0.0.1:8081", help='Codec server endpoint')
+    parser.add_argument('--turns', type=int, default=50, help='Conversation length, ~6 history events per turn')
+    parser.add_argument('--bursts', type=int, default=10, help='How many times the workflow is opened')
+    parser.add_argument('--concurrent-users', type=int, default=1, help='Bursts running at the same time')
+    args = parser.parse_args()
+
+    try:
+        events = await seed(args.turns)
+    finally:
+        await close_redis_pools()
+    print(f"seeded {len(events)} history events, {args.bursts} bursts x {args.concurrent_users} users")
+
+    latencies: List[float] = []
+    burst_times: List[float] = []
+    async with aiohttp.ClientSession() as session:
+        for _ in range(args.bursts):
+            start = time.perf_counter()
+            results = await asyncio.gather(*[burst(session, args.url, events)
+                                             for _ in range(args.concurrent_users)])
+            burst_times.append((time.perf_counter() - start) * 1000)
+            latencies.extend(latency for result in results for latency in result)
+
+        async with session.get(f"{args.url}/metrics") as resp:
+            server_metrics = await resp.json()
+
+    latencies.sort()
+    total_s = sum(burst_times) / 1000
+    print(f"{len(latencies)} requests, {len(latencies) / total_s:.0f} req/s, "
+          f"burst mean {sum(burst_times) / len(burst_times):.1f} ms")
+    print(f"request latency p50 {latencies[len(latencies) // 2]:.1f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)]:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)]:.1f} ms, max {latencies[-1]:.1f} ms")
+    print(f"server (pid {server_metrics['pid']}): {server_metrics['latency'].get('POST /decode')}, "
+          f"cache {server_metrics['cache']}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,12 +1,88 @@
+import argparse
+import base64
+import binascii
+import json
+import multiprocessing
+import os
+import time
+from dataclasses import asdict
 from functools import partial
-from typing import Awaitable, Callable, Iterable, List
+from typing import Awaitable, Callable, Dict, Iterable, List
 
 from aiohttp import hdrs, web
 from google.protobuf import json_format
 from temporalio.api.common.v1 import Payload, Payloads
 
 from common.redis_config import RedisConfig
+from common.redis_pool import close_redis_pools
+from common.util import str_to_bool
 from temporal_supervisor.claim_check.claim_check_codec import ClaimCheckCodec
+from temporal_supervisor.claim_check.compression_codec import CompressionCodec, PayloadCodecChain
+
+# responses at least this big are gzipped when the browser accepts it
+GZIP_MIN_BYTES = int(os.getenv("CODEC_SERVER_GZIP_MIN_BYTES", "1024"))
+
+def payloads_from_json(data: bytes) -> List[Payload]:
+    """
+    Parses the Payloads JSON the UI sends. Plain json + base64 is several times faster
+    than json_format.Parse; anything unusual falls back to json_format.
+    """
+    try:
+        payloads = []
+        for p in json.loads(data).get("payloads", []):
+            if not p.keys() <= {"metadata", "data"}:
+                raise ValueError(f"unexpected payload fields {list(p)}")
+            payloads.append(Payload(
+                metadata={k: base64.b64decode(v, validate=True) for k, v in p.get("metadata", {}).items()},
+                data=base64.b64decode(p.get("data", ""), validate=True),
+            ))
+        return payloads
+    except (ValueError, TypeError, AttributeError, binascii.Error):
+        return list(json_format.Parse(data, Payloads()).payloads)
+
+def payloads_to_json(payloads: Iterable[Payload]) -> str:
+    """ The same JSON json_format.MessageToJson produces for Payloads, without the overhead """
+    return json.dumps({"payloads": [
+        {"metadata": {k: base64.b64encode(v).decode() for k, v in p.metadata.items()},
+         "data": base64.b64encode(p.data).decode()}
+        for p in payloads
+    ]})
+
+#
+# Request latency per route. Keeps the most recent samples for percentiles.
+#
+class LatencyStats:
+
+    def __init__(self, max_samples: int = 10000):
+        self.max_samples = max_samples
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self._samples: List[float] = []
+
+    def record(self, elapsed_ms: float, error: bool = False) -> None:
+        self.count += 1
+        self.errors += int(error)
+        self.total_ms += elapsed_ms
+        self._samples.append(elapsed_ms)
+        if len(self._samples) > self.max_samples:
+            del self._samples[:len(self._samples) - self.max_samples]
+
+    def summary(self) -> dict:
+        ordered = sorted(self._samples)
+
+        def percentile(p: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 2) if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+        }
 
 def build_codec_server() -> web.Application:
     # Cors handler
@@ -25,36 +101,96 @@ def build_codec_server() -> web.Application:
         # Read payloads as JSON
         assert req.content_type == "application/json"
         data = await req.read()
-        payloads = json_format.Parse(data, Payloads())
-        # print("----- Request -------")
-        # print(payloads)
-        # print("---------------------")
-        # Apply
-        payloads = Payloads(payloads=await fn(payloads.payloads))
+        # Apply; all payloads of the request are fetched from Redis together
+        payloads = await fn(payloads_from_json(data))
 
         # Apply CORS and return JSON
         resp = await cors_options(req)
         resp.content_type = "application/json"
-        resp.text = json_format.MessageToJson(payloads)
-        # print("------ Response -----")
-        # print(f"{resp.text}")
-        # print("---------------------")
-
+        resp.text = payloads_to_json(payloads)
+        if len(resp.text) >= GZIP_MIN_BYTES and "gzip" in req.headers.get(hdrs.ACCEPT_ENCODING, ""):
+            resp.enable_compression(web.ContentCoding.gzip)
         return resp
 
-    # Build app
+    latency: Dict[str, LatencyStats] = {}
+
+    @web.middleware
+    async def timing(req: web.Request, handler):
+        start = time.perf_counter()
+        error = True
+        try:
+            resp = await handler(req)
+            error = resp.status >= 500
+            return resp
+        finally:
+            stats = latency.setdefault(f"{req.method} {req.path}", LatencyStats())
+            stats.record((time.perf_counter() - start) * 1000, error)
+
+    # Build app. One codec per process, so all requests share its decode cache
     config = RedisConfig()
-    codec = ClaimCheckCodec(config=config)
-    app = web.Application()
+    claim_check_codec = ClaimCheckCodec(config=config)
+    # decode handles compressed and uncompressed payloads alike (only payloads with the
+    # compression marker are decompressed); encode compresses only when the workers do
+    decode_codec = PayloadCodecChain([CompressionCodec(), claim_check_codec])
+    use_compression = str_to_bool(os.getenv("USE_COMPRESSION", "False"))
+    encode_codec = decode_codec if use_compression else claim_check_codec
+
+    async def metrics(req: web.Request) -> web.Response:
+        cache = claim_check_codec.cache
+        return web.json_response({
+            "pid": os.getpid(),
+            "latency": {route: stats.summary() for route, stats in latency.items()},
+            "claim_check": asdict(claim_check_codec.metrics),
+            "cache": {"entries": len(cache), "bytes": cache.size} if cache is not None else None,
+        })
+
+    app = web.Application(middlewares=[timing])
     app.add_routes(
         [
-            web.post("/encode", partial(apply, codec.encode)),
-            web.post("/decode", partial(apply, codec.decode)),
+            web.post("/encode", partial(apply, encode_codec.encode)),
+            web.post("/decode", partial(apply, decode_codec.decode)),
             web.options("/decode", cors_options),
+            web.get("/metrics", metrics),
         ]
     )
+
+    async def on_cleanup(app: web.Application) -> None:
+        await close_redis_pools()
+
+    app.on_cleanup.append(on_cleanup)
     return app
 
+def _serve(host: str, port: int, reuse_port: bool) -> None:
+    web.run_app(build_codec_server(), host=host, port=port, reuse_port=reuse_port or None)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Codec server for the Temporal UI",
+        epilog="Example usage:\n"
+               "  python -m temporal_supervisor.codec_server.codec_server --workers 4\n"
+    )
+    parser.add_argument('--host', type=str, default="127.0.0.1", help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8081, help='Port to listen on')
+    parser.add_argument('--workers', type=int, default=int(os.getenv("CODEC_SERVER_WORKERS", "1")),
+                        help='Number of server processes sharing the port (each has its own decode cache)')
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        _serve(args.host, args.port, False)
+        return
+
+    # SO_REUSEPORT lets the kernel spread connections over the processes
+    processes = [multiprocessing.Process(target=_serve, args=(args.host, args.port, True))
+                 for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
 
 if __name__ == "__main__":
-    web.run_app(build_codec_server(), host="127.0.0.1", port=8081)
\ No newline at end of file
+    main()
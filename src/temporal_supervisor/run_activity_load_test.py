@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import tempfile
+import time
+
+from common.client_manager import ClientManager
+
+#
+# Measures how much the worker's event loop stalls while file-backed
+# activities run. "before" calls the data store on the event loop like the
+# old async activities did; "after" runs the same call on a thread pool
+# like the worker's activity_executor does for the sync activities.
+#
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> list:
+    """ Records how late each short sleep wakes up """
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+    return lags
+
+async def run_scenario(name: str, calls, concurrency: int):
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(measure_loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*[calls(i) for i in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    lags = sorted(await monitor) or [0.0]
+    p99 = lags[int(len(lags) * 0.99) - 1] if len(lags) > 1 else lags[0]
+    print(f"{name:>6}: {concurrency} calls in {elapsed:.2f}s, event loop lag "
+          f"max {max(lags) * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Event loop lag load test for the data store activities")
+    parser.add_argument('--clients', type=int, default=20000, help='Number of clients in the test data file')
+    parser.add_argument('--concurrency', type=int, default=50, help='Number of concurrent activity calls')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        clients_file = os.path.join(tmp_dir, "clients.json")
+        clients = {
+            str(i): {"first_name": f"First{i}", "last_name": f"Last{i}", "address": f"{i} Main Street",
+                     "phone": "888-555-1212", "email": f"c{i}@example.com", "marital_status": "single"}
+            for i in range(args.clients)
+        }
+        with open(clients_file, "w") as f:
+            json.dump(clients, f)
+
+        async def blocking_call(i: int):
+            # what the old `async def` activities did: file I/O right on the event loop
+            ClientManager(clients_file).get_client(str(i))
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=int(os.getenv("ACTIVITY_THREADS", "100")))
+        loop = asyncio.get_running_loop()
+
+        async def executor_call(i: int):
+            await loop.run_in_executor(executor, ClientManager(clients_file).get_client, str(i))
+
+        await run_scenario("before", blocking_call, args.concurrency)
+        await run_scenario("after", executor_call, args.concurrency)
+        executor.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
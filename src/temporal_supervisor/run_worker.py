@@ -1,4 +1,5 @@
 import asyncio
+import concurrent.futures
 import logging
 import os
 from typing import Optional
@@ -11,8 +12,11 @@ from temporalio.client import Client
 from temporalio.worker import Worker
 
 from common.client_helper import ClientHelper
+from common.redis_pool import close_redis_pools
+from temporal_supervisor.agent_models import AgentModelConfig, MeteredModel
 from temporal_supervisor.activities.clients import ClientActivities
 from temporal_supervisor.activities.event_stream_activities import EventStreamActivities
+from temporal_supervisor.activities.guardrail_cache import GuardrailCacheActivities
 from temporal_supervisor.activities.open_account import OpenAccount
 from temporalio.contrib.openai_agents import OpenAIAgentsPlugin
 
@@ -38,12 +42,19 @@ openai_client = AsyncOpenAI(
 
 
 class CustomModelProvider(ModelProvider):
+    def __init__(self, config: Optional[AgentModelConfig] = None):
+        # the agents name themselves in their model settings, see agent_models.py
+        self.config = config or AgentModelConfig()
+
     def get_model(self, model_name: Optional[str]) -> Model:
-        model = OpenAIChatCompletionsModel(
-            model=model_name if model_name else "gpt-4o",
+        return MeteredModel(self.config, model_name, self._make_model)
+
+    @staticmethod
+    def _make_model(model_name: str) -> Model:
+        return OpenAIChatCompletionsModel(
+            model=model_name,
             openai_client=openai_client,
         )
-        return model
 
 
 async def main():
@@ -65,12 +76,20 @@ async def main():
     client = await Client.connect(**client_helper.client_config,
                                   plugins=plugins)
 
+    # the data store activities are sync (blocking file I/O) and run on
+    # this bounded pool so they never stall the worker's event loop.
+    # Temporal expects max_workers >= max_concurrent_activities (default 100)
+    activity_threads = int(os.getenv("ACTIVITY_THREADS", "100"))
+    activity_executor = concurrent.futures.ThreadPoolExecutor(max_workers=activity_threads)
+
     # for the demo, we're using the same task queue as
     # the agents and the child workflow. In a production
     # situation, this would likely be a different task queue
     worker = Worker(
         client,
         task_queue=client_helper.taskQueue,
+        activity_executor=activity_executor,
+        max_concurrent_activities=activity_threads,
         workflows=[
             WealthManagementWorkflow,
             OpenInvestmentAccountWorkflow
@@ -88,13 +107,20 @@ async def main():
             OpenAccount.get_current_client_info,
             OpenAccount.update_client_details,
             OpenAccount.approve_kyc,
+            EventStreamActivities.append_events,
             EventStreamActivities.append_chat_interaction,
             EventStreamActivities.append_status_update,
             EventStreamActivities.delete_conversation,
+            GuardrailCacheActivities.lookup_verdict,
+            GuardrailCacheActivities.store_verdict,
         ],
     )
     print(f"Running worker on {client_helper.address}")
-    await worker.run()
+    try:
+        await worker.run()
+    finally:
+        activity_executor.shutdown(wait=False)
+        await close_redis_pools()
 
 if __name__ == '__main__':
     asyncio.run(main())
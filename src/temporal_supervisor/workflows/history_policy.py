@@ -0,0 +1,151 @@
+"""
+Conversation History Policy for the Wealth Management Workflow
+
+Runner.run gets the whole conversation every turn, so without a limit the model
+payloads, the workflow history and the prompt tokens all grow with every turn.
+HistoryPolicy keeps the last max_turns turns verbatim and drops (window) or folds
+into one summary message (summarize) everything older.
+
+Items are only ever removed a whole turn at a time. A turn starts at a user message
+and holds everything the agents produced for it, so a tool call is never separated
+from its output and a handoff call never from its result.
+
+This runs inside the workflow, so it must stay deterministic (no I/O, no LLM calls).
+
+Run "python -m temporal_supervisor.workflows.history_policy" to see the input size
+per turn of a simulated conversation for each mode.
+"""
+
+import argparse
+import json
+from dataclasses import dataclass
+from typing import Any, List, Tuple
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+@dataclass
+class HistoryPolicy:
+    """
+    mode:
+        full      - send everything (the original behavior)
+        window    - keep the last max_turns turns and drop older items
+        summarize - keep the last max_turns turns and fold older ones into a summary message
+    """
+
+    mode: str = "summarize"
+    max_turns: int = 10
+    summary_max_chars: int = 4000
+    message_max_chars: int = 300
+
+    def apply(self, items: List[Any]) -> List[Any]:
+        if self.mode == "full" or self.max_turns <= 0:
+            return items
+        head, turns = split_turns(items)
+        if len(turns) <= self.max_turns:
+            return items
+
+        older = [item for turn in turns[:-self.max_turns] for item in turn]
+        kept = [item for turn in turns[-self.max_turns:] for item in turn]
+        if self.mode == "window":
+            return kept
+        return [self._summarize(head + older)] + kept
+
+    def _summarize(self, items: List[Any]) -> dict:
+        lines = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            text = _message_text(item)
+            if is_summary(item):
+                lines.append(text[len(SUMMARY_PREFIX):])
+            elif text and item.get("role") == "user":
+                lines.append(f"User: {_truncate(text, self.message_max_chars)}")
+            elif text and item.get("role") == "assistant":
+                lines.append(f"Assistant: {_truncate(text, self.message_max_chars)}")
+
+        # keep the most recent part when the summary outgrows its budget
+        summary = "\n".join(lines)
+        if len(summary) > self.summary_max_chars:
+            summary = summary[-self.summary_max_chars:]
+            summary = summary[summary.find("\n") + 1:]
+        return {"role": "system", "content": SUMMARY_PREFIX + summary}
+
+def is_user_message(item: Any) -> bool:
+    return isinstance(item, dict) and item.get("role") == "user" and item.get("type", "message") == "message"
+
+def is_summary(item: Any) -> bool:
+    return isinstance(item, dict) and item.get("role") == "system" \
+        and isinstance(item.get("content"), str) and item["content"].startswith(SUMMARY_PREFIX)
+
+def split_turns(items: List[Any]) -> Tuple[List[Any], List[List[Any]]]:
+    """ Items before the first user message, and the items grouped by the user message that started them """
+    head: List[Any] = []
+    turns: List[List[Any]] = []
+    for item in items:
+        if is_user_message(item):
+            turns.append([item])
+        elif turns:
+            turns[-1].append(item)
+        else:
+            head.append(item)
+    return head, turns
+
+def measure(items: List[Any]) -> Tuple[int, int]:
+    """ Number of items and their size as JSON in bytes """
+    return len(items), len(json.dumps(items, default=str).encode())
+
+def _message_text(item: dict) -> str:
+    content = item.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+def _truncate(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
+
+
+# --- Simulation ---
+
+def _simulated_turn(turn: int) -> List[dict]:
+    """ What to_input_list() adds for a turn with a handoff and a tool call """
+    return [
+        {"content": f"Please list the beneficiaries for client 123 (turn {turn})", "role": "user"},
+        {"arguments": "{}", "call_id": f"handoff-{turn}", "name": "transfer_to_beneficiary_agent",
+         "type": "function_call"},
+        {"call_id": f"handoff-{turn}", "output": json.dumps({"assistant": "Beneficiary Agent"}),
+         "type": "function_call_output"},
+        {"arguments": json.dumps({"client_id": "123"}), "call_id": f"tool-{turn}", "name": "list_beneficiaries",
+         "type": "function_call"},
+        {"call_id": f"tool-{turn}", "type": "function_call_output",
+         "output": json.dumps([{"beneficiary_id": f"b{i}", "first_name": "John", "last_name": "Doe",
+                                "relationship": "son"} for i in range(3)])},
+        {"content": [{"annotations": [], "text": "Here are your beneficiaries: John Doe (son), Jane Doe "
+                                                 "(daughter) and Joan Doe (spouse). Anything else?",
+                      "type": "output_text"}],
+         "role": "assistant", "status": "completed", "type": "message"},
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Input size per turn for each history policy")
+    parser.add_argument('--turns', type=int, default=50, help='Conversation length')
+    parser.add_argument('--max-turns', type=int, default=HistoryPolicy.max_turns, help='Turns kept verbatim')
+    args = parser.parse_args()
+
+    print("turn  " + "  ".join(f"{mode:>16}" for mode in ("full", "window", "summarize")))
+    histories = {mode: [] for mode in ("full", "window", "summarize")}
+    for turn in range(args.turns):
+        row = []
+        for mode, history in histories.items():
+            new_turn = _simulated_turn(turn)
+            items = HistoryPolicy(mode=mode, max_turns=args.max_turns).apply(history + new_turn[:1])
+            count, size = measure(items)
+            row.append(f"{count:>4} / {size:>7} B")
+            histories[mode] = items + new_turn[1:]
+        if turn % 5 == 4 or turn == args.turns - 1:
+            print(f"{turn + 1:>4}  " + "  ".join(f"{cell:>16}" for cell in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Deterministic Intent Router for the Wealth Management Workflow
+
+Most turns go user -> Supervisor Agent -> handoff -> specialist agent, and the
+supervisor's model call does nothing but pick the specialist. When a message says
+clearly what the user wants, the router names the agent for it, so the turn starts
+there and skips that model call. It only routes away from the supervisor: once a
+specialist is talking to the user, the next message is usually an answer to it
+("the investment account", "yes, add him as a beneficiary") and stays with it.
+Anything unclear returns None and the turn starts with the current agent as before.
+
+Routers are pluggable: anything with route(message, current_agent_name) returning an
+agent name or None. This runs inside the workflow, so it must stay deterministic.
+
+Run "python -m temporal_supervisor.workflows.intent_router" for the model calls per
+scripted conversation with and without routing.
+"""
+
+import argparse
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Protocol, Sequence, Tuple
+
+from common.agent_constants import BENE_AGENT_NAME, INVEST_AGENT_NAME, OPEN_ACCOUNT_AGENT_NAME, \
+    SUPERVISOR_AGENT_NAME
+
+class IntentRouter(Protocol):
+    def route(self, message: str, current_agent_name: str) -> Optional[str]:
+        """ The agent that should take the turn, None to leave it with the current agent """
+        ...
+
+@dataclass
+class IntentRule:
+    agent_name: str
+    pattern: str
+    # when rules for different agents match, the highest priority wins; a tie is unclear
+    priority: int = 0
+
+DEFAULT_RULES = [
+    # opening an account is its own agent, even though the message mentions investments
+    IntentRule(OPEN_ACCOUNT_AGENT_NAME, r"\b(open|start|create)\b.{0,30}\baccount", priority=1),
+    IntentRule(OPEN_ACCOUNT_AGENT_NAME, r"\bnew (investment |brokerage |retirement )?account", priority=1),
+    IntentRule(BENE_AGENT_NAME, r"\b(beneficiar|heirs?\b)"),
+    IntentRule(INVEST_AGENT_NAME, r"\b(investment|portfolio)"),
+    IntentRule(INVEST_AGENT_NAME, r"\b(close|list|show)\b.{0,30}\baccounts?\b"),
+    IntentRule(INVEST_AGENT_NAME, r"\bbalances?\b"),
+]
+
+class KeywordIntentRouter:
+    """ Routes on regular expressions; a message matching several agents is left alone """
+
+    def __init__(self, rules: Sequence[IntentRule] = DEFAULT_RULES):
+        self.rules = [(rule, re.compile(rule.pattern)) for rule in rules]
+
+    def route(self, message: str, current_agent_name: str) -> Optional[str]:
+        if current_agent_name != SUPERVISOR_AGENT_NAME:
+            # mid-flow, the agent asked for this answer; keywords in it don't start a new request
+            return None
+        text = message.lower()
+        matched = [rule for rule, pattern in self.rules if pattern.search(text)]
+        if not matched:
+            return None
+        top = max(rule.priority for rule in matched)
+        agent_names = {rule.agent_name for rule in matched if rule.priority == top}
+        return agent_names.pop() if len(agent_names) == 1 else None
+
+
+# --- Benchmark ---
+
+# (message, the agent that should answer it)
+SCRIPTED_CONVERSATIONS: List[Tuple[str, List[Tuple[str, str]]]] = [
+    ("beneficiaries then investments", [
+        ("Hi, I'd like to see my beneficiaries", BENE_AGENT_NAME),
+        ("12345", BENE_AGENT_NAME),
+        ("Add my daughter Jane Doe as a beneficiary", BENE_AGENT_NAME),
+        ("She was born 2001-04-12", BENE_AGENT_NAME),
+        ("Now show me my investment accounts", INVEST_AGENT_NAME),
+        ("Close the college fund account", INVEST_AGENT_NAME),
+        ("yes", INVEST_AGENT_NAME),
+    ]),
+    ("open an account", [
+        ("I want to open a new investment account", OPEN_ACCOUNT_AGENT_NAME),
+        ("123", OPEN_ACCOUNT_AGENT_NAME),
+        # the agent asked what kind of account; the answer stays with it
+        ("An investment account", OPEN_ACCOUNT_AGENT_NAME),
+        ("A brokerage account with 5000", OPEN_ACCOUNT_AGENT_NAME),
+        ("Yes that information is correct", OPEN_ACCOUNT_AGENT_NAME),
+        ("Who are my beneficiaries?", BENE_AGENT_NAME),
+        ("Delete John Doe", BENE_AGENT_NAME),
+        ("What is the balance of my portfolio?", INVEST_AGENT_NAME),
+    ]),
+    ("vague requests", [
+        ("Hello", SUPERVISOR_AGENT_NAME),
+        ("My client id is 42", SUPERVISOR_AGENT_NAME),
+        ("I need help planning for my family", BENE_AGENT_NAME),
+        ("Remove my ex-wife", BENE_AGENT_NAME),
+        ("What about my money?", INVEST_AGENT_NAME),
+        ("Add my son as a beneficiary of my investment account", BENE_AGENT_NAME),
+    ]),
+]
+
+def handoff_hops(root, start: str, target: str) -> int:
+    """ Fewest handoffs from the start agent to the target agent """
+    from temporal_supervisor.workflows.supervisor_workflow import find_agent
+
+    queue = deque([(find_agent(root, start), 0)])
+    seen = set()
+    while queue:
+        agent, hops = queue.popleft()
+        if agent.name == target:
+            return hops
+        if agent.name in seen:
+            continue
+        seen.add(agent.name)
+        queue.extend((handoff, hops + 1) for handoff in agent.handoffs)
+    raise ValueError(f"{target} cannot be reached from {start}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Model calls per scripted conversation with and without intent routing")
+    parser.add_argument('--verbose', action='store_true', help='Show the routing decision for every turn')
+    args = parser.parse_args()
+
+    from temporal_supervisor.workflows.supervisor_workflow import init_agents
+
+    # every agent on the handoff path makes one model call, the last one answers;
+    # tool calls are the same either way and are left out
+    root = init_agents(True)
+    router = KeywordIntentRouter()
+    total_before = total_after = 0
+    for name, turns in SCRIPTED_CONVERSATIONS:
+        current = SUPERVISOR_AGENT_NAME
+        before = after = routed = wrong = 0
+        for message, target in turns:
+            before += handoff_hops(root, current, target) + 1
+            start = router.route(message, current) or current
+            after += handoff_hops(root, start, target) + 1
+            routed += start != current
+            wrong += start != current and start != target
+            if args.verbose:
+                print(f"  {message!r}: {current} -> {start} (answered by {target})")
+            current = target
+        total_before += before
+        total_after += after
+        print(f"{name}: {len(turns)} turns, {before} model calls without routing, {after} with "
+              f"({routed} turns routed, {wrong} to the wrong agent)")
+    print(f"total: {total_before} -> {total_after} model calls "
+          f"({(total_before - total_after) / total_before:.0%} fewer)")
+
+
+if __name__ == "__main__":
+    main()
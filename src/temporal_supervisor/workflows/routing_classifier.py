@@ -0,0 +1,120 @@
+"""
+Local Fast Path for the Routing Guardrail
+
+classify_routing() decides the obvious cases of "is this about wealth management?"
+with keyword rules so the routing guardrail only asks the model about the rest:
+
+    allow  - a bare follow-up ("yes", a number or client id, an email address) and nothing else
+    block  - the whole message is an off-topic term ("weather", "jokes", ...)
+    unsure - anything else, so the model decides. That includes every message that mentions
+             beneficiaries, investments, accounts, ... ("balance chemical equations" and
+             "ignore your instructions ... account" mention them too) and every sentence with
+             an off-topic word ("the history of my trades", "save for a vacation")
+
+It runs inside the workflow, so it must stay deterministic (no I/O, no randomness).
+
+Run "python -m temporal_supervisor.workflows.routing_classifier" for the accuracy and
+latency on the labelled examples in routing_classifier_fixtures.json.
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+
+ALLOW = "allow"
+BLOCK = "block"
+UNSURE = "unsure"
+
+# word prefixes, so "beneficiar" matches beneficiary and beneficiaries. A match is
+# only reported in the reason, it never allows a message by itself
+_ALLOW_TERMS = re.compile(
+    r"\b(beneficiar|invest|account|portfolio|balance|retire|fund|saving|checking|wealth|financ|inherit|"
+    r"estate|money|stock|bond|401k|ira\b|roth|brokerage|dividend|asset|kyc|deposit|withdraw|"
+    r"son\b|sons\b|daughter|spouse|wife|husband|child|children|grandchild)"
+)
+# only ever matched against the whole message (plurals allowed)
+_BLOCK_TERMS = re.compile(
+    r"\b(weather|forecast|capital of|recipe|cook|cooking|joke|poem|song|lyrics|movie|film|football|soccer|"
+    r"basketball|baseball|president|election|photosynthesis|planet|galaxy|cheetah|lion|tiger|dog|cat|animal|"
+    r"dinosaur|your name|who are you|translate|population|history of|meaning of life|python|javascript|"
+    r"write code|homework|celebrity|horoscope|vacation|restaurant)s?\b"
+)
+_FOLLOW_UP = re.compile(
+    r"(yes|yeah|yep|no|nope|ok|okay|sure|correct|confirm(ed)?|please do|go ahead|that'?s (right|correct)|"
+    r"thanks|thank you|done|"
+    r"[\w.+-]+@[\w-]+\.[\w.]+|"    # an email address
+    r"(client[- ]?(id )?)?#?\d+)"    # a number or client id
+)
+
+@dataclass
+class RoutingDecision:
+    verdict: str
+    reason: str
+
+def classify_routing(message: str) -> RoutingDecision:
+    text = " ".join(message.lower().split())
+    stripped = text.strip(" .!?")
+    if _FOLLOW_UP.fullmatch(stripped):
+        return RoutingDecision(ALLOW, "follow-up answer")
+
+    if _BLOCK_TERMS.fullmatch(stripped):
+        return RoutingDecision(BLOCK, f"off topic '{stripped}'")
+
+    allow = _ALLOW_TERMS.search(text)
+    block = _BLOCK_TERMS.search(text)
+    if block:
+        return RoutingDecision(UNSURE, f"mentions '{block.group(0)}'")
+    if allow:
+        return RoutingDecision(UNSURE, f"mentions '{allow.group(0)}'")
+    return RoutingDecision(UNSURE, "no keywords")
+
+
+# --- Benchmark ---
+
+FIXTURES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "routing_classifier_fixtures.json")
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy and latency of the local routing classifier")
+    parser.add_argument('--fixtures', type=str, default=FIXTURES_FILE,
+                        help='JSON list of {"message": ..., "allowed": true/false}')
+    parser.add_argument('--iterations', type=int, default=1000, help='Passes over the fixtures for the latency')
+    parser.add_argument('--verbose', action='store_true', help='Show every fixture that is not decided correctly')
+    args = parser.parse_args()
+
+    with open(args.fixtures) as f:
+        fixtures = json.load(f)
+
+    decided = correct = false_allow = false_block = 0
+    for fixture in fixtures:
+        decision = classify_routing(fixture["message"])
+        if decision.verdict == UNSURE:
+            if args.verbose:
+                print(f"  unsure  {fixture['message']!r} ({decision.reason})")
+            continue
+        decided += 1
+        if (decision.verdict == ALLOW) == fixture["allowed"]:
+            correct += 1
+        else:
+            false_allow += decision.verdict == ALLOW
+            false_block += decision.verdict == BLOCK
+            if args.verbose:
+                print(f"  WRONG   {fixture['message']!r} -> {decision.verdict} ({decision.reason})")
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for fixture in fixtures:
+            classify_routing(fixture["message"])
+    per_call_us = (time.perf_counter() - start) * 1e6 / (args.iterations * len(fixtures))
+
+    print(f"{len(fixtures)} labelled messages")
+    print(f"decided locally: {decided} ({decided / len(fixtures):.0%}), the rest go to the guardrail model")
+    print(f"accuracy when decided: {correct / decided if decided else 0:.1%} "
+          f"({false_allow} wrongly allowed, {false_block} wrongly blocked)")
+    print(f"latency: {per_call_us:.1f} us per message")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
 
-from dataclasses import dataclass
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
 from datetime import timedelta
 from enum import Enum
+from typing import Any
 
 import asyncio
 from temporalio import workflow
 from temporalio.contrib import openai_agents
 from temporalio.common import RetryPolicy
+from temporalio.exceptions import ActivityError
 
 from common.user_message import ProcessUserMessageInput, ChatInteraction
 from common.status_update import StatusUpdate
@@ -17,6 +20,11 @@ from common.agent_constants import BENE_AGENT_NAME, BENE_HANDOFF, BENE_INSTRUCTI
     ROUTING_INSTRUCTIONS
 
 from temporal_supervisor.activities.event_stream_activities import EventStreamActivities
+from temporal_supervisor.agent_models import agent_model_settings
+from temporal_supervisor.activities.guardrail_cache import GuardrailCacheActivities, guardrail_cache_key
+from temporal_supervisor.workflows.history_policy import HistoryPolicy, measure
+from temporal_supervisor.workflows.intent_router import IntentRouter, KeywordIntentRouter
+from temporal_supervisor.workflows.routing_classifier import ALLOW, UNSURE, RoutingDecision, classify_routing
 
 from temporal_supervisor.activities.open_account import OpenAccount, open_new_investment_account
 from common.account_context import UpdateAccountOpeningStateInput
@@ -35,10 +43,12 @@ with workflow.unsafe.imports_passed_through():
         ToolCallOutputItem,
         TResponseInputItem,
         input_guardrail,
+        FunctionTool,
         RunContextWrapper,
         GuardrailFunctionOutput,
         InputGuardrailTripwireTriggered,
     )
+    from agents.tool_context import ToolContext
     from pydantic import BaseModel
 
 ### Context
@@ -46,16 +56,99 @@ with workflow.unsafe.imports_passed_through():
 class WealthManagementContext(BaseModel):
     client_id: str | None = None
 
+# bump when the snapshot changes shape; older snapshots must keep restoring
+SNAPSHOT_VERSION = 1
+# how many chat interactions are carried over to the next run
+SNAPSHOT_CHAT_HISTORY = 20
+# continue as new at least this often so history and replay stay small
+MAX_TURNS_PER_RUN = 25
+
+GUARDRAIL_OPTIMISTIC = "optimistic"
+GUARDRAIL_SEQUENTIAL = "sequential"
+GUARDRAIL_MODES = (GUARDRAIL_OPTIMISTIC, GUARDRAIL_SEQUENTIAL)
+
+class WealthManagementSnapshot(BaseModel):
+    """ Everything a continued run needs to pick up where the previous run stopped """
+    version: int = SNAPSHOT_VERSION
+    input_items: list[dict[str, Any]] = []
+    pending_chat_messages: list[str] = []
+    pending_status_updates: list[str] = []
+    current_agent_name: str = SUPERVISOR_AGENT_NAME
+    context: WealthManagementContext = WealthManagementContext()
+    chat_history: list[ChatInteraction] = []
+    # answer every queued chat message in one agent turn instead of one turn each
+    coalesce_chat_messages: bool = False
+    # optimistic: the guardrail runs alongside the first model call; sequential: before it
+    guardrail_mode: str = GUARDRAIL_OPTIMISTIC
+    # start clear requests at the agent that handles them instead of going through the supervisor
+    intent_routing: bool = False
+    # every agent runs the routing guardrail before it answers
+    guardrails_enabled: bool = False
+
 class RoutingGuardrailOutput(BaseModel):
     is_wealth_management_question: bool
     reasoning: str
 
+# every agent names itself in its model settings, the worker picks its model (agent_models.py)
 routing_guardrail_agent = Agent(
     name=ROUTING_GUARDRAIL_NAME,
+    model_settings=agent_model_settings(ROUTING_GUARDRAIL_NAME),
     instructions=ROUTING_INSTRUCTIONS,
     output_type=RoutingGuardrailOutput,
 )
 
+async def _cached_verdict(cache_key: str) -> RoutingGuardrailOutput | None:
+    """ A verdict for the same message to the same agent from any conversation on this worker (or Redis) """
+    try:
+        cached = await workflow.execute_local_activity(
+            GuardrailCacheActivities.lookup_verdict,
+            cache_key,
+            start_to_close_timeout=timedelta(seconds=2),
+            retry_policy=RetryPolicy(maximum_attempts=1))
+    except ActivityError as e:
+        workflow.logger.warning(f"Guardrail cache lookup failed, asking the model: {e}")
+        return None
+    return RoutingGuardrailOutput(**cached) if cached else None
+
+async def _store_verdict(cache_key: str, verdict: RoutingGuardrailOutput):
+    try:
+        await workflow.execute_local_activity(
+            GuardrailCacheActivities.store_verdict,
+            args=[cache_key, verdict.model_dump()],
+            start_to_close_timeout=timedelta(seconds=2),
+            retry_policy=RetryPolicy(maximum_attempts=1))
+    except ActivityError as e:
+        workflow.logger.warning(f"Could not cache guardrail verdict: {e}")
+
+# The routing verdict of the turn in progress, None when the agent has no guardrail.
+# A context variable rather than workflow state: every task Runner.run starts copies
+# it, so the model turn the SDK leaves running after a tripwire keeps seeing its own
+# (blocking) verdict even once the next turn has started.
+_turn_verdict: ContextVar[asyncio.Future | None] = ContextVar("turn_verdict", default=None)
+
+def wait_for_guardrail(tool: FunctionTool) -> FunctionTool:
+    """
+    Holds a side-effecting tool until the routing guardrail has allowed the turn.
+    The guardrail runs alongside the first model call, so without this a tool call
+    from that call could change an account before the tripwire fires. Turns without a
+    verdict to wait for (no guardrail, or a run started before the wait-for-guardrail
+    patch) run the tool right away.
+    """
+    invoke = tool.on_invoke_tool
+
+    async def on_invoke_tool(ctx: ToolContext[Any], input: str) -> Any:
+        turn_verdict = _turn_verdict.get()
+        if turn_verdict is not None:
+            if not turn_verdict.done():
+                workflow.logger.info(f"{tool.name} is waiting for the routing guardrail")
+            verdict = await turn_verdict
+            if not verdict.is_wealth_management_question:
+                # the turn is discarded anyway, this only ends the abandoned model turn
+                return f"{tool.name} was not run because the request was blocked"
+        return await invoke(ctx, input)
+
+    return replace(tool, on_invoke_tool=on_invoke_tool)
+
 @input_guardrail
 async def routing_guardrail(
         ctx: RunContextWrapper[WealthManagementContext], agent: Agent, input: str | list[TResponseInputItem]
@@ -69,13 +162,46 @@ async def routing_guardrail(
         last_message = str(input)
         workflow.logger.info(f"Analyzing message: {last_message}")
     
-    result = await Runner.run(routing_guardrail_agent, input, context=ctx.context)
+    turn_verdict = _turn_verdict.get()
+    if turn_verdict is not None and turn_verdict.done():
+        # sequential mode already decided this turn before the agent started
+        verdict = turn_verdict.result()
+        return GuardrailFunctionOutput(output_info=verdict, tripwire_triggered=not verdict.is_wealth_management_question)
+
+    # obvious cases are decided locally, repeated questions come from the cache,
+    # and only the rest cost a model call; runs started before the local classifier
+    # always asked the model
+    if workflow.patched("routing-local-classifier"):
+        decision = classify_routing(str(last_message))
+    else:
+        decision = RoutingDecision(UNSURE, "local classifier not in use")
+    workflow.metric_meter().create_counter(
+        "routing_guardrail_decisions", "Routing guardrail verdicts by where they were decided"
+    ).add(1, {"source": "model_or_cache" if decision.verdict == UNSURE else "local"})
+    if decision.verdict != UNSURE:
+        verdict = RoutingGuardrailOutput(is_wealth_management_question=decision.verdict == ALLOW,
+                                         reasoning=f"Local classifier: {decision.reason}")
+    else:
+        cache_key = guardrail_cache_key(agent.name, str(last_message))
+        # runs started before the cache go straight to the model
+        use_cache = workflow.patched("guardrail-verdict-cache")
+        verdict = await _cached_verdict(cache_key) if use_cache else None
+        if verdict is None:
+            result = await Runner.run(routing_guardrail_agent, input, context=ctx.context)
+            verdict = result.final_output
+            if use_cache:
+                await _store_verdict(cache_key, verdict)
+        else:
+            workflow.logger.info("Guardrail verdict served from the cache")
+    if turn_verdict is not None:
+        # releases the tool calls waiting in wait_for_guardrail
+        turn_verdict.set_result(verdict)
     
-    workflow.logger.info(f"Guardrail result: {result.final_output}")
-    should_block = not result.final_output.is_wealth_management_question
+    workflow.logger.info(f"Guardrail result: {verdict}")
+    should_block = not verdict.is_wealth_management_question
     workflow.logger.info(f"Should block: {should_block}")
-    workflow.logger.info(f"Question is wealth management: {result.final_output.is_wealth_management_question}")
-    workflow.logger.info(f"Reasoning: {result.final_output.reasoning}")
+    workflow.logger.info(f"Question is wealth management: {verdict.is_wealth_management_question}")
+    workflow.logger.info(f"Reasoning: {verdict.reasoning}")
     
     if should_block:
         workflow.logger.info(f"Guardrail tripwire triggered! Blocking non-wealth-management question.")
@@ -83,7 +209,7 @@ async def routing_guardrail(
         workflow.logger.info(f"Guardrail allowing wealth management question to pass through.")
     
     return GuardrailFunctionOutput(
-        output_info=result.final_output,
+        output_info=verdict,
         tripwire_triggered=should_block,
     )
 
@@ -99,39 +225,42 @@ def init_agents(disable_guardrails: bool) -> Agent[WealthManagementContext]:
         guardrails = [routing_guardrail]
     beneficiary_agent = Agent[WealthManagementContext](
         name=BENE_AGENT_NAME,
+        model_settings=agent_model_settings(BENE_AGENT_NAME),
         handoff_description=BENE_HANDOFF,
         instructions=BENE_INSTRUCTIONS,
         tools=[openai_agents.workflow.activity_as_tool(Beneficiaries.list_beneficiaries,
                                 start_to_close_timeout=timedelta(seconds=5)),
-               openai_agents.workflow.activity_as_tool(Beneficiaries.add_beneficiary,
-                                start_to_close_timeout=timedelta(seconds=5)),
-               openai_agents.workflow.activity_as_tool(Beneficiaries.delete_beneficiary,
-                                start_to_close_timeout=timedelta(seconds=5))
+               wait_for_guardrail(openai_agents.workflow.activity_as_tool(Beneficiaries.add_beneficiary,
+                                start_to_close_timeout=timedelta(seconds=5))),
+               wait_for_guardrail(openai_agents.workflow.activity_as_tool(Beneficiaries.delete_beneficiary,
+                                start_to_close_timeout=timedelta(seconds=5)))
                ],
         input_guardrails=guardrails,
     )
 
     open_account_agent = Agent[WealthManagementContext](
         name=OPEN_ACCOUNT_AGENT_NAME,
+        model_settings=agent_model_settings(OPEN_ACCOUNT_AGENT_NAME),
         handoff_description=OPEN_ACCOUNT_HANDOFF,
         instructions=OPEN_ACCOUNT_INSTRUCTIONS,
         tools=[
-            open_new_investment_account,
+            wait_for_guardrail(open_new_investment_account),
             openai_agents.workflow.activity_as_tool(OpenAccount.get_current_client_info, start_to_close_timeout=timedelta(seconds=5)),
-            openai_agents.workflow.activity_as_tool(OpenAccount.approve_kyc, start_to_close_timeout=timedelta(seconds=5)),
-            openai_agents.workflow.activity_as_tool(OpenAccount.update_client_details, start_to_close_timeout=timedelta(seconds=5)),
+            wait_for_guardrail(openai_agents.workflow.activity_as_tool(OpenAccount.approve_kyc, start_to_close_timeout=timedelta(seconds=5))),
+            wait_for_guardrail(openai_agents.workflow.activity_as_tool(OpenAccount.update_client_details, start_to_close_timeout=timedelta(seconds=5))),
         ],
         input_guardrails=guardrails,
     )
 
     investment_agent = Agent[WealthManagementContext](
         name=INVEST_AGENT_NAME,
+        model_settings=agent_model_settings(INVEST_AGENT_NAME),
         handoff_description=INVEST_HANDOFF,
         instructions=INVEST_INSTRUCTIONS,
         tools=[openai_agents.workflow.activity_as_tool(Investments.list_investments,
                                 start_to_close_timeout=timedelta(seconds=5)),
-               openai_agents.workflow.activity_as_tool(Investments.close_investment,
-                                start_to_close_timeout=timedelta(seconds=5))],
+               wait_for_guardrail(openai_agents.workflow.activity_as_tool(Investments.close_investment,
+                                start_to_close_timeout=timedelta(seconds=5)))],
         handoffs=[
             open_account_agent
         ],
@@ -140,6 +269,7 @@ def init_agents(disable_guardrails: bool) -> Agent[WealthManagementContext]:
 
     supervisor_agent = Agent[WealthManagementContext](
         name=SUPERVISOR_AGENT_NAME,
+        model_settings=agent_model_settings(SUPERVISOR_AGENT_NAME),
         handoff_description=SUPERVISOR_HANDOFF,
         instructions=SUPERVISOR_INSTRUCTIONS,
         handoffs=[
@@ -154,20 +284,62 @@ def init_agents(disable_guardrails: bool) -> Agent[WealthManagementContext]:
     open_account_agent.handoffs.append(investment_agent)
     return supervisor_agent
 
+def find_agent(root: Agent, name: str) -> Agent | None:
+    """ Looks up an agent by name among root and everything reachable through handoffs """
+    seen = set()
+    stack = [root]
+    while stack:
+        agent = stack.pop()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        if agent.name == name:
+            return agent
+        stack.extend(handoff for handoff in agent.handoffs if isinstance(handoff, Agent))
+    return None
+
 
 @workflow.defn
 class WealthManagementWorkflow:
 
-    def __init__(self, input_items: list[TResponseInputItem] | None = None ):
+    @workflow.init
+    def __init__(self, snapshot: WealthManagementSnapshot | list[dict[str, Any]] | None = None):
         self.wf_id = workflow.info().workflow_id
         self.pending_chat_messages: asyncio.Queue = asyncio.Queue()
         self.pending_status_updates: asyncio.Queue = asyncio.Queue()
         self.processed_response: list[ChatInteraction] | None = None
         self.run_config = RunConfig()
         self.chat_history: list[ChatInteraction] = []
-        self.current_agent: Agent[WealthManagementContext] = init_agents(True)
+        self.guardrails_enabled = False
+        self.current_agent: Agent[WealthManagementContext] = init_agents(not self.guardrails_enabled)
         self.context = WealthManagementContext()
-        self.input_items = [] if input_items is None else input_items
+        self.input_items = []
+        self.history_policy = HistoryPolicy()
+        self.turns_this_run = 0
+        # set in run, None for runs started before the turn limit
+        self.max_turns_per_run: int | None = None
+        self.status_lane_busy = False
+        # events waiting to be written to the event stream by _flush_events
+        self.event_buffer: list[ChatInteraction | StatusUpdate] = []
+        self.coalesce_chat_messages = False
+        self.guardrail_mode = GUARDRAIL_OPTIMISTIC
+        self.intent_router: IntentRouter | None = None
+        meter = workflow.metric_meter()
+        self.turn_input_items = meter.create_histogram(
+            "wealth_management_turn_input_items", "Conversation items sent to Runner.run per turn")
+        self.turn_input_bytes = meter.create_histogram(
+            "wealth_management_turn_input_bytes", "Size of the conversation sent to Runner.run per turn", "By")
+        self.coalesced_messages = meter.create_counter(
+            "wealth_management_coalesced_messages", "Chat messages answered in a turn started for an earlier message")
+        self.routed_turns = meter.create_counter(
+            "wealth_management_routed_turns", "Turns the intent router started at another agent than the current one")
+        # restored here rather than in run so it is in place before any signal handler runs;
+        # runs started before the snapshot existed never restored anything and must replay that way
+        if snapshot is not None and workflow.patched("snapshot-restore"):
+            if isinstance(snapshot, list):
+                # runs continued before snapshots existed only carried the input items
+                snapshot = WealthManagementSnapshot(input_items=snapshot)
+            self._restore(snapshot)
         self.end_workflow = False
         self.sched_to_close_timeout = timedelta(seconds=5)
         self.retry_policy = RetryPolicy(initial_interval=timedelta(seconds=1),
@@ -175,7 +347,7 @@ class WealthManagementWorkflow:
                                maximum_interval=timedelta(seconds=30))
 
     @workflow.run
-    async def run(self, input_items: list[TResponseInputItem] | None = None):
+    async def run(self, snapshot: WealthManagementSnapshot | list[dict[str, Any]] | None = None):
         if workflow.info().continued_run_id is None:
             # delete any previous conversations
             # FIXME: We shouldn't be deleting conversations here,
@@ -190,53 +362,144 @@ class WealthManagementWorkflow:
                 schedule_to_close_timeout=self.sched_to_close_timeout,
                 retry_policy=self.retry_policy)
 
+        if workflow.patched("max-turns-per-run"):
+            self.max_turns_per_run = MAX_TURNS_PER_RUN
+
+        # status updates have their own lane so they reach the UI while a chat turn is still running;
+        # runs started before the lane keep handling them in this loop
+        status_lane = asyncio.create_task(self._status_update_lane()) if workflow.patched("status-lane") else None
+
         while True:
-            workflow.logger.info("At top of loop - waiting for messages or status updates")
+            workflow.logger.info("At top of loop - waiting for messages")
             # Wait for queue items or end workflow
-            await workflow.wait_condition(
-                lambda: not self.pending_chat_messages.empty() or not self.pending_status_updates.empty() or self.end_workflow
-            )
+            if status_lane is None:
+                await workflow.wait_condition(
+                    lambda: not self.pending_chat_messages.empty() or not self.pending_status_updates.empty()
+                            or self.end_workflow
+                )
+            else:
+                await workflow.wait_condition(
+                    lambda: not self.pending_chat_messages.empty() or self.end_workflow
+                            or status_lane.done() or self._should_continue_as_new()
+                )
+
+            if status_lane is not None and status_lane.done():
+                # the lane only stops when publishing failed; fail the same way the loop would have
+                status_lane.result()
 
             if self.end_workflow:
                 workflow.logger.info("Ending workflow.")
                 return
 
-            # Process chat messages
+            # Process chat messages, one turn at a time so they keep their order
             if not self.pending_chat_messages.empty():
-                message = self.pending_chat_messages.get_nowait()
-                self.processed_response = await self._process_chat_message(message)
+                messages = [self.pending_chat_messages.get_nowait()]
+                while self.coalesce_chat_messages and not self.pending_chat_messages.empty() \
+                        and workflow.patched("coalesce-chat-messages"):
+                    messages.append(self.pending_chat_messages.get_nowait())
+                self.processed_response = await self._process_chat_messages(messages)
                 workflow.logger.info("chat message processed.")
 
-            # Process status updates
-            if not self.pending_status_updates.empty():
-                status_message = self.pending_status_updates.get_nowait()
-                await self._process_status_update(status_message)
+            if status_lane is None and not self.pending_status_updates.empty():
+                self._process_status_update(self.pending_status_updates.get_nowait())
+                await self._flush_events()
                 workflow.logger.info("status update processed.")
 
             # do we need to do a continue as new?
-            if workflow.info().is_continue_as_new_suggested():
-                # wait until everything finishes before doing Continue As New
-                # FIXME: This will only ensure that things are added to our self.pending_ queues, it won't process them. They will be lost.
+            if self._should_continue_as_new():
+                # wait until every signal has put its message on our queues and the
+                # status lane is between updates; whatever is still queued is carried over in the snapshot
                 await workflow.wait_condition(
-                    lambda: workflow.all_handlers_finished()
+                    lambda: workflow.all_handlers_finished() and not self.status_lane_busy
                 )
-                workflow.continue_as_new(args=[self.input_items])
+                workflow.continue_as_new(args=[self._snapshot()])
 
-    async def _process_chat_message(self, message: str) -> list[ChatInteraction]:
-        workflow.logger.info(f"processing chat message: {message}")
-        length = len(self.chat_history)
+    def _should_continue_as_new(self) -> bool:
+        if workflow.info().is_continue_as_new_suggested():
+            return True
+        return self.max_turns_per_run is not None and self.turns_this_run >= self.max_turns_per_run
 
-        chat_interaction = ChatInteraction(
-            user_prompt=message,
-            text_response=""
+    async def _status_update_lane(self):
+        """ Publishes status updates as soon as they arrive, independent of the chat turn in progress """
+        while True:
+            await workflow.wait_condition(lambda: not self.pending_status_updates.empty())
+            self.status_lane_busy = True
+            try:
+                # a burst of state changes goes out in one append
+                while not self.pending_status_updates.empty():
+                    status_message = self.pending_status_updates.get_nowait()
+                    self._process_status_update(status_message)
+                await self._flush_events()
+                workflow.logger.info("status updates processed.")
+            finally:
+                self.status_lane_busy = False
+
+    def _snapshot(self) -> WealthManagementSnapshot:
+        pending_chat_messages = []
+        while not self.pending_chat_messages.empty():
+            pending_chat_messages.append(self.pending_chat_messages.get_nowait())
+        pending_status_updates = []
+        while not self.pending_status_updates.empty():
+            pending_status_updates.append(self.pending_status_updates.get_nowait())
+        snapshot = WealthManagementSnapshot(
+            input_items=self.history_policy.apply(self.input_items),
+            pending_chat_messages=pending_chat_messages,
+            pending_status_updates=pending_status_updates,
+            current_agent_name=self.current_agent.name,
+            context=self.context,
+            chat_history=self.chat_history[-SNAPSHOT_CHAT_HISTORY:],
+            coalesce_chat_messages=self.coalesce_chat_messages,
+            guardrail_mode=self.guardrail_mode,
+            intent_routing=self.intent_router is not None,
+            guardrails_enabled=self.guardrails_enabled,
         )
+        workflow.logger.info(f"Continuing as new with {len(snapshot.input_items)} input items, "
+                             f"{len(pending_chat_messages)} queued messages and "
+                             f"{len(pending_status_updates)} queued status updates")
+        return snapshot
+
+    def _restore(self, snapshot: WealthManagementSnapshot):
+        if snapshot.version > SNAPSHOT_VERSION:
+            workflow.logger.warning(f"Restoring snapshot version {snapshot.version} "
+                                    f"with version {SNAPSHOT_VERSION} code")
+        self.input_items = list(snapshot.input_items)
+        for message in snapshot.pending_chat_messages:
+            self.pending_chat_messages.put_nowait(message)
+        for status_message in snapshot.pending_status_updates:
+            self.pending_status_updates.put_nowait(status_message)
+        if snapshot.guardrails_enabled != self.guardrails_enabled:
+            self.guardrails_enabled = snapshot.guardrails_enabled
+            self.current_agent = init_agents(not self.guardrails_enabled)
+        self.current_agent = find_agent(self.current_agent, snapshot.current_agent_name) or self.current_agent
+        self.context = snapshot.context
+        self.chat_history = list(snapshot.chat_history)
+        self.coalesce_chat_messages = snapshot.coalesce_chat_messages
+        self.guardrail_mode = snapshot.guardrail_mode
+        self.intent_router = KeywordIntentRouter() if snapshot.intent_routing else None
+
+    async def _process_chat_messages(self, messages: list[str]) -> list[ChatInteraction]:
+        workflow.logger.info(f"processing chat messages: {messages}")
+        length = len(self.chat_history)
+
+        # every prompt gets its own interaction, the single
+        # agent turn's response goes with the last one
+        chat_interactions = [ChatInteraction(user_prompt=message, text_response="") for message in messages]
+        chat_interaction = chat_interactions[-1]
+        # one user item, so the guardrail (which looks at the last item) sees every prompt
         try:
-            await self._process_user_message(chat_interaction, message)
+            await self._process_user_message(chat_interaction, "\n\n".join(messages))
         except InputGuardrailTripwireTriggered as e:
             workflow.logger.info(f"Guardrail Tripwire triggered {e}")
             await self._handle_guardrail_failure(chat_interaction, e)
 
-        self.chat_history.append(chat_interaction)
+        if len(messages) > 1:
+            workflow.logger.info(f"Answered {len(messages)} queued messages in one turn")
+            self.coalesced_messages.add(len(messages) - 1)
+        for earlier in chat_interactions[:-1]:
+            earlier.agent_trace = "Answered together with the next message"
+
+        self.chat_history.extend(chat_interactions)
+        self.turns_this_run += 1
 
         current_details = "\n\n"
         for item in self.chat_history:
@@ -244,33 +507,83 @@ class WealthManagementWorkflow:
 
         workflow.set_current_details(current_details)
 
-        await workflow.execute_local_activity(
-            EventStreamActivities.append_chat_interaction,
-            args=[self.wf_id, chat_interaction],
-            schedule_to_close_timeout=self.sched_to_close_timeout,
-            retry_policy=self.retry_policy)
+        self.event_buffer.extend(chat_interactions)
+        await self._flush_events()
 
         return self.chat_history[length:]
 
-    async def _process_status_update(self, status_message: str):
+    def _process_status_update(self, status_message: str):
         workflow.logger.info(f"processing status update: {status_message}")
 
         # TODO: Consider filtering which messages we want to update the client
-        status_update = StatusUpdate(status=status_message)
-        result = await workflow.execute_local_activity(
-            EventStreamActivities.append_status_update,
-            args=[self.wf_id, status_update],
-            schedule_to_close_timeout=self.sched_to_close_timeout,
-            retry_policy=self.retry_policy)
+        self.event_buffer.append(StatusUpdate(status=status_message))
+
+    async def _flush_events(self):
+        """ Writes everything buffered so far to the event stream with a single local activity """
+        if not self.event_buffer:
+            return
+        # swap before awaiting so the other lane can keep buffering
+        events, self.event_buffer = self.event_buffer, []
+        if workflow.patched("buffered-events"):
+            await workflow.execute_local_activity(
+                EventStreamActivities.append_events,
+                args=[self.wf_id, events],
+                schedule_to_close_timeout=self.sched_to_close_timeout,
+                retry_policy=self.retry_policy)
+            return
+
+        # runs started before events were batched replay one local activity per event
+        for event in events:
+            if isinstance(event, ChatInteraction):
+                await workflow.execute_local_activity(
+                    EventStreamActivities.append_chat_interaction,
+                    args=[self.wf_id, event],
+                    schedule_to_close_timeout=self.sched_to_close_timeout,
+                    retry_policy=self.retry_policy)
+            else:
+                await workflow.execute_local_activity(
+                    EventStreamActivities.append_status_update,
+                    args=[self.wf_id, event],
+                    schedule_to_close_timeout=self.sched_to_close_timeout,
+                    retry_policy=self.retry_policy)
 
     async def _process_user_message(self, chat_interaction: ChatInteraction, message: str):
-        self.input_items.append({"content": message, "role": "user"})
-        result = await Runner.run(
-            self.current_agent,
-            self.input_items,
-            context=self.context,
-            run_config=self.run_config,
-        )
+        previous_items = self.input_items
+        self.input_items = self.input_items + [{"content": message, "role": "user"}]
+        # keep the per-turn input (and with it the model payloads and prompt tokens) bounded;
+        # runs started before the policy send the whole conversation
+        if workflow.patched("history-policy"):
+            self.input_items = self.history_policy.apply(self.input_items)
+        item_count, item_bytes = measure(self.input_items)
+        workflow.logger.info(f"Turn input: {item_count} items, {item_bytes} bytes")
+        self.turn_input_items.record(item_count)
+        self.turn_input_bytes.record(item_bytes)
+
+        agent = self._route(message)
+        # resolved by routing_guardrail, tools wrapped in wait_for_guardrail wait for it;
+        # runs started before tools waited keep running them as soon as the model asks
+        turn_verdict = None
+        if agent.input_guardrails and workflow.patched("wait-for-guardrail"):
+            turn_verdict = asyncio.get_running_loop().create_future()
+        _turn_verdict.set(turn_verdict)
+        try:
+            if turn_verdict is not None and self.guardrail_mode == GUARDRAIL_SEQUENTIAL \
+                    and workflow.patched("sequential-guardrail"):
+                await self._run_input_guardrails(agent)
+            result = await Runner.run(
+                agent,
+                self.input_items,
+                context=self.context,
+                run_config=self.run_config,
+            )
+        except InputGuardrailTripwireTriggered:
+            # discard the turn, the blocked question does not become part of the conversation
+            self.input_items = previous_items
+            raise
+        finally:
+            if turn_verdict is not None and not turn_verdict.done():
+                # the guardrail failed, never release tools of the abandoned model turn
+                turn_verdict.cancel()
 
         workflow.logger.info("Runner.run has exited.")
         self.input_items = result.to_input_list()
@@ -282,6 +595,29 @@ class WealthManagementWorkflow:
         chat_interaction.json_response = json_response
         chat_interaction.agent_trace = agent_trace
 
+    def _route(self, message: str) -> Agent[WealthManagementContext]:
+        """ The agent to start the turn with, the current one unless the intent router is sure """
+        if self.intent_router is None:
+            return self.current_agent
+        agent_name = self.intent_router.route(message, self.current_agent.name)
+        if agent_name is None or agent_name == self.current_agent.name:
+            return self.current_agent
+        agent = find_agent(self.current_agent, agent_name)
+        if agent is None:
+            workflow.logger.warning(f"Intent router chose unknown agent {agent_name}")
+            return self.current_agent
+        workflow.logger.info(f"Intent router started the turn at {agent_name} instead of {self.current_agent.name}")
+        self.routed_turns.add(1, {"agent": agent_name})
+        return agent
+
+    async def _run_input_guardrails(self, agent: Agent[WealthManagementContext]):
+        """ Decides the turn before the agent starts, Runner.run then reuses the verdict """
+        wrapper = RunContextWrapper(context=self.context)
+        for guardrail in agent.input_guardrails:
+            result = await guardrail.run(agent, self.input_items, wrapper)
+            if result.output.tripwire_triggered:
+                raise InputGuardrailTripwireTriggered(result)
+
     async def _handle_guardrail_failure(self, chat_interaction, e):
         workflow.logger.info(f"Guardrail tripwire triggered: {e}")
         text_response = "I'm sorry, but I can only help with wealth management questions related to beneficiaries and investments. Please ask me about your beneficiaries, investment accounts, or other wealth management topics."
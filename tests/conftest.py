@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+import pytest
+from temporalio.api.common.v1 import Payload
+
+from common.redis_config import RedisConfig
+from temporal_supervisor.claim_check import claim_check_codec
+from temporal_supervisor.claim_check.claim_check_codec import ClaimCheckCodec, ClaimCheckConfig
+
+def json_payload(value) -> Payload:
+    return Payload(metadata={"encoding": b"json/plain"}, data=json.dumps(value).encode())
+
+def conversation(turns: int) -> Payload:
+    return json_payload([{"role": "user", "content": f"Who are my beneficiaries? ({i})"} for i in range(turns)])
+
+def round_trip(codec, payloads):
+    """ Encodes then decodes payloads, returning both results """
+    async def run():
+        encoded = await codec.encode(payloads)
+        return encoded, await codec.decode(encoded)
+    return asyncio.run(run())
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """ A fakeredis client in place of the shared Redis pool """
+    fakeredis = pytest.importorskip("fakeredis")
+    from redis.asyncio.client import Pipeline
+
+    # fakeredis has no TOUCH; EXISTS gives the same reply
+    monkeypatch.setattr(Pipeline, "touch", lambda self, *keys: self.exists(*keys), raising=False)
+    client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+    monkeypatch.setattr(claim_check_codec, "get_redis_client", lambda config=None, decode_responses=False: client)
+    return client
+
+@pytest.fixture
+def claim_check_config(monkeypatch):
+    for name in ("CLAIM_CHECK_BATCH_SIZE", "CLAIM_CHECK_MAX_IN_FLIGHT", "CLAIM_CHECK_THRESHOLD_BYTES",
+                 "CLAIM_CHECK_KNOWN_KEYS", "CLAIM_CHECK_TTL_SECONDS", "CLAIM_CHECK_REFRESH_ON_DECODE",
+                 "CLAIM_CHECK_CACHE_BYTES"):
+        monkeypatch.delenv(name, raising=False)
+    # small batches so a few payloads already take several round trips; no cache so decode reads Redis
+    return ClaimCheckConfig(batch_size=2, cache_bytes=0)
+
+@pytest.fixture
+def claim_check(fake_redis, claim_check_config):
+    return ClaimCheckCodec(RedisConfig(), claim_check_config)
@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import pytest
+from agents import AgentOutputSchema, ModelSettings
+from agents.exceptions import ModelBehaviorError
+
+from common.agent_constants import BENE_AGENT_NAME, ROUTING_GUARDRAIL_NAME, SUPERVISOR_AGENT_NAME
+from temporal_supervisor.agent_models import AGENT_NAMES, AgentModelConfig, MeteredModel, env_prefix, \
+    split_agent_name
+from temporal_supervisor.workflows.supervisor_workflow import RoutingGuardrailOutput, find_agent, init_agents, \
+    routing_guardrail_agent
+
+# gpt-4o-mini's own output limit, the longest answer the guardrail can get back
+MODEL_OUTPUT_TOKENS = 16384
+# a rough upper bound for English text
+CHARS_PER_TOKEN = 4
+
+def maximal_response() -> str:
+    sentence = "The user asks to add their daughter as a beneficiary on their brokerage account. "
+    reasoning = sentence * (MODEL_OUTPUT_TOKENS * CHARS_PER_TOKEN // len(sentence))
+    return json.dumps({"is_wealth_management_question": True, "reasoning": reasoning})
+
+@pytest.fixture
+def config(monkeypatch):
+    monkeypatch.delenv("DEFAULT_MODEL", raising=False)
+    for agent_name in AGENT_NAMES:
+        for suffix in ("MODEL", "TEMPERATURE", "MAX_TOKENS"):
+            monkeypatch.delenv(f"{env_prefix(agent_name)}_{suffix}", raising=False)
+    return AgentModelConfig()
+
+class FakeModel:
+    """ Records the settings of the call instead of asking OpenAI """
+
+    def __init__(self, name: str, calls: list):
+        self.name = name
+        self.calls = calls
+
+    async def get_response(self, system_instructions, input, model_settings, *args, **kwargs):
+        self.calls.append((self.name, model_settings))
+        return type("ModelResponse", (), {"usage": None})()
+
+def call(model: MeteredModel, model_settings: ModelSettings):
+    return asyncio.run(model.get_response(None, "hi", model_settings, [], None, [], None,
+                                          previous_response_id=None, conversation_id=None, prompt=None))
+
+def test_routing_guardrail_output_is_not_capped(config):
+    agent_name, _ = split_agent_name(routing_guardrail_agent.model_settings)
+    model, settings = config.resolve(agent_name, routing_guardrail_agent.model)
+    assert model == "gpt-4o-mini"
+    assert settings.max_tokens is None
+
+def test_agents_leave_the_model_to_the_worker():
+    supervisor = init_agents(True)
+    for agent in (routing_guardrail_agent, supervisor, find_agent(supervisor, BENE_AGENT_NAME)):
+        assert agent.model is None
+        assert split_agent_name(agent.model_settings)[0] == agent.name
+
+def test_model_is_chosen_per_agent(monkeypatch, config):
+    monkeypatch.setenv(f"{env_prefix(BENE_AGENT_NAME)}_TEMPERATURE", "0.2")
+    calls = []
+    model = MeteredModel(AgentModelConfig(), None, lambda name: FakeModel(name, calls))
+    supervisor = init_agents(True)
+    call(model, supervisor.model_settings)
+    call(model, find_agent(supervisor, BENE_AGENT_NAME).model_settings.resolve(ModelSettings(top_p=0.5)))
+    call(model, ModelSettings())
+    assert [name for name, _ in calls] == ["gpt-4o-mini", "gpt-4o", "gpt-4o"]
+    assert [(s.temperature, s.top_p) for _, s in calls] == [(0, None), (0.2, 0.5), (None, None)]
+    # the agent's name is not sent to OpenAI
+    assert all(s.metadata is None for _, s in calls)
+
+def test_model_set_on_the_agent_wins(config):
+    assert config.resolve(SUPERVISOR_AGENT_NAME, "gpt-4.1")[0] == "gpt-4.1"
+    # runs started when agents set their model to their own name
+    assert config.resolve(None, SUPERVISOR_AGENT_NAME)[0] == "gpt-4o-mini"
+
+def test_maximal_length_response_parses():
+    schema = AgentOutputSchema(routing_guardrail_agent.output_type)
+    verdict = schema.validate_json(maximal_response())
+    assert isinstance(verdict, RoutingGuardrailOutput)
+    assert verdict.is_wealth_management_question
+    assert len(verdict.reasoning) >= (MODEL_OUTPUT_TOKENS - 100) * CHARS_PER_TOKEN
+
+def test_truncated_response_does_not_parse():
+    # what a max_tokens cap does to a long answer
+    schema = AgentOutputSchema(routing_guardrail_agent.output_type)
+    with pytest.raises(ModelBehaviorError):
+        schema.validate_json(maximal_response()[:256 * CHARS_PER_TOKEN])
+
+def test_max_tokens_from_environment(monkeypatch, config):
+    monkeypatch.setenv(f"{env_prefix(ROUTING_GUARDRAIL_NAME)}_MAX_TOKENS", "2048")
+    _, settings = AgentModelConfig().resolve(ROUTING_GUARDRAIL_NAME)
+    assert settings.max_tokens == 2048
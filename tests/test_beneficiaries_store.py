@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+from common.beneficiaries_manager import BeneficiariesStore
+
+@pytest.fixture
+def beneficiaries_file(tmp_path):
+    path = tmp_path / "beneficiaries.json"
+    path.write_text(json.dumps({"123": [
+        {"beneficiary_id": "b-1", "first_name": "Jane", "last_name": "Doe", "relationship": "daughter"},
+    ]}))
+    return str(path)
+
+def read(path):
+    with open(path) as f:
+        return json.load(f)
+
+def test_changes_are_journaled_until_the_snapshot(beneficiaries_file):
+    store = BeneficiariesStore(beneficiaries_file, snapshot_every=3)
+    store.add("123", "John", "Doe", "son")
+    store.add("456", "Ann", "Smith", "spouse")
+    # the JSON file is untouched, the journal holds the changes
+    assert list(read(beneficiaries_file)) == ["123"]
+    assert len(open(f"{beneficiaries_file}.journal").readlines()) == 2
+
+    store.delete("123", "b-1")
+    assert [b["first_name"] for b in read(beneficiaries_file)["123"]] == ["John"]
+    assert open(f"{beneficiaries_file}.journal").read() == ""
+
+def test_journal_is_replayed_on_load(beneficiaries_file):
+    store = BeneficiariesStore(beneficiaries_file, snapshot_every=100)
+    added = store.add("123", "John", "Doe", "son")
+    store.delete("123", "b-1")
+    store.add("456", "Ann", "Smith", "spouse")
+
+    # a fresh store, like another process or a restart, sees every change
+    reloaded = BeneficiariesStore(beneficiaries_file, snapshot_every=100)
+    assert reloaded.list("123") == [added]
+    assert [b["first_name"] for b in reloaded.list("456")] == ["Ann"]
+
+def test_other_writers_are_picked_up(beneficiaries_file):
+    reader = BeneficiariesStore(beneficiaries_file, snapshot_every=100)
+    writer = BeneficiariesStore(beneficiaries_file, snapshot_every=100)
+    writer.add("123", "John", "Doe", "son")
+    assert [b["first_name"] for b in reader.list("123")] == ["Jane", "John"]
+    reader.add("123", "Ann", "Doe", "daughter")
+    assert [b["first_name"] for b in reader.list("123")] == ["Jane", "John", "Ann"]
+
+def test_torn_journal_entry_is_skipped_until_complete(beneficiaries_file):
+    store = BeneficiariesStore(beneficiaries_file, snapshot_every=100)
+    store.add("123", "John", "Doe", "son")
+    with open(f"{beneficiaries_file}.journal", "a") as f:
+        f.write('{"op": "delete", "client_id": "123"')
+    reloaded = BeneficiariesStore(beneficiaries_file, snapshot_every=100)
+    assert len(reloaded.list("123")) == 2
+
+def test_flush_writes_the_journal_to_the_file(beneficiaries_file):
+    store = BeneficiariesStore(beneficiaries_file, snapshot_every=100)
+    store.add("123", "John", "Doe", "son")
+    store.flush()
+    assert len(read(beneficiaries_file)["123"]) == 2
+    assert open(f"{beneficiaries_file}.journal").read() == ""
+
+def test_lookups_are_indexed_copies(beneficiaries_file):
+    store = BeneficiariesStore(beneficiaries_file, snapshot_every=100)
+    beneficiary = store.get("123", "b-1")
+    assert beneficiary["first_name"] == "Jane"
+    assert store.get("123", "b-missing") is None
+    assert store.get("456", "b-1") is None
+    # callers can't change the store through what it returns
+    beneficiary["first_name"] = "Changed"
+    store.list("123")[0]["first_name"] = "Changed"
+    assert store.get("123", "b-1")["first_name"] == "Jane"
+
+def test_delete_unknown_beneficiary(beneficiaries_file):
+    store = BeneficiariesStore(beneficiaries_file, snapshot_every=100)
+    assert not store.delete("123", "b-missing")
+    assert not store.delete("456", "b-1")
+    assert not os.path.exists(f"{beneficiaries_file}.journal")
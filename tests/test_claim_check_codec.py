@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from common.redis_config import RedisConfig
+from temporal_supervisor.claim_check.claim_check_codec import ClaimCheckCodec
+from tests.conftest import conversation, json_payload, round_trip
+
+def test_round_trip_over_several_batches(claim_check):
+    payloads = [conversation(i) for i in range(5)]
+    encoded, decoded = round_trip(claim_check, payloads)
+    assert all(p.metadata["temporal.io/claim-check-codec"] == b"v1" for p in encoded)
+    assert decoded == payloads
+    assert claim_check.metrics.payloads_offloaded == 5
+
+def test_missing_claim_check(claim_check):
+    missing = ClaimCheckCodec._claim_check_payload("claim-check:missing")
+    with pytest.raises(ValueError):
+        asyncio.run(claim_check.decode([missing]))
+
+def test_threshold_keeps_small_payloads_inline(claim_check, fake_redis):
+    claim_check.claim_check_config.threshold_bytes = 1024
+    payloads = [json_payload("12345"), conversation(100)]
+    encoded, decoded = round_trip(claim_check, payloads)
+    assert encoded[0] == payloads[0]
+    assert encoded[1].metadata["encoding"] == b"claim-checked"
+    assert decoded == payloads
+    assert asyncio.run(fake_redis.dbsize()) == 1
+    assert (claim_check.metrics.payloads_inline, claim_check.metrics.payloads_offloaded) == (1, 1)
+
+def test_identical_payloads_share_one_key(claim_check, fake_redis):
+    payloads = [conversation(3), conversation(3)]
+    encoded, decoded = round_trip(claim_check, payloads)
+    assert encoded[0].data == encoded[1].data
+    assert encoded[0].data.decode() == ClaimCheckCodec.content_key(payloads[0].SerializeToString())
+    assert decoded == payloads
+    assert asyncio.run(fake_redis.dbsize()) == 1
+
+def test_payload_sent_again_is_not_rewritten(claim_check, claim_check_config, fake_redis):
+    payload = conversation(3)
+    round_trip(claim_check, [payload])
+    written = claim_check.metrics.bytes_written
+    # another worker (a codec that doesn't know the key yet) finds it in Redis
+    other = ClaimCheckCodec(RedisConfig(), claim_check_config)
+    round_trip(other, [payload])
+    assert other.metrics.bytes_written == 0
+    assert other.metrics.payloads_deduplicated == 1
+    assert claim_check.metrics.bytes_written == written
+
+def test_keys_expire_after_the_ttl(claim_check, claim_check_config, fake_redis):
+    claim_check_config.ttl_seconds = 3600
+    [encoded], _ = round_trip(claim_check, [conversation(3)])
+    key = encoded.data.decode()
+    assert 3500 < asyncio.run(fake_redis.ttl(key)) <= 3600
+
+    # storing it again, from another worker, resets the TTL
+    asyncio.run(fake_redis.expire(key, 60))
+    round_trip(ClaimCheckCodec(RedisConfig(), claim_check_config), [conversation(3)])
+    assert 3500 < asyncio.run(fake_redis.ttl(key)) <= 3600
+
+@pytest.mark.parametrize("refresh_on_decode", [False, True])
+def test_decode_refreshes_the_ttl(claim_check, claim_check_config, fake_redis, refresh_on_decode):
+    claim_check_config.ttl_seconds = 3600
+    claim_check_config.refresh_on_decode = refresh_on_decode
+    payloads = [conversation(3), conversation(4), conversation(5)]
+    encoded = asyncio.run(claim_check.encode(payloads))
+    keys = [p.data.decode() for p in encoded]
+    for key in keys:
+        asyncio.run(fake_redis.expire(key, 60))
+
+    assert asyncio.run(claim_check.decode(encoded)) == payloads
+    # the TTL counts down while the test runs
+    assert [asyncio.run(fake_redis.ttl(key)) > 3500 for key in keys] == [refresh_on_decode] * 3
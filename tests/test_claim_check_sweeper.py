@@ -0,0 +1,89 @@
+import asyncio
+import sys
+
+import pytest
+from temporalio.api.common.v1 import Payloads
+from temporalio.api.history.v1 import HistoryEvent
+
+from temporal_supervisor.claim_check import claim_check_sweeper
+from temporal_supervisor.claim_check.claim_check_codec import ClaimCheckCodec
+from temporal_supervisor.claim_check.claim_check_sweeper import collect_claim_check_ids, sweep
+from tests.conftest import json_payload
+
+class IdleTimeRedis:
+    """ Just enough of an async Redis client for the sweeper, with idle times set by the test """
+
+    def __init__(self, values: dict, idle_times: dict):
+        self.values = values
+        self.idle_times = idle_times
+
+    async def scan_iter(self, match: str, count: int):
+        for key in list(self.values):
+            if key.startswith(match.rstrip("*").encode()):
+                yield key
+
+    def pipeline(self, transaction: bool):
+        return IdleTimePipeline(self)
+
+    async def delete(self, *keys) -> int:
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+class IdleTimePipeline:
+
+    def __init__(self, redis: IdleTimeRedis):
+        self.redis = redis
+        self.commands = []
+
+    def object(self, subcommand: str, key: bytes):
+        self.commands.append(self.redis.idle_times.get(key, ValueError("no idle time")))
+
+    def strlen(self, key: bytes):
+        self.commands.append(len(self.redis.values.get(key, b"")))
+
+    async def execute(self, raise_on_error: bool):
+        return self.commands
+
+def key(name: str) -> bytes:
+    return f"claim-check:{name}".encode()
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = IdleTimeRedis(
+        values={key("referenced"): b"1" * 10, key("busy"): b"2" * 20, key("unknown-idle"): b"3" * 30,
+                key("idle"): b"4" * 40, key("other-idle"): b"5" * 50},
+        idle_times={key("referenced"): 7200, key("busy"): 60, key("idle"): 7200, key("other-idle"): 3601})
+    monkeypatch.setattr(claim_check_sweeper, "get_redis_client", lambda config: redis)
+
+    async def referenced_claim_checks(client, query):
+        return {key("referenced").decode()}
+    monkeypatch.setattr(claim_check_sweeper, "referenced_claim_checks", referenced_claim_checks)
+    return redis
+
+def test_only_unreferenced_idle_keys_are_deleted(redis):
+    result = asyncio.run(sweep(None, "", min_idle_seconds=3600, batch_size=2))
+    assert sorted(redis.values) == [key("busy"), key("referenced"), key("unknown-idle")]
+    assert (result.keys_reclaimed, result.bytes_reclaimed, result.keys_kept) == (2, 90, 2)
+
+def test_dry_run_deletes_nothing(redis):
+    result = asyncio.run(sweep(None, "", min_idle_seconds=3600, dry_run=True))
+    assert len(redis.values) == 5
+    assert (result.keys_reclaimed, result.bytes_reclaimed, result.keys_kept) == (2, 90, 2)
+
+def test_claim_check_ids_are_collected_from_nested_payloads():
+    claim_checks = [ClaimCheckCodec._claim_check_payload(f"claim-check:{i}") for i in range(3)]
+    event = HistoryEvent()
+    attributes = event.workflow_execution_started_event_attributes
+    attributes.input.CopyFrom(Payloads(payloads=[claim_checks[0], json_payload("inline")]))
+    attributes.memo.fields["history"].CopyFrom(claim_checks[1])
+    attributes.header.fields["context"].CopyFrom(claim_checks[2])
+    ids = set()
+    collect_claim_check_ids(event, ids)
+    assert ids == {"claim-check:0", "claim-check:1", "claim-check:2"}
+
+@pytest.mark.parametrize("ttl_seconds, min_idle_seconds", [("0", "300"), ("7200", "3600")])
+def test_min_idle_must_outlast_the_refresh_window(monkeypatch, capsys, ttl_seconds, min_idle_seconds):
+    monkeypatch.setenv("CLAIM_CHECK_TTL_SECONDS", ttl_seconds)
+    monkeypatch.setattr(sys, "argv", ["claim_check_sweeper", "--min-idle-seconds", min_idle_seconds])
+    with pytest.raises(SystemExit):
+        asyncio.run(claim_check_sweeper.main())
+    assert "refresh window" in capsys.readouterr().err
@@ -0,0 +1,67 @@
+import asyncio
+import os
+
+import pytest
+from temporalio.api.common.v1 import Payload
+
+from temporal_supervisor.claim_check.compression_codec import COMPRESSION_METADATA_KEY, CompressionCodec, \
+    CompressionConfig, PayloadCodecChain
+from temporal_supervisor.codec_server.codec_server import build_codec_server, payloads_from_json, payloads_to_json
+from tests.conftest import conversation, json_payload, round_trip
+
+@pytest.fixture
+def compression(monkeypatch):
+    for name in ("COMPRESSION_ALGORITHM", "COMPRESSION_MIN_BYTES", "COMPRESSION_LEVEL"):
+        monkeypatch.delenv(name, raising=False)
+    return CompressionCodec(CompressionConfig(algorithm="zlib"))
+
+def test_compression_round_trip(compression):
+    payloads = [conversation(100), json_payload("small")]
+    encoded, decoded = round_trip(compression, payloads)
+    assert encoded[0].metadata[COMPRESSION_METADATA_KEY] == b"zlib"
+    assert encoded[0].ByteSize() < payloads[0].ByteSize()
+    # below min_bytes the payload is left as is
+    assert encoded[1] == payloads[1]
+    assert decoded == payloads
+
+def test_compression_skips_incompressible_payloads(compression):
+    payload = Payload(metadata={"encoding": b"binary/plain"}, data=os.urandom(2048))
+    encoded, decoded = round_trip(compression, [payload])
+    assert encoded == [payload]
+    assert decoded == [payload]
+
+def test_compression_then_claim_check(compression, claim_check):
+    chain = PayloadCodecChain([compression, claim_check])
+    payloads = [conversation(100), json_payload("small")]
+    encoded, decoded = round_trip(chain, payloads)
+    assert all(p.metadata["encoding"] == b"claim-checked" for p in encoded)
+    assert decoded == payloads
+
+def test_decode_chain_reads_uncompressed_claim_checks(compression, claim_check):
+    # what the codec server sees when the workers run without compression
+    payloads = [conversation(100)]
+    encoded = asyncio.run(claim_check.encode(payloads))
+    chain = PayloadCodecChain([compression, claim_check])
+    assert asyncio.run(chain.decode(encoded)) == payloads
+
+@pytest.mark.parametrize("use_compression", [False, True])
+def test_codec_server_compresses_like_the_workers(monkeypatch, compression, fake_redis, claim_check_config,
+                                                  use_compression):
+    from aiohttp.test_utils import TestClient, TestServer
+
+    monkeypatch.setenv("USE_COMPRESSION", str(use_compression))
+    payload = conversation(100)
+
+    async def run():
+        async with TestClient(TestServer(build_codec_server())) as client:
+            headers = {"content-type": "application/json"}
+            response = await client.post("/encode", data=payloads_to_json([payload]), headers=headers)
+            [encoded] = payloads_from_json(await response.read())
+            stored = Payload.FromString(await fake_redis.get(encoded.data.decode()))
+            response = await client.post("/decode", data=payloads_to_json([encoded]), headers=headers)
+            [decoded] = payloads_from_json(await response.read())
+            return stored, decoded
+
+    stored, decoded = asyncio.run(run())
+    assert (COMPRESSION_METADATA_KEY in stored.metadata) == use_compression
+    assert decoded == payload
@@ -0,0 +1,86 @@
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from common.file_lock import fcntl, file_version, locked_file, stress, write_json_atomic
+from common.investment_manager import InvestmentAccount, InvestmentManager
+
+def increment(path: str, times: int):
+    for _ in range(times):
+        with locked_file(path):
+            with open(path) as f:
+                data = json.load(f)
+            data["count"] += 1
+            write_json_atomic(path, data)
+
+def test_threads_do_not_lose_updates(tmp_path):
+    path = str(tmp_path / "counter.json")
+    write_json_atomic(path, {"count": 0})
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(increment, [path] * 8, [25] * 8))
+    with open(path) as f:
+        assert json.load(f)["count"] == 200
+
+@pytest.mark.skipif(fcntl is None, reason="cross-process locking needs fcntl")
+def test_processes_do_not_lose_updates(tmp_path):
+    path = str(tmp_path / "counter.json")
+    write_json_atomic(path, {"count": 0})
+    processes = [multiprocessing.Process(target=increment, args=(path, 25)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    with open(path) as f:
+        assert json.load(f)["count"] == 100
+
+def test_lock_excludes_other_holders(tmp_path):
+    path = str(tmp_path / "data.json")
+    held = threading.Event()
+    release = threading.Event()
+    acquired = threading.Event()
+
+    def holder():
+        with locked_file(path):
+            held.set()
+            release.wait(5)
+
+    def contender():
+        held.wait(5)
+        with locked_file(path):
+            acquired.set()
+
+    threads = [threading.Thread(target=holder), threading.Thread(target=contender)]
+    for thread in threads:
+        thread.start()
+    held.wait(5)
+    assert not acquired.wait(0.2)
+    release.set()
+    assert acquired.wait(5)
+    for thread in threads:
+        thread.join()
+
+def test_file_version_changes_on_every_write(tmp_path):
+    path = str(tmp_path / "data.json")
+    assert file_version(path) is None
+    write_json_atomic(path, {"a": 1})
+    first = file_version(path)
+    write_json_atomic(path, {"a": 1})
+    assert file_version(path) != first
+
+def test_investment_manager_reloads_a_stale_copy(tmp_path):
+    path = str(tmp_path / "investments.json")
+    write_json_atomic(path, {})
+    first = InvestmentManager(path)
+    second = InvestmentManager(path)
+    # second loaded the file before first wrote to it
+    first.add_investment_account(InvestmentAccount("123", "College Fund", 1000.0))
+    second.add_investment_account(InvestmentAccount("123", "Retirement", 5000.0))
+    assert [a["name"] for a in second.list_investment_accounts("123")] == ["College Fund", "Retirement"]
+    assert [a["name"] for a in InvestmentManager(path).list_investment_accounts("123")] == \
+        ["College Fund", "Retirement"]
+
+def test_managers_under_stress():
+    assert stress(workers=4, operations=10, use_processes=False)
@@ -0,0 +1,71 @@
+import pytest
+
+from temporal_supervisor.workflows.history_policy import SUMMARY_PREFIX, HistoryPolicy, _simulated_turn, \
+    is_summary, split_turns
+
+def conversation(turns: int):
+    return [item for turn in range(turns) for item in _simulated_turn(turn)]
+
+def call_ids(items, item_type):
+    return [item["call_id"] for item in items if item.get("type") == item_type]
+
+def test_turns_start_at_user_messages():
+    head, turns = split_turns([{"role": "system", "content": "hello"}] + conversation(3))
+    assert head == [{"role": "system", "content": "hello"}]
+    assert turns == [_simulated_turn(turn) for turn in range(3)]
+
+@pytest.mark.parametrize("mode", ["full", "window", "summarize"])
+def test_short_conversations_are_unchanged(mode):
+    items = conversation(3)
+    assert HistoryPolicy(mode=mode, max_turns=3).apply(items) == items
+
+def test_full_mode_keeps_everything():
+    items = conversation(20)
+    assert HistoryPolicy(mode="full", max_turns=3).apply(items) == items
+
+def test_window_drops_older_turns():
+    items = HistoryPolicy(mode="window", max_turns=3).apply(conversation(10))
+    assert items == conversation(10)[-3 * len(_simulated_turn(0)):]
+
+def test_summarize_folds_older_turns_into_one_message():
+    items = HistoryPolicy(mode="summarize", max_turns=3).apply(conversation(10))
+    summary, kept = items[0], items[1:]
+    assert is_summary(summary)
+    assert kept == conversation(10)[-3 * len(_simulated_turn(0)):]
+    lines = summary["content"][len(SUMMARY_PREFIX):].splitlines()
+    assert len(lines) == 14
+    assert lines[0] == "User: Please list the beneficiaries for client 123 (turn 0)"
+    assert lines[1].startswith("Assistant: Here are your beneficiaries")
+    # tool calls and their output are left out of the summary
+    assert "list_beneficiaries" not in summary["content"]
+
+def test_summary_is_folded_again():
+    policy = HistoryPolicy(mode="summarize", max_turns=3)
+    first = policy.apply(conversation(10))
+    items = policy.apply(first + [item for turn in range(10, 14) for item in _simulated_turn(turn)])
+    summaries = [item for item in items if is_summary(item)]
+    assert summaries == [items[0]]
+    assert items[0]["content"].count(SUMMARY_PREFIX) == 1
+    lines = items[0]["content"][len(SUMMARY_PREFIX):].splitlines()
+    # the older summary comes first, then the turns folded this time
+    assert lines[:14] == first[0]["content"][len(SUMMARY_PREFIX):].splitlines()
+    assert lines[-2] == "User: Please list the beneficiaries for client 123 (turn 10)"
+
+def test_summary_keeps_the_latest_lines_within_its_budget():
+    items = HistoryPolicy(mode="summarize", max_turns=3, summary_max_chars=500).apply(conversation(30))
+    text = items[0]["content"][len(SUMMARY_PREFIX):]
+    assert len(text) <= 500
+    assert text.splitlines()[0].startswith(("User: ", "Assistant: "))
+    assert text.splitlines()[-1].startswith("Assistant: ")
+
+@pytest.mark.parametrize("mode", ["window", "summarize"])
+@pytest.mark.parametrize("max_turns", [1, 2, 5])
+def test_calls_are_never_split_from_their_output(mode, max_turns):
+    policy = HistoryPolicy(mode=mode, max_turns=max_turns)
+    history = []
+    for turn in range(12):
+        new_turn = _simulated_turn(turn)
+        items = policy.apply(history + new_turn[:1])
+        history = items + new_turn[1:]
+        assert call_ids(history, "function_call") == call_ids(history, "function_call_output")
+    assert len(split_turns(history)[1]) == max_turns
@@ -0,0 +1,40 @@
+import pytest
+
+from common.agent_constants import BENE_AGENT_NAME, INVEST_AGENT_NAME, OPEN_ACCOUNT_AGENT_NAME, \
+    SUPERVISOR_AGENT_NAME
+from temporal_supervisor.workflows.intent_router import IntentRule, KeywordIntentRouter
+
+@pytest.fixture
+def router():
+    return KeywordIntentRouter()
+
+@pytest.mark.parametrize("message, agent_name", [
+    ("Who are my beneficiaries?", BENE_AGENT_NAME),
+    ("Show me my investment accounts", INVEST_AGENT_NAME),
+    ("What is my balance?", INVEST_AGENT_NAME),
+    # the open account rules outrank the investment ones the message also matches
+    ("I want to open a new investment account", OPEN_ACCOUNT_AGENT_NAME),
+    ("Create a brokerage account for my portfolio", OPEN_ACCOUNT_AGENT_NAME),
+])
+def test_clear_requests_are_routed_from_the_supervisor(router, message, agent_name):
+    assert router.route(message, SUPERVISOR_AGENT_NAME) == agent_name
+
+@pytest.mark.parametrize("message", [
+    "Hello",
+    # a beneficiary rule and an investment rule at the same priority
+    "Add my son as a beneficiary of my investment account",
+])
+def test_unclear_requests_are_not_routed(router, message):
+    assert router.route(message, SUPERVISOR_AGENT_NAME) is None
+
+@pytest.mark.parametrize("current_agent_name", [OPEN_ACCOUNT_AGENT_NAME, BENE_AGENT_NAME, INVEST_AGENT_NAME])
+@pytest.mark.parametrize("message", ["An investment account", "Add him as a beneficiary", "Open a new account"])
+def test_no_routing_mid_flow(router, current_agent_name, message):
+    assert router.route(message, current_agent_name) is None
+
+def test_highest_priority_wins_and_ties_are_unclear():
+    router = KeywordIntentRouter([IntentRule(BENE_AGENT_NAME, "heir", priority=2),
+                                  IntentRule(INVEST_AGENT_NAME, "fund", priority=1),
+                                  IntentRule(OPEN_ACCOUNT_AGENT_NAME, "fund", priority=1)])
+    assert router.route("Make my heir the owner of the fund", SUPERVISOR_AGENT_NAME) == BENE_AGENT_NAME
+    assert router.route("Move the fund", SUPERVISOR_AGENT_NAME) is None
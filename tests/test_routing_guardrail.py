@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from collections import Counter
+
+import pytest
+from agents import RunContextWrapper
+
+from common.agent_constants import BENE_AGENT_NAME, SUPERVISOR_AGENT_NAME
+from temporal_supervisor.activities.guardrail_cache import GuardrailCacheActivities
+from temporal_supervisor.workflows import supervisor_workflow
+from temporal_supervisor.workflows.supervisor_workflow import RoutingGuardrailOutput, WealthManagementContext, \
+    WealthManagementSnapshot, WealthManagementWorkflow, find_agent, init_agents, routing_guardrail
+
+class FakeMeter:
+    """ Counts routing_guardrail_decisions by source """
+
+    def __init__(self):
+        self.decisions = Counter()
+
+    def create_counter(self, name, description):
+        return self
+
+    def add(self, value, attributes):
+        self.decisions[attributes["source"]] += value
+
+class FakeWorkflow:
+    """ The workflow APIs routing_guardrail uses, with the guardrail cache local activities in a dict """
+
+    def __init__(self, monkeypatch, patches):
+        self.patches = patches
+        self.cache = {}
+        self.model_calls = []
+        self.meter = FakeMeter()
+        workflow = supervisor_workflow.workflow
+        monkeypatch.setattr(workflow, "patched", lambda patch_id: patch_id in self.patches)
+        monkeypatch.setattr(workflow, "logger", logging.getLogger("test_routing_guardrail"))
+        monkeypatch.setattr(workflow, "metric_meter", lambda: self.meter)
+        monkeypatch.setattr(workflow, "execute_local_activity", self.execute_local_activity)
+        monkeypatch.setattr(supervisor_workflow, "Runner", self)
+
+    async def execute_local_activity(self, activity, arg=None, *, args=(), **kwargs):
+        if activity is GuardrailCacheActivities.lookup_verdict:
+            return self.cache.get(arg)
+        key, verdict = args
+        self.cache[key] = verdict
+
+    async def run(self, agent, input, context):
+        self.model_calls.append(input)
+        verdict = RoutingGuardrailOutput(is_wealth_management_question="weather" not in input,
+                                         reasoning="from the model")
+        return type("RunResult", (), {"final_output": verdict})()
+
+def check(message: str, agent_name: str = SUPERVISOR_AGENT_NAME):
+    agent = type("Agent", (), {"name": agent_name})()
+    ctx = RunContextWrapper(context=WealthManagementContext())
+    return asyncio.run(routing_guardrail.guardrail_function(ctx, agent, message))
+
+ALL_PATCHES = {"routing-local-classifier", "guardrail-verdict-cache"}
+
+def test_obvious_messages_are_decided_locally(monkeypatch):
+    fake = FakeWorkflow(monkeypatch, ALL_PATCHES)
+    assert not check("yes").tripwire_triggered
+    assert check("Jokes!").tripwire_triggered
+    assert fake.model_calls == [] and fake.cache == {}
+    assert fake.meter.decisions == {"local": 2}
+
+def test_repeated_questions_come_from_the_cache(monkeypatch):
+    fake = FakeWorkflow(monkeypatch, ALL_PATCHES)
+    assert not check("Who are my beneficiaries?").tripwire_triggered
+    assert check("What is the weather in Paris?").tripwire_triggered
+    assert len(fake.model_calls) == 2 and len(fake.cache) == 2
+
+    # the same questions, normalized, to the same agent
+    assert not check("who are my beneficiaries").tripwire_triggered
+    result = check("What is the weather in Paris")
+    assert result.tripwire_triggered
+    assert result.output_info.reasoning == "from the model"
+    assert len(fake.model_calls) == 2
+    # another agent gets its own verdicts
+    check("Who are my beneficiaries?", BENE_AGENT_NAME)
+    assert len(fake.model_calls) == 3
+    assert fake.meter.decisions == {"model_or_cache": 5}
+
+def test_runs_before_the_patches_always_ask_the_model(monkeypatch):
+    fake = FakeWorkflow(monkeypatch, set())
+    check("yes")
+    check("yes")
+    assert fake.model_calls == ["yes", "yes"] and fake.cache == {}
+
+@pytest.mark.parametrize("enabled", [False, True])
+def test_guardrails_setting_is_restored(monkeypatch, enabled):
+    FakeWorkflow(monkeypatch, ALL_PATCHES)
+    wf = WealthManagementWorkflow.__new__(WealthManagementWorkflow)
+    wf.pending_chat_messages = asyncio.Queue()
+    wf.pending_status_updates = asyncio.Queue()
+    wf.guardrails_enabled = False
+    wf.current_agent = init_agents(True)
+
+    wf._restore(WealthManagementSnapshot(guardrails_enabled=enabled, current_agent_name=BENE_AGENT_NAME))
+    assert wf.current_agent.name == BENE_AGENT_NAME
+    for name in (SUPERVISOR_AGENT_NAME, BENE_AGENT_NAME):
+        assert find_agent(wf.current_agent, name).input_guardrails == ([routing_guardrail] if enabled else [])
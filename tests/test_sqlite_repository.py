@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from common.beneficiaries_manager import BeneficiariesManager, BeneficiariesStore
+from common.client_manager import ClientManager
+from common.investment_manager import InvestmentAccount, InvestmentManager
+from common.repository import DataStoreBackend, DataStoreConfig, get_beneficiaries_repository, \
+    get_client_repository, get_investment_repository
+from common.sqlite_repository import SqliteRepository
+
+@pytest.fixture
+def repository(tmp_path):
+    return SqliteRepository(str(tmp_path / "wealth_management.db"))
+
+@pytest.fixture
+def config(monkeypatch, tmp_path):
+    monkeypatch.delenv("DATA_STORE_BACKEND", raising=False)
+    monkeypatch.setenv("SQLITE_DB_PATH", str(tmp_path / "wealth_management.db"))
+    return DataStoreConfig()
+
+def test_clients(repository):
+    assert repository.add_client("123", "Jane", "Doe", "1 Main St", "555", "jd@example.com", "single") \
+        == "Client 123 added"
+    assert repository.add_client("123", "Jane", "Doe", "1 Main St", "555", "jd@example.com", "single") \
+        == "Client already exists"
+    repository.update_client("123", {"marital_status": "married", "unknown": "ignored"})
+    client = repository.get_client("123")
+    assert client["marital_status"] == "married"
+    assert "unknown" not in client
+    assert "error" in repository.get_client("456")
+
+def test_investments(repository):
+    account = repository.add_investment_account(InvestmentAccount("123", "College Fund", 1000.0))
+    assert repository.list_investment_accounts("123") == [account]
+    assert repository.delete_investment_account("123", account["investment_id"])
+    assert not repository.delete_investment_account("123", account["investment_id"])
+    assert repository.list_investment_accounts("123") == []
+
+def test_beneficiaries(repository):
+    repository.add_beneficiary("123", "John", "Doe", "son")
+    [beneficiary] = repository.list_beneficiaries("123")
+    assert repository.get_beneficiary("123", beneficiary["beneficiary_id"]) == beneficiary
+    repository.delete_beneficiary("123", beneficiary["beneficiary_id"])
+    assert repository.list_beneficiaries("123") == []
+
+def test_import_json_includes_journaled_changes(repository, tmp_path):
+    beneficiaries_file = tmp_path / "beneficiaries.json"
+    beneficiaries_file.write_text(json.dumps({"123": [
+        {"beneficiary_id": "b-1", "first_name": "Jane", "last_name": "Doe", "relationship": "daughter"},
+    ]}))
+    # written by another process that hasn't snapshotted yet
+    BeneficiariesStore(str(beneficiaries_file), snapshot_every=100).add("123", "John", "Doe", "son")
+    repository.import_json("", "", str(beneficiaries_file))
+    assert sorted(b["first_name"] for b in repository.list_beneficiaries("123")) == ["Jane", "John"]
+
+def test_factories_default_to_the_json_managers(config):
+    assert isinstance(get_client_repository(config), ClientManager)
+    assert isinstance(get_investment_repository(config), InvestmentManager)
+    assert isinstance(get_beneficiaries_repository(config), BeneficiariesManager)
+
+def test_factories_share_the_sqlite_repository(config):
+    config.backend = DataStoreBackend.SQLITE
+    repository = get_client_repository(config)
+    assert isinstance(repository, SqliteRepository)
+    assert get_investment_repository(config) is repository
+    assert get_beneficiaries_repository(config) is repository
+
+def test_managers_no_longer_switch_backends(monkeypatch):
+    # choosing the backend is the factories' job
+    monkeypatch.setenv("DATA_STORE_BACKEND", "sqlite")
+    assert isinstance(ClientManager(), ClientManager)